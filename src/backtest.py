@@ -0,0 +1,156 @@
+"""
+THIS FILE CONTAINS THE ROLLING-WINDOW BACKTEST OF THE MEAN-VARIANCE PORTFOLIO.
+
+At each rebalance date the minimum variance portfolio is computed from the returns in the window that precedes it,
+then it is held until the next rebalance. The mean and the covariance of the window are updated incrementally by
+adding the days that enter the window and removing the ones that leave it, and each solve is warm-started from
+the previous solution. A warm start that fails is solved again from a random point, and a rebalance that cannot be
+solved stops the backtest instead of booking a non-optimal portfolio.
+"""
+import time
+import numpy as np
+import pandas as pd
+from solvers import interior_point
+
+class RollingMoments:
+    """Keeps the sums needed to compute the mean and the covariance of a set of observations that changes
+    by adding and removing rows. The observations are shifted by a constant close to their mean to avoid
+    the loss of precision of the sums of squares.
+    """
+
+    def __init__(self, shift: np.array) -> None:
+        self.shift = shift
+        self.count = 0
+        self.sum = np.zeros(shift.shape[0])
+        self.cross = np.zeros((shift.shape[0], shift.shape[0]))
+
+    def add(self, rows: np.array) -> None:
+        centered = rows - self.shift
+        self.count += rows.shape[0]
+        self.sum += centered.sum(axis=0)
+        self.cross += centered.T @ centered
+
+    def remove(self, rows: np.array) -> None:
+        centered = rows - self.shift
+        self.count -= rows.shape[0]
+        self.sum -= centered.sum(axis=0)
+        self.cross -= centered.T @ centered
+
+    def mean(self) -> np.array:
+        return self.shift + self.sum / self.count
+
+    def covariance(self) -> np.array:
+        """The sample covariance, with the same normalization of pandas.DataFrame.cov"""
+        mean = self.sum / self.count
+        return (self.cross - self.count * np.outer(mean, mean)) / (self.count - 1)
+
+class Backtest:
+
+    def __init__(self
+                , returns: pd.DataFrame
+                , A: np.array
+                , b: np.array
+                , window=126
+                , rebalance=21
+                , expanding=False) -> None:
+        """
+        Initializes a backtest of the minimum variance portfolio.
+
+        Args:
+            returns: the daily returns of the assets, one column per asset, the rows with missing values are dropped
+            A, b: the constraints A @ x >= b of the problem, as given by Portfolio.preprocess_matrix_qp
+            window: the number of days used to estimate the covariance, the initial one for an expanding window
+            rebalance: the number of days between two rebalances
+            expanding: if True the window keeps all the days since the start instead of rolling
+        """
+        self.returns = returns.dropna()
+        self.A = A
+        self.b = b
+        self.window = window
+        self.rebalance = rebalance
+        self.expanding = expanding
+
+        if self.returns.shape[0] <= window:
+            raise Exception("STOPPED EXECUTION: NOT ENOUGH DATA FOR THE BACKTEST WINDOW")
+
+        # Results: weights at each rebalance date, daily returns of the portfolio, solve times, and the status and the
+        # iterations of each solve and whether it was restarted from a random point after a failed warm start
+        self.weights = None
+        self.pnl = None
+        self.timings = None
+        self.solves = None
+
+    def __solve(self, S, previous) -> tuple:
+        """Solves the minimum variance problem, starting from the previous solution if there is one.
+
+        Returns:
+            the solution, the multipliers, the status and the number of iterations of the solver
+        """
+        n_assets = self.A.shape[1]
+        c = np.zeros(n_assets)
+        if previous is None:
+            intpoint = interior_point.IntPoint(S, c, self.A, self.b
+                                            , x_init=np.random.uniform(0.0, 1.0, [n_assets,])
+                                            , y_init=np.random.uniform(0.1, 100.0, [self.A.shape[0],])
+                                            , lm_init=np.random.uniform(0.1, 100.0, [self.A.shape[0],])
+                                            , history='none')
+        else:
+            x, lm = previous
+            intpoint = interior_point.IntPoint(S, c, self.A, self.b
+                                            , x_init=x
+                                            , y_init=self.A @ x - self.b
+                                            , lm_init=lm
+                                            , warm_start=True
+                                            , history='none')
+        status = intpoint.solve()
+        return intpoint.solutions, intpoint.lambdas, status, intpoint.iteration
+
+    def run(self) -> None:
+        """Walks the window over the returns, rebalancing the portfolio every `rebalance` days."""
+        R = self.returns.to_numpy()
+        dates = self.returns.index
+        rebalances = np.arange(self.window, R.shape[0], self.rebalance)
+
+        moments = RollingMoments(R[:self.window].mean(axis=0))
+        moments.add(R[:self.window])
+
+        weights = np.zeros((rebalances.shape[0], R.shape[1]))
+        timings = np.zeros(rebalances.shape[0])
+        pnl = np.zeros(R.shape[0] - self.window)
+
+        previous = None
+        solves = []
+        for i, t in enumerate(rebalances):
+            start = time.perf_counter()
+            if i > 0:
+                # The days since the last rebalance enter the window, as many days leave a rolling window
+                last = rebalances[i - 1]
+                moments.add(R[last:t])
+                if not self.expanding:
+                    moments.remove(R[last - self.window:t - self.window])
+
+            S = moments.covariance() * 252
+            x, lm, status, iterations = self.__solve(S, previous)
+            restarted = status != interior_point.OPTIMAL and previous is not None
+            if restarted:
+                # A failed warm start is solved again from a random point
+                x, lm, status, iterations = self.__solve(S, None)
+            if status != interior_point.OPTIMAL:
+                raise Exception(f"STOPPED EXECUTION: REBALANCE OF {dates[t]} NOT SOLVED ({status})")
+            previous = (x, lm)
+            timings[i] = time.perf_counter() - start
+            weights[i] = x
+            solves.append((status, iterations, restarted))
+
+            # The portfolio is held until the next rebalance
+            hold = slice(t, t + self.rebalance)
+            pnl[t - self.window:t - self.window + R[hold].shape[0]] = R[hold] @ weights[i]
+
+        self.weights = pd.DataFrame(weights, index=dates[rebalances], columns=self.returns.columns)
+        self.pnl = pd.Series(pnl, index=dates[self.window:], name='pnl')
+        self.timings = pd.Series(timings, index=dates[rebalances], name='seconds')
+        self.solves = pd.DataFrame(solves, index=dates[rebalances], columns=['status', 'iterations', 'restarted'])
+
+    def cumulative_return(self) -> pd.Series:
+        """The compounded return of the portfolio since the first rebalance."""
+        return (1 + self.pnl).cumprod() - 1
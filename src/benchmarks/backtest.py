@@ -0,0 +1,69 @@
+"""
+BENCHMARK: rolling-window backtest with incremental moments and warm starts against recomputing the covariance
+with pandas and cold-starting the solver at each rebalance.
+
+Run from the src folder with:
+    python -m benchmarks.backtest
+"""
+import time
+import numpy as np
+import pandas as pd
+from solvers import interior_point
+from backtest import Backtest
+
+def random_returns(n_days: int, n_assets: int, seed=0) -> pd.DataFrame:
+    """Daily returns driven by a few common factors, indexed by business days."""
+    rng = np.random.default_rng(seed)
+    loadings = rng.normal(0.0, 1.0, (3, n_assets))
+    factors = rng.normal(0.0, 0.01, (n_days, 3))
+    returns = factors @ loadings + rng.normal(0.0005, 0.015, (n_days, n_assets))
+    return pd.DataFrame(returns, index=pd.bdate_range('2000-01-03', periods=n_days))
+
+def constraints(n_assets: int, upper: float) -> tuple:
+    """Same constraints of Portfolio.preprocess_matrix_qp."""
+    A = np.vstack([-np.eye(n_assets), np.ones(n_assets)])
+    b = np.append(-np.full(n_assets, upper), 1)
+    return A, b
+
+def mean_variance(returns: pd.DataFrame, weights: np.array, window, rebalance) -> np.float64:
+    """The mean variance of the portfolios over their windows, lower is more accurate."""
+    variances = []
+    for i, t in enumerate(range(window, returns.shape[0], rebalance)):
+        S = returns.iloc[t - window:t].cov().to_numpy() * 252
+        variances.append(weights[i] @ S @ weights[i])
+    return np.mean(variances)
+
+def naive_backtest(returns: pd.DataFrame, A, b, window, rebalance) -> np.array:
+    """The covariance of each window is computed from scratch and each problem starts from a random point."""
+    n_assets = returns.shape[1]
+    weights = []
+    for t in range(window, returns.shape[0], rebalance):
+        S = returns.iloc[t - window:t].cov().to_numpy() * 252
+        intpoint = interior_point.IntPoint(S, np.zeros(n_assets), A, b
+                                        , x_init=np.random.uniform(0.0, 1.0, [n_assets,])
+                                        , y_init=np.random.uniform(0.1, 100.0, [A.shape[0],])
+                                        , lm_init=np.random.uniform(0.1, 100.0, [A.shape[0],]))
+        intpoint.solve()
+        weights.append(intpoint.hsol[-1])
+    return np.array(weights)
+
+if __name__ == "__main__":
+    window, rebalance = 252, 5
+    print(f'{"days x assets":>14} {"naive (s)":>10} {"engine (s)":>11} {"speedup":>8} {"naive var":>10} {"engine var":>10}')
+    for n_days, n_assets in [(1260, 50), (2520, 100), (5040, 200)]:
+        returns = random_returns(n_days, n_assets)
+        A, b = constraints(n_assets, 10.0 / n_assets)
+
+        np.random.seed(0)
+        start = time.perf_counter()
+        naive = naive_backtest(returns, A, b, window, rebalance)
+        t_naive = time.perf_counter() - start
+
+        start = time.perf_counter()
+        engine = Backtest(returns, A, b, window=window, rebalance=rebalance)
+        engine.run()
+        t_engine = time.perf_counter() - start
+
+        var_naive = mean_variance(returns, naive, window, rebalance)
+        var_engine = mean_variance(returns, engine.weights.to_numpy(), window, rebalance)
+        print(f'{f"{n_days} x {n_assets}":>14} {t_naive:>10.2f} {t_engine:>11.2f} {t_naive / t_engine:>8.1f} {var_naive:>10.6f} {var_engine:>10.6f}')
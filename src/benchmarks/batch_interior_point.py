@@ -0,0 +1,33 @@
+"""
+BENCHMARK: throughput of BatchIntPoint against a Python loop of IntPoint.solve on stacks of small problems.
+
+Run from the src folder with:
+    python -m benchmarks.batch_interior_point
+"""
+import time
+import numpy as np
+from solvers.interior_point import IntPoint
+from solvers.batch_interior_point import BatchIntPoint
+from benchmarks.problems import random_qp
+
+if __name__ == "__main__":
+    print(f'{"k x n":>12} {"loop (pb/s)":>12} {"batch (pb/s)":>13} {"speedup":>8} {"max |dx|":>10}')
+    for n_problems, n_assets in [(100, 5), (1000, 5), (1000, 20), (500, 50), (100, 200)]:
+        problems = [random_qp(n_assets, upper=0.5, seed=seed) for seed in range(n_problems)]
+        S, c, A, b, x_init, y_init, lm_init = (np.stack(arrays) for arrays in zip(*problems))
+
+        start = time.perf_counter()
+        loop = []
+        for i in range(n_problems):
+            intpoint = IntPoint(S[i], c[i], A[i], b[i], x_init=x_init[i], y_init=y_init[i], lm_init=lm_init[i])
+            intpoint.solve()
+            loop.append(intpoint.hsol[-1])
+        t_loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = BatchIntPoint(S, c, A[0], b[0], x_init, y_init, lm_init)
+        batch.solve()
+        t_batch = time.perf_counter() - start
+
+        diff = np.max(np.abs(np.stack(loop) - batch.solutions))
+        print(f'{f"{n_problems} x {n_assets}":>12} {n_problems / t_loop:>12.1f} {n_problems / t_batch:>13.1f} {t_loop / t_batch:>8.1f} {diff:>10.2e}')
@@ -0,0 +1,61 @@
+"""
+BENCHMARK: startup and per-job overhead of the optfolio command line interface. The import time of the modules is
+measured in fresh interpreters, then batches of jobs on the tickers already on disk are run by the CLI with one
+worker and with a pool: the marginal time of a job is compared to the time spent solving it.
+
+Run from the src folder with:
+    python -m benchmarks.cli
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC = os.path.join(ROOT, 'src')
+TICKERS = ['TSLA', 'GME', 'AAPL', 'JNJ', 'SPCE']
+
+def wall_time(args, repeat=5) -> float:
+    """Median wall time of a command run from the root of the repository."""
+    times = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        subprocess.run(args, cwd=ROOT, env={**os.environ, 'PYTHONPATH': SRC}, check=False
+                    , stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - begin)
+    return float(np.median(times))
+
+def write_jobs(path: str, n_jobs: int, seed=0) -> None:
+    rng = np.random.default_rng(seed)
+    with open(path, 'w') as f:
+        for i in range(n_jobs):
+            f.write(json.dumps({'id': i
+                                , 'tickers': TICKERS
+                                , 'upper': rng.uniform(0.3, 0.6, len(TICKERS)).tolist()
+                                , 'start_date': '2020-01-01'
+                                , 'end_date': '2021-01-01'
+                                , 'method': 'intpoint' if i % 2 == 0 else 'revised'}) + '\n')
+
+if __name__ == "__main__":
+    interpreter = wall_time([sys.executable, '-c', 'pass'])
+    print(f'{"module":>20} {"import (s)":>12}')
+    for module in ['optfolio', 'numpy', 'pandas', 'matplotlib.pyplot', 'portfolio']:
+        print(f'{module:>20} {wall_time([sys.executable, "-c", f"import {module}"]) - interpreter:>12.3f}')
+
+    print(f'\n{"workers":>8} {"jobs":>6} {"total (s)":>10} {"per job (s)":>12} {"solve (s)":>10}')
+    with tempfile.TemporaryDirectory() as folder:
+        for workers in [1, 2, 4]:
+            startup = None
+            for n_jobs in [1, 50, 200]:
+                jobs, results = os.path.join(folder, 'jobs.jsonl'), os.path.join(folder, 'results.jsonl')
+                write_jobs(jobs, n_jobs)
+                total = wall_time([sys.executable, os.path.join(SRC, 'optfolio.py'), jobs, '-o', results
+                                , '-w', str(workers)], repeat=3)
+                with open(results) as f:
+                    solve = np.mean([json.loads(line)['seconds'] for line in f])
+                startup = total if startup is None else startup
+                per_job = (total - startup) / (n_jobs - 1) if n_jobs > 1 else total
+                print(f'{workers:>8} {n_jobs:>6} {total:>10.3f} {per_job:>12.4f} {solve:>10.4f}')
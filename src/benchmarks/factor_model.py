@@ -0,0 +1,54 @@
+"""
+BENCHMARK: IntPoint with a factor-model covariance solved with the Woodbury identity against the dense covariance
+matrix factored with Cholesky, as the number of assets grows with a fixed number of factors.
+
+Run from the src folder with:
+    python -m benchmarks.factor_model
+"""
+import time
+import tracemalloc
+import numpy as np
+from scipy import sparse
+from solvers.interior_point import IntPoint
+from solvers.factor_covariance import FactorCovariance
+
+# Above this size the dense covariance matrix is not built
+MAX_DENSE = 4000
+
+def random_factor_model(n_assets: int, n_factors: int, seed=0) -> FactorCovariance:
+    """Annualized factor model with random loadings, factor variances and specific variances."""
+    rng = np.random.default_rng(seed)
+    B = rng.normal(0.0, 1.0, (n_assets, n_factors))
+    F = np.diag(rng.uniform(1.0e-5, 1.0e-4, n_factors)) * 252
+    D = rng.uniform(1.0e-4, 4.0e-4, n_assets) * 252
+    return FactorCovariance(B, F, D)
+
+def solve(S, A, b, seed=0) -> tuple:
+    rng = np.random.default_rng(seed)
+    n_assets = S.shape[0]
+    intpoint = IntPoint(S, np.zeros(n_assets), A, b
+                        , x_init=rng.uniform(0.0, 1.0, n_assets)
+                        , y_init=rng.uniform(0.1, 100.0, A.shape[0])
+                        , lm_init=rng.uniform(0.1, 100.0, A.shape[0]))
+    tracemalloc.start()
+    start = time.perf_counter()
+    intpoint.solve()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds / intpoint.iteration, peak, intpoint.hsol[-1]
+
+if __name__ == "__main__":
+    n_factors = 10
+    print(f'{"n_assets":>10} {"dense s/it":>11} {"dense MiB":>10} {"factor s/it":>12} {"factor MiB":>11} {"max |dx|":>10}')
+    for n_assets in [1000, 2000, 4000, 10000, 20000]:
+        S = random_factor_model(n_assets, n_factors)
+        A = sparse.vstack([-sparse.identity(n_assets), np.ones((1, n_assets))], format='csr')
+        b = np.append(-np.full(n_assets, 10.0 / n_assets), 1)
+
+        t_factor, peak_factor, x_factor = solve(S, A, b)
+        dense = ('-', '-', '-')
+        if n_assets <= MAX_DENSE:
+            t_dense, peak_dense, x_dense = solve(S.to_dense(), A, b)
+            dense = (f'{t_dense:.5f}', f'{peak_dense / 2**20:.1f}', f'{np.max(np.abs(x_dense - x_factor)):.2e}')
+        print(f'{n_assets:>10} {dense[0]:>11} {dense[1]:>10} {t_factor:>12.5f} {peak_factor / 2**20:>11.1f} {dense[2]:>10}')
@@ -0,0 +1,46 @@
+"""
+BENCHMARK: efficient frontier computed with warm-started solves, sequential and parallel, against N cold solves.
+
+Run from the src folder with:
+    python -m benchmarks.frontier
+"""
+import time
+import numpy as np
+import frontier
+from benchmarks.problems import random_qp
+
+def mean_variance(S, weights) -> np.float64:
+    """The mean variance of the frontier portfolios, lower is more accurate since the targets are the same."""
+    return np.mean(np.einsum('ij,jk,ik->i', weights, S, weights))
+
+if __name__ == "__main__":
+    n_points = 40
+    print(f'{"n_assets":>10} {"method":>14} {"time (s)":>10} {"iterations":>12} {"mean var":>10}')
+    for n_assets in [20, 100, 400]:
+        S, _, A, b, _, _, _ = random_qp(n_assets, upper=0.2)
+        mu = np.random.default_rng(1).normal(0.001, 0.001, n_assets)
+        scale = np.max(np.abs(mu))
+        A_frontier = np.vstack([A, mu / scale])
+        b_frontier = np.append(b, 0.0)
+        # The maximum return with the bounds is obtained by filling the best assets up to the upper bound
+        max_return = np.sort(mu)[-5:].sum() * 0.2
+        # Same targets of frontier.efficient_frontier, starting from the minimum variance portfolio
+        min_variance, _, _ = frontier.solve_frontier_chunk(S, A, b, b[-1:])
+        targets = np.linspace(mu @ min_variance[0], max_return, n_points) / scale
+
+        np.random.seed(0)
+        start = time.perf_counter()
+        cold, cold_iterations, _ = frontier.solve_frontier_chunk(S, A_frontier, b_frontier, targets, warm_start=False)
+        t_cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        warm, warm_iterations, _ = frontier.solve_frontier_chunk(S, A_frontier, b_frontier, targets, warm_start=True)
+        t_warm = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parallel, _, _ = frontier.efficient_frontier(S, mu, A, b, max_return, n_points=n_points, processes=4)
+        t_parallel = time.perf_counter() - start
+
+        print(f'{n_assets:>10} {"cold":>14} {t_cold:>10.3f} {cold_iterations.sum():>12} {mean_variance(S, cold):>10.6f}')
+        print(f'{n_assets:>10} {"warm":>14} {t_warm:>10.3f} {warm_iterations.sum():>12} {mean_variance(S, warm):>10.6f}')
+        print(f'{n_assets:>10} {"warm parallel":>14} {t_parallel:>10.3f} {"-":>12} {mean_variance(S, parallel):>10.6f}')
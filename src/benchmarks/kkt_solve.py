@@ -0,0 +1,35 @@
+"""
+BENCHMARK: reduced normal equations (Cholesky) against the dense block KKT solve in IntPoint.
+
+Run from the src folder with:
+    python -m benchmarks.kkt_solve
+"""
+import time
+import numpy as np
+from solvers.interior_point import IntPoint
+from benchmarks.problems import random_qp
+
+def time_iteration(intpoint: IntPoint, kkt: str, repeat=3) -> tuple:
+    """Times the predictor and corrector solves of a single iteration, returns the best time
+    and the last corrector step."""
+    intpoint.kkt = kkt
+    x, y, lm = intpoint.x_0, intpoint.y_0, intpoint.lm_0
+    zeros = np.zeros(intpoint.n_eq)
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        factor = intpoint.factorize_kkt(y, lm) if kkt == 'normal' else None
+        _, dy_aff, dlm_aff = intpoint.corrector_step(x, y, lm, zeros, zeros, 0, factor=factor)
+        step = intpoint.corrector_step(x, y, lm, dy_aff, dlm_aff, 0.1, factor=factor)
+        best = min(best, time.perf_counter() - start)
+    return best, step
+
+if __name__ == "__main__":
+    print(f'{"n_assets":>10} {"dense (s)":>12} {"normal (s)":>12} {"speedup":>10} {"max |diff|":>12}')
+    for n_assets in [10, 50, 100, 200, 400, 800, 1600]:
+        S, c, A, b, x_init, y_init, lm_init = random_qp(n_assets)
+        intpoint = IntPoint(S, c, A, b, x_init=x_init, y_init=y_init, lm_init=lm_init)
+        t_dense, step_dense = time_iteration(intpoint, 'dense')
+        t_normal, step_normal = time_iteration(intpoint, 'normal')
+        diff = max(np.max(np.abs(d - n)) for d, n in zip(step_dense, step_normal))
+        print(f'{n_assets:>10} {t_dense:>12.5f} {t_normal:>12.5f} {t_dense / t_normal:>10.1f} {diff:>12.2e}')
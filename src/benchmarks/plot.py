@@ -0,0 +1,38 @@
+"""
+BENCHMARK: rendering of long price histories with plot.render_report, every point against the series downsampled
+with LTTB, in the main process and in worker processes: the time of the downsampling, the render time and the size
+of the output files.
+
+Run from the src folder with:
+    python -m benchmarks.plot
+"""
+import tempfile
+import time
+import numpy as np
+import plot
+import prices
+from benchmarks.price_matrix import long_market_data
+
+def render(dates, values, symbols, extension, n_points, processes) -> tuple:
+    with tempfile.TemporaryDirectory() as folder:
+        begin = time.perf_counter()
+        sizes = plot.render_report(dates, values, symbols, 'adjclose prices ($)', f'{folder}/report.{extension}'
+                                , n_points=n_points, processes=processes)
+        return time.perf_counter() - begin, len(sizes), sum(sizes.values())
+
+if __name__ == "__main__":
+    n_dates, n_assets = 10000, 64
+    dates, values = prices.price_matrix(*long_market_data(n_dates, n_assets))
+    symbols = [f'T{i}' for i in range(n_assets)]
+    x = dates.astype(np.int64)
+    begin = time.perf_counter()
+    for i in range(n_assets):
+        plot.lttb(x, values[:, i], 500)
+    print(f'lttb of {n_assets} series of {n_dates} points to 500: {(time.perf_counter() - begin) * 1e3 / n_assets:.2f} ms per series')
+
+    print(f'\n{n_dates} dates x {n_assets} assets, 8 panels per page')
+    print(f'{"format":>7} {"points":>7} {"processes":>10} {"pages":>6} {"time (s)":>9} {"size (KiB)":>11}')
+    for extension in ['pdf', 'png']:
+        for n_points, processes in [(None, None), (500, None), (500, 2), (500, 4)]:
+            seconds, pages, size = render(dates, values, symbols, extension, n_points, processes)
+            print(f'{extension:>7} {n_points or "all":>7} {processes or "main":>10} {pages:>6} {seconds:>9.2f} {size / 2**10:>11.1f}')
@@ -0,0 +1,60 @@
+"""
+BENCHMARK: float32 statistics and mixed precision interior point against float64, on synthetic universes of daily
+prices with a few missing dates. The memory is the size of the price, returns and covariance arrays and the peak
+traced while solving the minimum variance problem; the accuracy is measured on the covariance and on the solution.
+
+Run from the src folder with:
+    python -m benchmarks.precision
+"""
+import time
+import tracemalloc
+import numpy as np
+from scipy import sparse
+import prices
+from solvers.interior_point import IntPoint
+from benchmarks.price_matrix import long_market_data
+
+def statistics(market_data, tickers, dtype) -> tuple:
+    close = prices.price_matrix(market_data, tickers, dtype=dtype)[1]
+    returns = prices.simple_returns(close)
+    S = prices.covariance(returns) * dtype(252)
+    return S, close.nbytes + returns.nbytes + S.nbytes
+
+def solve(S, upper: float, precision: str) -> tuple:
+    n_assets = S.shape[0]
+    rng = np.random.default_rng(0)
+    A = sparse.vstack([-sparse.identity(n_assets), np.ones((1, n_assets))], format='csr')
+    b = np.append(np.full(n_assets, -upper), 1.0)
+    intpoint = IntPoint(S, np.zeros(n_assets), A, b
+                        , x_init=rng.uniform(0.0, 1.0, n_assets)
+                        , y_init=rng.uniform(0.1, 100.0, n_assets + 1)
+                        , lm_init=rng.uniform(0.1, 100.0, n_assets + 1)
+                        , precision=precision
+                        , history='none')
+    tracemalloc.start()
+    begin = time.perf_counter()
+    intpoint.solve()
+    seconds = time.perf_counter() - begin
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return intpoint, seconds, peak
+
+if __name__ == "__main__":
+    n_dates = 2520
+    print(f'{"assets":>7} {"stats MiB":>18} {"solve peak MiB":>18} {"solve (s)":>14} {"it (f32)":>9} '
+        f'{"rel dS":>9} {"max |dx|":>9} {"rel d var":>10}')
+    for n_assets in [250, 500, 1000, 2000]:
+        market_data, tickers = long_market_data(n_dates, n_assets)
+        S64, bytes64 = statistics(market_data, tickers, np.float64)
+        S32, bytes32 = statistics(market_data, tickers, np.float32)
+        del market_data
+
+        double, t64, peak64 = solve(S64, 3.0 / n_assets, 'double')
+        mixed, t32, peak32 = solve(S32, 3.0 / n_assets, 'mixed')
+        x64, x32 = double.solutions, mixed.solutions
+        var64, var32 = x64 @ S64 @ x64, x32 @ S64 @ x32
+        print(f'{n_assets:>7} {f"{bytes64 / 2**20:.1f} -> {bytes32 / 2**20:.1f}":>18} '
+            f'{f"{peak64 / 2**20:.1f} -> {peak32 / 2**20:.1f}":>18} {f"{t64:.2f} -> {t32:.2f}":>14} '
+            f'{f"{mixed.refined_at}/{mixed.iteration}":>9} '
+            f'{np.max(np.abs(S32 - S64)) / np.max(np.abs(S64)):>9.1e} {np.max(np.abs(x32 - x64)):>9.1e} '
+            f'{abs(var32 - var64) / var64:>10.1e}')
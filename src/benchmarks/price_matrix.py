@@ -0,0 +1,49 @@
+"""
+BENCHMARK: alignment of the long-format market data into the (T, n_assets) price matrix and the returns, with the
+per-ticker boolean masks and column inserts that Portfolio.compute_returns used against prices.price_matrix.
+
+Run from the src folder with:
+    python -m benchmarks.price_matrix
+"""
+import time
+import warnings
+import numpy as np
+import pandas as pd
+import prices
+
+def long_market_data(n_dates: int, n_assets: int, missing=0.01, seed=0) -> tuple:
+    """Random walks of prices in the long format of the csv files, with a fraction of the rows removed."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('1990-01-01', periods=n_dates, freq='D').strftime('%Y-%m-%d')
+    tickers = [f'T{i}' for i in range(n_assets)]
+    frames = []
+    for ticker in tickers:
+        frame = pd.DataFrame({'adjclose': 100.0 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, n_dates)))}
+                            , index=pd.Index(dates, name='formatted_date'))
+        frame.insert(0, 'ticker', ticker)
+        frames.append(frame[rng.uniform(size=n_dates) >= missing] if ticker != tickers[0] else frame)
+    return pd.concat(frames), tickers
+
+def masked(market_data, tickers) -> np.array:
+    # The inserts fragment the frame and pct_change pads the missing prices, both of them warn
+    warnings.simplefilter('ignore')
+    close_prices = pd.DataFrame()
+    for count, ticker in enumerate(tickers):
+        close_prices.insert(count, ticker, market_data['adjclose'][market_data['ticker'] == ticker])
+    return close_prices.pct_change().to_numpy()
+
+def aligned(market_data, tickers) -> np.array:
+    return prices.simple_returns(prices.price_matrix(market_data, tickers)[1])
+
+if __name__ == "__main__":
+    print(f'{"dates x assets":>16} {"masks (s)":>10} {"matrix (s)":>11} {"speedup":>8} {"same":>6}')
+    for n_dates, n_assets in [(252, 50), (1260, 100), (2520, 500), (2520, 1000)]:
+        market_data, tickers = long_market_data(n_dates, n_assets)
+        begin = time.perf_counter()
+        reference = masked(market_data, tickers)
+        t_masked = time.perf_counter() - begin
+        begin = time.perf_counter()
+        returns = aligned(market_data, tickers)
+        t_aligned = time.perf_counter() - begin
+        same = np.allclose(reference, returns, equal_nan=True, rtol=0.0, atol=1e-15)
+        print(f'{f"{n_dates} x {n_assets}":>16} {t_masked:>10.3f} {t_aligned:>11.4f} {t_masked / t_aligned:>8.1f} {str(same):>6}')
@@ -0,0 +1,75 @@
+"""
+THIS FILE CONTAINS THE SYNTHETIC PROBLEM GENERATORS SHARED BY THE BENCHMARKS.
+"""
+import numpy as np
+
+def random_covariance(n_assets: int, seed=0) -> np.array:
+    """Annualized covariance matrix of random daily returns, with a small ridge to keep it positive definite."""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0, 0.02, (2 * n_assets, n_assets))
+    return np.cov(returns, rowvar=False) * 252 + 1.0e-6 * np.eye(n_assets)
+
+def random_expected_returns(n_assets: int, seed=0) -> np.array:
+    """Random positive daily expected returns."""
+    rng = np.random.default_rng(seed + 1)
+    return rng.uniform(1.0e-4, 2.0e-3, n_assets)
+
+def random_bounds(n_assets: int, seed=0) -> tuple:
+    """Random lower and upper bounds on the weights, the upper ones always allow a full investment."""
+    rng = np.random.default_rng(seed + 2)
+    lower = np.zeros(n_assets)
+    upper = np.minimum(rng.uniform(1.5, 4.0, n_assets) / n_assets, 1.0)
+    return lower, upper
+
+def random_qp(n_assets: int, upper=0.5, seed=0) -> tuple:
+    """Builds a mean-variance problem shaped like Portfolio.preprocess_matrix_qp with a random
+    positive definite covariance matrix, together with a random starting point drawn as in Portfolio.solve_intpoint_QP.
+
+    Returns:
+        the tuple (S, c, A, b, x_init, y_init, lm_init)
+    """
+    rng = np.random.default_rng(seed)
+    S = random_covariance(n_assets, seed)
+    A = np.vstack([-np.eye(n_assets), np.ones(n_assets)])
+    b = np.append(-np.full(n_assets, upper), 1)
+    c = np.zeros(n_assets)
+    return (S, c, A, b
+            , rng.uniform(0.0, 1.0, n_assets)
+            , rng.uniform(0.1, 100.0, n_assets + 1)
+            , rng.uniform(0.1, 100.0, n_assets + 1))
+
+def tableau_lp(mu: np.array, upper: np.array) -> tuple:
+    """Builds the maximum expected return problem in the standard form of Portfolio.split_matrix_lp:
+    one slack variable per upper bound and the full investment row.
+
+    Returns:
+        the tuple (c, A, b)
+    """
+    n_assets = mu.shape[0]
+    A = np.zeros((n_assets + 1, 2 * n_assets))
+    A[:n_assets, :n_assets] = np.eye(n_assets)
+    A[:n_assets, n_assets:] = np.eye(n_assets)
+    A[-1, :n_assets] = 1.0
+    b = np.append(upper, 1.0)
+    c = np.append(mu, np.zeros(n_assets))
+    return c, A, b
+
+def bounded_lp(mu: np.array) -> tuple:
+    """Builds the maximum expected return problem in the bounded form of Portfolio.split_matrix_bounded_lp.
+
+    Returns:
+        the tuple (c, A, b)
+    """
+    return mu, np.ones((1, mu.shape[0])), np.ones(1)
+
+def greedy_lp_solution(mu: np.array, lower: np.array, upper: np.array) -> np.array:
+    """The exact solution of the maximum expected return problem: starting from the lower bounds,
+    the budget left is given to the assets with the highest expected return, up to their upper bound."""
+    weights = lower.copy()
+    budget = 1.0 - lower.sum()
+    for i in np.argsort(-mu):
+        weights[i] += min(upper[i] - lower[i], budget)
+        budget -= weights[i] - lower[i]
+        if budget <= 0:
+            break
+    return weights
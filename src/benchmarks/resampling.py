@@ -0,0 +1,32 @@
+"""
+BENCHMARK: resampled efficient frontier with the returns in shared memory, solved by pools of an increasing
+number of processes. The results must be identical whatever the number of processes.
+
+Run from the src folder with:
+    python -m benchmarks.resampling
+"""
+import os
+import time
+import numpy as np
+import resampling
+from benchmarks.backtest import random_returns, constraints
+
+if __name__ == "__main__":
+    n_days, n_assets, n_samples = 750, 50, 64
+    returns = random_returns(n_days, n_assets).to_numpy()
+    A, b = constraints(n_assets, 5.0 / n_assets)
+    lb, ub = np.zeros(n_assets), np.full(n_assets, 5.0 / n_assets)
+
+    print(f'{os.cpu_count()} cores, {n_samples} samples of {n_days} days x {n_assets} assets')
+    print(f'{"processes":>10} {"storage":>14} {"time (s)":>10} {"samples/s":>10} {"speedup":>8} {"same result":>12}')
+    reference, t_reference = None, None
+    for processes, storage in [(None, '-'), (1, 'shared_memory'), (2, 'shared_memory'), (4, 'shared_memory'), (4, 'memmap')]:
+        start = time.perf_counter()
+        result = resampling.resampled_frontier(returns, A, b, lb, ub, n_samples=n_samples, n_points=10
+                                            , processes=processes
+                                            , storage='shared_memory' if storage == '-' else storage)
+        seconds = time.perf_counter() - start
+        if reference is None:
+            reference, t_reference = result, seconds
+        same = np.array_equal(result['weights'], reference['weights'])
+        print(f'{str(processes):>10} {storage:>14} {seconds:>10.2f} {n_samples / seconds:>10.1f} {t_reference / seconds:>8.2f} {str(same):>12}')
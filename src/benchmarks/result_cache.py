@@ -0,0 +1,74 @@
+"""
+BENCHMARK: the result cache in front of the interior point solver, as Portfolio.solve_intpoint_QP uses it: the time of
+a miss (hashing and solving), of a hit in memory and of a hit on disk from a new cache, and the hit rate of a workload
+of repeated problems with a skewed popularity under a size cap.
+
+Run from the src folder with:
+    python -m benchmarks.result_cache
+"""
+import tempfile
+import time
+import numpy as np
+import result_cache
+from solvers.interior_point import IntPoint
+from benchmarks import problems
+
+def solve(cache, S, S_digest, upper) -> dict:
+    """Looks the problem up in the cache and solves it on a miss."""
+    n_assets = S.shape[0]
+    lb, ub = np.zeros(n_assets), np.full(n_assets, upper)
+    key = result_cache.problem_key('intpoint', {'precision': 'double', 'max_iteration': 100}
+                                , {'S': S_digest, 'lb': lb, 'ub': ub})
+    result = cache.get(key)
+    if result is not None:
+        return result
+    rng = np.random.default_rng(0)
+    A = np.vstack([-np.eye(n_assets), np.ones(n_assets)])
+    b = np.append(-ub, 1.0)
+    intpoint = IntPoint(S, np.zeros(n_assets), A, b
+                        , x_init=rng.uniform(0.0, 1.0, n_assets)
+                        , y_init=rng.uniform(0.1, 100.0, n_assets + 1)
+                        , lm_init=rng.uniform(0.1, 100.0, n_assets + 1)
+                        , history='none')
+    status = intpoint.solve()
+    return cache.put(key, intpoint.solutions, intpoint.metrics['objective'], {'status': status, **intpoint.metrics})
+
+def timed(function, *args, repeat=1) -> float:
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        function(*args)
+    return (time.perf_counter() - begin) / repeat
+
+if __name__ == "__main__":
+    print(f'{"n_assets":>9} {"digest S (ms)":>14} {"miss (ms)":>10} {"memory hit (us)":>16} {"disk hit (us)":>14}')
+    for n_assets in [50, 500, 2000]:
+        S = problems.random_covariance(n_assets)
+        upper = 3.0 / n_assets
+        with tempfile.TemporaryDirectory() as root:
+            t_digest = timed(result_cache.digest, S)
+            S_digest = result_cache.digest(S)
+            cache = result_cache.ResultCache(root)
+            t_miss = timed(solve, cache, S, S_digest, upper)
+            t_memory = timed(solve, cache, S, S_digest, upper, repeat=1000)
+            t_disk = np.mean([timed(solve, result_cache.ResultCache(root), S, S_digest, upper) for _ in range(20)])
+        print(f'{n_assets:>9} {t_digest * 1e3:>14.3f} {t_miss * 1e3:>10.2f} {t_memory * 1e6:>16.1f} {t_disk * 1e6:>14.1f}')
+
+    # 2000 requests over 200 problems of 100 assets, the popularity following a Zipf law
+    n_assets, n_problems, n_requests = 100, 200, 2000
+    S = problems.random_covariance(n_assets)
+    S_digest = result_cache.digest(S)
+    uppers = np.linspace(0.03, 0.5, n_problems)
+    rng = np.random.default_rng(0)
+    requests = np.minimum(rng.zipf(1.3, n_requests) - 1, n_problems - 1)
+    print(f'\n{n_requests} requests over {n_problems} problems of {n_assets} assets')
+    print(f'{"memory entries":>15} {"disk cap (KiB)":>15} {"hit rate":>9} {"memory hits":>12} {"disk hits":>10} {"evictions":>10} {"time (s)":>9}')
+    for max_entries, max_bytes in [(16, 16 * 2**10), (16, 2**20), (256, 2**20)]:
+        with tempfile.TemporaryDirectory() as root:
+            cache = result_cache.ResultCache(root, max_bytes=max_bytes, max_entries=max_entries)
+            begin = time.perf_counter()
+            for problem in requests:
+                solve(cache, S, S_digest, uppers[problem])
+            seconds = time.perf_counter() - begin
+            stats = cache.stats()
+        print(f'{max_entries:>15} {max_bytes // 2**10:>15} {stats["hit_rate"]:>9.3f} {stats["memory_hits"]:>12} '
+            f'{stats["disk_hits"]:>10} {stats["evictions"]:>10} {seconds:>9.2f}')
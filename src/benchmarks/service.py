@@ -0,0 +1,98 @@
+"""
+BENCHMARK: latency of the local optimization service against loading and solving each request from scratch, with
+bursts of identical requests (coalesced into one solve) and of distinct ones (queued on the workers), and the latency
+of the health check while the workers are busy.
+
+Run from the src folder with:
+    python -m benchmarks.service
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import numpy as np
+import optfolio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC = os.path.join(ROOT, 'src')
+TICKERS = ['TSLA', 'GME', 'AAPL', 'JNJ', 'SPCE']
+
+def job(upper=0.4, method='intpoint') -> dict:
+    return {'tickers': TICKERS, 'upper': [upper] * len(TICKERS)
+            , 'start_date': '2020-01-01', 'end_date': '2021-01-01', 'method': method}
+
+async def request(port: int, method: str, path: str, payload=None) -> tuple:
+    """Sends a request on a new connection, returns the status, the json answer and the latency."""
+    begin = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = b'' if payload is None else json.dumps(payload).encode()
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n'
+                f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(content), time.perf_counter() - begin
+
+async def burst(port: int, jobs: list) -> tuple:
+    begin = time.perf_counter()
+    answers = await asyncio.gather(*[request(port, 'POST', '/solve', j) for j in jobs])
+    return time.perf_counter() - begin, [a[2] for a in answers]
+
+async def health_while_busy(port: int, jobs: list) -> float:
+    solves = asyncio.gather(*[request(port, 'POST', '/solve', j) for j in jobs])
+    await asyncio.sleep(0.05)
+    _, _, latency = await request(port, 'GET', '/health')
+    await solves
+    return latency
+
+async def run(port: int, n_burst: int) -> None:
+    _, _, cold = await request(port, 'POST', '/solve', job())
+    warm = [(await request(port, 'POST', '/solve', job(upper)))[2] for upper in np.linspace(0.35, 0.6, 20)]
+    print(f'first request (loads the data): {cold * 1000:8.1f} ms')
+    print(f'resident data, median of 20:    {np.median(warm) * 1000:8.1f} ms')
+
+    before = (await request(port, 'GET', '/metrics'))[1]
+    seconds, latencies = await burst(port, [job(0.45)] * n_burst)
+    after = (await request(port, 'GET', '/metrics'))[1]
+    print(f'{n_burst} identical requests:        {seconds * 1000:8.1f} ms, p95 {np.percentile(latencies, 95) * 1000:.1f} ms'
+        f', {after["solves"] - before["solves"]} solve(s), {after["coalesced"] - before["coalesced"]} coalesced')
+
+    distinct = [job(upper) for upper in np.linspace(0.3, 0.7, n_burst)]
+    seconds, latencies = await burst(port, distinct)
+    after = (await request(port, 'GET', '/metrics'))[1]
+    print(f'{n_burst} distinct requests:         {seconds * 1000:8.1f} ms, p95 {np.percentile(latencies, 95) * 1000:.1f} ms'
+        f', max queue depth {after["max_queue_depth"]}')
+
+    latency = await health_while_busy(port, [job(upper) for upper in np.linspace(0.31, 0.71, n_burst)])
+    print(f'health check while busy:        {latency * 1000:8.1f} ms')
+    print('metrics:', json.dumps((await request(port, 'GET', '/metrics'))[1]))
+
+if __name__ == "__main__":
+    n_burst = 50
+    # Baseline: each request loads the market data and solves from scratch
+    os.chdir(ROOT)
+    optfolio.load_solvers()
+    times = [optfolio.run_job(0, job(upper))['seconds'] for upper in np.linspace(0.35, 0.6, 20)]
+    print(f'from scratch, median of 20:     {np.median(times) * 1000:8.1f} ms')
+
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    server = subprocess.Popen([sys.executable, os.path.join(SRC, 'service.py'), '--port', str(port), '-w', '2']
+                            , cwd=ROOT, stdout=subprocess.PIPE, env={**os.environ, 'PYTHONPATH': SRC})
+    try:
+        server.stdout.readline()
+        asyncio.run(run(port, n_burst))
+    finally:
+        # SIGTERM: the service shuts its workers down before exiting
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+        server.stdout.close()
@@ -0,0 +1,54 @@
+"""
+BENCHMARK: per-pivot time of the Simplex tableau update, rank-1 NumPy update against the former row by row loop.
+
+Run from the src folder with:
+    python -m benchmarks.simplex_pivot
+"""
+import time
+import numpy as np
+from solvers.simplex import Simplex
+
+def random_lp(n_eq: int, n_vars: int, seed=0) -> tuple:
+    """Builds a random dense LP max c.T @ x s.t. A @ x <= b, x >= 0 with the slack variables already added."""
+    rng = np.random.default_rng(seed)
+    A = np.hstack([rng.uniform(0.1, 1.0, (n_eq, n_vars)), np.eye(n_eq)])
+    b = rng.uniform(1.0, 10.0, n_eq)
+    c = np.append(rng.uniform(0.1, 1.0, n_vars), np.zeros(n_eq))
+    return c, A, b
+
+def loop_pivoting(tableau, n_eq):
+    """The former pivoting: Python lists for the ratio test and a loop over the rows for the update."""
+    col_idx = np.argmin(tableau[-1, :-1], axis=0)
+    ratios = []
+    for i, val in enumerate(tableau[:-1, col_idx]):
+        ratios.append(np.inf if val <= 0 else tableau[i, -1] / val)
+    row_idx = np.argmin(ratios)
+
+    tableau[row_idx, :] = tableau[row_idx, :] / tableau[row_idx, col_idx]
+    for i in range(n_eq + 1):
+        row = tableau[i, :]
+        if i != row_idx and row[col_idx] != 0:
+            tableau[i, :] = row - row[col_idx] * tableau[row_idx, :]
+
+def time_pivots(n_eq, n_vars, n_pivots=20) -> tuple:
+    c, A, b = random_lp(n_eq, n_vars)
+    slex = Simplex(c, A, b)
+    slex.create_tableau()
+    legacy = slex.tableau.copy()
+
+    start = time.perf_counter()
+    for _ in range(n_pivots):
+        loop_pivoting(legacy, n_eq)
+    t_loop = (time.perf_counter() - start) / n_pivots
+
+    start = time.perf_counter()
+    for _ in range(n_pivots):
+        slex.apply_pivoting()
+    t_vector = (time.perf_counter() - start) / n_pivots
+    return t_loop, t_vector, np.max(np.abs(legacy - slex.tableau))
+
+if __name__ == "__main__":
+    print(f'{"m x n":>12} {"loop (s)":>12} {"rank-1 (s)":>12} {"speedup":>10} {"max |diff|":>12}')
+    for n_eq, n_vars in [(10, 20), (50, 100), (200, 400), (500, 1000), (1000, 2000)]:
+        t_loop, t_vector, diff = time_pivots(n_eq, n_vars)
+        print(f'{f"{n_eq} x {n_vars}":>12} {t_loop:>12.6f} {t_vector:>12.6f} {t_loop / t_vector:>10.1f} {diff:>12.2e}')
@@ -0,0 +1,46 @@
+"""
+BENCHMARK: IntPoint with the constraint matrix stored as a scipy.sparse matrix against the dense one,
+with bounds, full investment and sector rows.
+
+Run from the src folder with:
+    python -m benchmarks.sparse_constraints
+"""
+import time
+import numpy as np
+from scipy import sparse
+from solvers.interior_point import IntPoint
+from benchmarks import problems
+
+def sector_constraints(n_assets: int, n_sectors: int, seed=0) -> tuple:
+    """Upper bounds, full investment and a cap of 2 / n_sectors on the weight of each sector, as A @ x >= b."""
+    rng = np.random.default_rng(seed)
+    _, upper = problems.random_bounds(n_assets, seed)
+    sectors = rng.integers(0, n_sectors, n_assets)
+    membership = sparse.csr_matrix((np.ones(n_assets), (sectors, np.arange(n_assets))), shape=(n_sectors, n_assets))
+    A = sparse.vstack([-sparse.identity(n_assets), np.ones((1, n_assets)), -membership], format='csr')
+    b = np.concatenate([-upper, [1.0], np.full(n_sectors, -2.0 / n_sectors)])
+    return A, b
+
+def solve(S, A, b, seed=0) -> tuple:
+    rng = np.random.default_rng(seed)
+    intpoint = IntPoint(S, np.zeros(S.shape[0]), A, b
+                        , x_init=rng.uniform(0.0, 1.0, S.shape[0])
+                        , y_init=rng.uniform(0.1, 100.0, A.shape[0])
+                        , lm_init=rng.uniform(0.1, 100.0, A.shape[0]))
+    start = time.perf_counter()
+    intpoint.solve()
+    return (time.perf_counter() - start) / intpoint.iteration, intpoint.hsol[-1]
+
+if __name__ == "__main__":
+    print(f'{"n_assets":>10} {"A dense (MB)":>13} {"A sparse (MB)":>14} {"dense s/it":>11} {"sparse s/it":>12} {"max |dx|":>10}')
+    for n_assets in [100, 500, 1000, 2000]:
+        S = problems.random_covariance(n_assets)
+        A, b = sector_constraints(n_assets, n_sectors=20)
+        dense_A = A.toarray()
+
+        t_dense, x_dense = solve(S, dense_A, b)
+        t_sparse, x_sparse = solve(S, A, b)
+
+        sparse_bytes = A.data.nbytes + A.indices.nbytes + A.indptr.nbytes
+        print(f'{n_assets:>10} {dense_A.nbytes / 2**20:>13.2f} {sparse_bytes / 2**20:>14.3f} '
+            f'{t_dense:>11.5f} {t_sparse:>12.5f} {np.max(np.abs(x_dense - x_sparse)):>10.2e}')
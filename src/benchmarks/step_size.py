@@ -0,0 +1,61 @@
+"""
+BENCHMARK: closed form fraction to the boundary step lengths against the former backtracking loops in IntPoint.
+
+Run from the src folder with:
+    python -m benchmarks.step_size
+"""
+import time
+import numpy as np
+from solvers.interior_point import IntPoint
+from benchmarks.problems import random_qp
+
+class LoopStepIntPoint(IntPoint):
+    """IntPoint with the step lengths computed by shrinking the step by 0.01 until the point is feasible,
+    as it was done before the closed form ratio test."""
+
+    def compute_affine_step_size(self, y_k, lm_k, dy_aff, dlm_aff) -> np.float64:
+        step = 1.0
+        arr_k = np.concatenate([y_k, lm_k])
+        arr_aff = np.concatenate([dy_aff, dlm_aff])
+        while any((arr_k + step * arr_aff) < np.zeros(2*self.n_eq)) and step > 0:
+            step -= 0.01
+        return step
+
+    def compute_primal_dual_step_size(self, y_k, lm_k, dy, dlm) -> tuple:
+        tau = 1 - 0.5**(self.iteration + 1)
+        decrement = 0.01
+
+        step_primal = 1.0
+        while any(y_k + step_primal * dy < (1 - tau) * y_k) and step_primal > 0:
+            step_primal -= decrement
+
+        step_dual = 1.0
+        while any(lm_k + step_dual * dlm < (1 - tau) * lm_k) and step_dual > 0:
+            step_dual -= decrement
+        step = np.min([step_primal, step_dual])
+        return step, step
+
+def run(solver_class, n_assets, seeds, **kwargs) -> tuple:
+    """Solves the same random problems with the given solver class, returns the mean number of
+    iterations, the mean time per iteration and the mean objective value."""
+    iterations, times, objectives = [], [], []
+    for seed in seeds:
+        S, c, A, b, x_init, y_init, lm_init = random_qp(n_assets, seed=seed)
+        intpoint = solver_class(S, c, A, b, x_init=x_init, y_init=y_init, lm_init=lm_init, **kwargs)
+        start = time.perf_counter()
+        intpoint.solve()
+        elapsed = time.perf_counter() - start
+        iterations.append(intpoint.iteration)
+        times.append(elapsed / max(intpoint.iteration, 1))
+        objectives.append(intpoint.objective_function(intpoint.hsol[-1]))
+    return np.mean(iterations), np.mean(times), np.mean(objectives)
+
+if __name__ == "__main__":
+    seeds = range(5)
+    print(f'{"n_assets":>10} {"method":>10} {"iterations":>12} {"s/iteration":>12} {"objective":>12}')
+    for n_assets in [10, 50, 200, 800]:
+        for name, solver_class, kwargs in [('loop', LoopStepIntPoint, {})
+                                        , ('exact', IntPoint, {})
+                                        , ('split', IntPoint, {'split_step': True})]:
+            iterations, per_iteration, objective = run(solver_class, n_assets, seeds, **kwargs)
+            print(f'{n_assets:>10} {name:>10} {iterations:>12.1f} {per_iteration:>12.6f} {objective:>12.6f}')
@@ -0,0 +1,65 @@
+"""
+BENCHMARK: single-pass streaming estimation of the mean and the covariance of the returns from the columnar store
+against loading the whole history in memory as Portfolio.compute_returns does, on synthetic long histories.
+
+Run from the src folder with:
+    python -m benchmarks.streaming
+"""
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import prices
+import store
+import streaming
+
+# Above this number of dates the in-memory estimate is not computed
+MAX_IN_MEMORY = 20000
+
+def random_store(root: str, n_dates: int, n_assets: int, seed=0) -> list:
+    """Writes random walks of prices for n_assets tickers over n_dates days to a store and returns the tickers."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('1700-01-01', periods=n_dates, freq='D').strftime('%Y-%m-%d')
+    market_store = store.MarketDataStore(root)
+    tickers = [f'T{i}' for i in range(n_assets)]
+    for ticker in tickers:
+        prices = 100.0 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, n_dates)))
+        frame = pd.DataFrame({field: prices for field in store.FIELDS}, index=pd.Index(dates, name='formatted_date'))
+        frame.insert(0, 'ticker', ticker)
+        market_store.write(frame, dates[0], dates[-1])
+    return tickers
+
+def in_memory(market_store, tickers) -> tuple:
+    market_data = market_store.load(tickers, None, None)
+    returns = prices.simple_returns(prices.price_matrix(market_data, tickers)[1])
+    return prices.mean_returns(returns), prices.covariance(returns)
+
+def streamed(market_store, tickers) -> tuple:
+    moments = streaming.streaming_moments(streaming.store_price_chunks(market_store, tickers, chunk_size=5000), len(tickers))
+    return moments.mean, moments.covariance()
+
+def measure(estimate, *args) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = estimate(*args)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+if __name__ == "__main__":
+    n_assets = 200
+    print(f'{"dates x assets":>16} {"pandas (s)":>11} {"pandas MiB":>11} {"stream (s)":>11} {"stream MiB":>11} {"max |dS|":>10}')
+    for n_dates in [5000, 20000, 50000, 200000]:
+        with tempfile.TemporaryDirectory() as root:
+            tickers = random_store(root, n_dates, n_assets)
+            market_store = store.MarketDataStore(root)
+
+            (_, S_stream), t_stream, peak_stream = measure(streamed, market_store, tickers)
+            pandas = ('-', '-', '-')
+            if n_dates <= MAX_IN_MEMORY:
+                (_, S_pandas), t_pandas, peak_pandas = measure(in_memory, market_store, tickers)
+                pandas = (f'{t_pandas:.2f}', f'{peak_pandas / 2**20:.1f}', f'{np.max(np.abs(S_pandas - S_stream)):.2e}')
+            print(f'{f"{n_dates} x {n_assets}":>16} {pandas[0]:>11} {pandas[1]:>11} {t_stream:>11.2f} '
+                f'{peak_stream / 2**20:>11.1f} {pandas[2]:>10}')
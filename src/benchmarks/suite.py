@@ -0,0 +1,142 @@
+"""
+BENCHMARK SUITE: scaling of the solvers on synthetic portfolio problems.
+
+For each solver and number of assets it records the wall time, the number of iterations, the peak memory
+allocated during the solve and the accuracy of the solution against a reference, and it writes everything
+to a json file so that the results of different commits can be compared. It runs offline.
+
+Run from the src folder with:
+    python -m benchmarks.suite --output bench.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+import numpy as np
+from scipy.optimize import minimize
+from solvers.simplex import Simplex
+from solvers.revised_simplex import RevisedSimplex
+from solvers.interior_point import IntPoint
+from benchmarks import problems
+
+# Largest problems each solver is run on: the tableau grows with the square of the number of assets
+MAX_ASSETS = {'simplex': 1000, 'revised_simplex': 5000, 'interior_point': 2000}
+# Above this size there is no reference solution for the quadratic problem
+MAX_QP_REFERENCE = 200
+
+def run_simplex(n_assets: int, seed: int) -> dict:
+    mu = problems.random_expected_returns(n_assets, seed)
+    lower, upper = problems.random_bounds(n_assets, seed)
+    c, A, b = problems.tableau_lp(mu, upper)
+
+    def solve():
+        slex = Simplex(c, A, b, max_iteration=10 * n_assets)
+        slex.solve()
+        return slex
+    slex, seconds, peak = measure(solve)
+
+    weights = slex.solutions
+    reference = problems.greedy_lp_solution(mu, np.zeros(n_assets), upper)
+    return record(seconds, slex.iteration, peak, mu @ weights, mu @ reference
+                , lp_violation(weights, np.zeros(n_assets), upper))
+
+def run_revised_simplex(n_assets: int, seed: int) -> dict:
+    mu = problems.random_expected_returns(n_assets, seed)
+    lower, upper = problems.random_bounds(n_assets, seed)
+    c, A, b = problems.bounded_lp(mu)
+
+    def solve():
+        slex = RevisedSimplex(c, A, b, lower, upper)
+        slex.solve()
+        return slex
+    slex, seconds, peak = measure(solve)
+
+    weights = slex.solutions
+    reference = problems.greedy_lp_solution(mu, lower, upper)
+    return record(seconds, slex.iteration, peak, mu @ weights, mu @ reference
+                , lp_violation(weights, lower, upper))
+
+def run_interior_point(n_assets: int, seed: int) -> dict:
+    _, upper = problems.random_bounds(n_assets, seed)
+    S, c, A, _, x_init, y_init, lm_init = problems.random_qp(n_assets, seed=seed)
+    b = np.append(-upper, 1)
+
+    def solve():
+        intpoint = IntPoint(S, c, A, b, x_init=x_init.copy(), y_init=y_init.copy(), lm_init=lm_init.copy())
+        intpoint.solve()
+        return intpoint
+    intpoint, seconds, peak = measure(solve)
+
+    weights = intpoint.hsol[-1]
+    reference = None
+    if n_assets <= MAX_QP_REFERENCE:
+        result = minimize(lambda x: 0.5 * x @ S @ x, np.full(n_assets, 1.0 / n_assets)
+                        , jac=lambda x: S @ x
+                        , constraints=[{'type': 'ineq', 'fun': lambda x: A @ x - b, 'jac': lambda x: A}]
+                        , method='SLSQP'
+                        , options={'ftol': 1.0e-14, 'maxiter': 1000})
+        reference = 0.5 * result.x @ S @ result.x
+    return record(seconds, intpoint.iteration, peak, 0.5 * weights @ S @ weights, reference
+                , float(np.max(np.maximum(b - A @ weights, 0.0))))
+
+SOLVERS = {'simplex': run_simplex, 'revised_simplex': run_revised_simplex, 'interior_point': run_interior_point}
+
+def measure(solve) -> tuple:
+    """Runs the solve twice: once for the wall time and once under tracemalloc for the peak memory,
+    since tracing the allocations slows down the execution."""
+    start = time.perf_counter()
+    solve()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    solver = solve()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return solver, seconds, peak
+
+def lp_violation(weights, lower, upper) -> float:
+    """Largest violation of the bounds and of the full investment constraint."""
+    return float(max(np.max(lower - weights), np.max(weights - upper), abs(weights.sum() - 1.0), 0.0))
+
+def record(seconds, iterations, peak, objective, reference, violation) -> dict:
+    error = None if reference is None else float(abs(objective - reference) / max(abs(reference), 1.0e-12))
+    return {'seconds': seconds
+            , 'iterations': int(iterations)
+            , 'peak_memory_bytes': int(peak)
+            , 'objective': float(objective)
+            , 'reference_objective': None if reference is None else float(reference)
+            , 'relative_error': error
+            , 'max_violation': violation}
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Scaling benchmark of the portfolio solvers')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 100, 200, 500, 1000, 2000, 5000])
+    parser.add_argument('--solvers', nargs='+', default=list(SOLVERS), choices=list(SOLVERS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench.json')
+    args = parser.parse_args()
+
+    results = []
+    for solver in args.solvers:
+        for n_assets in args.sizes:
+            if n_assets > MAX_ASSETS[solver]:
+                continue
+            result = {'solver': solver, 'n_assets': n_assets, **SOLVERS[solver](n_assets, args.seed)}
+            results.append(result)
+            print(f"{solver:>16} {n_assets:>6} {result['seconds']:>10.4f}s {result['iterations']:>6} it "
+                f"{result['peak_memory_bytes'] / 2**20:>10.2f} MiB  error {result['relative_error']}")
+
+    with open(args.output, 'w') as f:
+        json.dump({'commit': git_commit()
+                , 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+                , 'python': platform.python_version()
+                , 'numpy': np.__version__
+                , 'results': results}, f, indent=2)
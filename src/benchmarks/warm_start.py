@@ -0,0 +1,53 @@
+"""
+BENCHMARK: re-solves of the minimum variance problem after small changes of the covariance matrix and of the bounds,
+as in intraday re-optimizations, warm-started from the previous solution against the random starting point
+of Portfolio.solve_intpoint_QP.
+
+Run from the src folder with:
+    python -m benchmarks.warm_start
+"""
+import time
+import numpy as np
+from solvers.interior_point import IntPoint
+from benchmarks import problems
+
+def perturbations(S: np.array, b: np.array, n_changes: int, seed=0):
+    """Yields n_changes problems, each one a small change of the previous: the covariance is blended with the one of
+    a few new days of returns and the upper bounds move by up to 5%."""
+    rng = np.random.default_rng(seed)
+    n_assets = S.shape[0]
+    for _ in range(n_changes):
+        returns = rng.normal(0.0, 0.02, (5, n_assets))
+        S = 0.98 * S + 0.02 * returns.T @ returns / 5 * 252
+        b = b.copy()
+        b[:-1] *= rng.uniform(0.95, 1.05, n_assets)
+        yield S, b
+
+def solve(S, A, b, start, warm_start) -> tuple:
+    x, y, lm = start
+    intpoint = IntPoint(S, np.zeros(S.shape[0]), A, b, x_init=x, y_init=y, lm_init=lm
+                        , warm_start=warm_start, history='none')
+    begin = time.perf_counter()
+    intpoint.solve()
+    return intpoint, time.perf_counter() - begin
+
+if __name__ == "__main__":
+    n_changes = 20
+    print(f'{"n_assets":>10} {"cold it":>8} {"cold (s)":>10} {"cold var":>10} {"warm it":>8} {"warm (s)":>10} {"warm var":>10}')
+    for n_assets in [50, 200, 1000]:
+        S, c, A, b, _, _, _ = problems.random_qp(n_assets, upper=3.0 / n_assets)
+        rng = np.random.default_rng(1)
+        random_start = lambda: (rng.uniform(0.0, 1.0, n_assets), rng.uniform(0.1, 100.0, A.shape[0]), rng.uniform(0.1, 100.0, A.shape[0]))
+
+        previous, _ = solve(S, A, b, random_start(), warm_start=False)
+        cold, warm = [], []
+        for S_k, b_k in perturbations(S, b, n_changes):
+            intpoint, seconds = solve(S_k, A, b_k, random_start(), warm_start=False)
+            cold.append((intpoint.iteration, seconds, intpoint.solutions @ S_k @ intpoint.solutions))
+
+            start = (previous.solutions.copy(), None, previous.lambdas.copy())
+            previous, seconds = solve(S_k, A, b_k, start, warm_start=True)
+            warm.append((previous.iteration, seconds, previous.solutions @ S_k @ previous.solutions))
+
+        cold, warm = np.mean(cold, axis=0), np.mean(warm, axis=0)
+        print(f'{n_assets:>10} {cold[0]:>8.1f} {cold[1]:>10.4f} {cold[2]:>10.6f} {warm[0]:>8.1f} {warm[1]:>10.4f} {warm[2]:>10.6f}')
@@ -1,27 +1,133 @@
+"""
+THIS FILE CONTAINS THE DOWNLOAD OF THE MARKET DATA.
+
+The tickers are fetched concurrently by a bounded pool of threads, each fetch is retried with an exponential backoff.
+The fetch backend is a function (ticker, start_date, end_date) -> (data, bytes) so that it can be replaced, by
+default it is finance.yahoo.com. The downloaded data are kept per ticker in the columnar store, and only the
+tickers and the date ranges it does not cover yet are fetched.
+"""
+import json
+import random
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 import pandas as pd
-from yahoofinancials import YahooFinancials
+import store
+
+COLUMNS = ['ticker'] + store.FIELDS
+
+def prices_frame(ticker: str, raw: dict) -> pd.DataFrame:
+    """Converts the historical prices in the format of finance.yahoo.com to the long format of the csv files."""
+    prices = raw[ticker]['prices'] if ticker in raw else raw['prices']
+    if len(prices) == 0:
+        return pd.DataFrame(columns=COLUMNS, index=pd.Index([], name='formatted_date'))
+    tickerDf = pd.DataFrame(prices).set_index('formatted_date')
+    tickerDf.insert(0, 'ticker', ticker, True)
+    return tickerDf[COLUMNS]
+
+def yahoo_fetcher(ticker: str, start_date: str, end_date: str) -> tuple:
+    """Fetches the daily prices of the ticker from finance.yahoo.com."""
+    # TO REMOVE IF YAHOOFINANCIALS IS NOT PRESENT
+    from yahoofinancials import YahooFinancials
 
-def get_history_data(tickers:List[str], start_date:str, end_date:str):
-    """The method downloads the history of data from finance.yahoo.com
-    of the given symbols.
+    raw = YahooFinancials(ticker).get_historical_price_data(start_date, end_date, time_interval='daily')
+    return prices_frame(ticker, raw), len(json.dumps(raw))
+
+def http_fetcher(url: str, timeout=30.0):
+    """Returns a fetcher reading the daily prices from an http server in the json format of finance.yahoo.com,
+    url is a template with the fields {ticker}, {start_date} and {end_date}."""
+    def fetch(ticker: str, start_date: str, end_date: str) -> tuple:
+        with urllib.request.urlopen(url.format(ticker=ticker, start_date=start_date, end_date=end_date)
+                                    , timeout=timeout) as response:
+            body = response.read()
+        return prices_frame(ticker, json.loads(body)), len(body)
+    return fetch
+
+def fetch_with_retries(fetcher, ticker: str, start_date: str, end_date: str, retries=3, backoff=0.5) -> dict:
+    """Calls the fetcher until it succeeds, waiting backoff * 2^attempt seconds (with some jitter) after each failure.
+
+    Returns:
+        a dictionary with the data, the bytes received, the latency in seconds and the number of attempts
     """
+    start = time.perf_counter()
+    for attempt in range(retries + 1):
+        try:
+            frame, n_bytes = fetcher(ticker, start_date, end_date)
+            return {'data': frame, 'bytes': n_bytes, 'latency': time.perf_counter() - start, 'attempts': attempt + 1}
+        except Exception as error:
+            if attempt == retries:
+                raise Exception(f"STOPPED EXECUTION: DOWNLOAD OF {ticker} FAILED AFTER {retries + 1} ATTEMPTS") from error
+            time.sleep(backoff * 2**attempt * (1.0 + random.random()))
+
+def missing_ranges(market_store, ticker: str, start_date: str, end_date: str) -> list:
+    """The date ranges between start_date and end_date that the store does not hold for the ticker,
+    chosen so that the stored range stays contiguous."""
+    coverage = market_store.coverage(ticker)
+    if coverage is None:
+        return [(start_date, end_date)]
+    ranges = []
+    if start_date < coverage[0]:
+        ranges.append((start_date, coverage[0]))
+    if end_date > coverage[1]:
+        ranges.append((coverage[1], end_date))
+    return ranges
+
+def get_history_data(tickers:List[str], start_date:str, end_date:str
+                    , fetcher=None
+                    , max_workers=8
+                    , retries=3
+                    , backoff=0.5
+                    , market_store=None
+                    , save_csv=True) -> tuple:
+    """The method downloads the history of data of the given symbols, by default from finance.yahoo.com.
+    Only the tickers and date ranges missing from the store are fetched, max_workers at a time.
+
+    Args:
+        fetcher: the function (ticker, start_date, end_date) -> (data, bytes) used to download a ticker
+        max_workers: the maximum number of concurrent downloads
+        retries, backoff: the number of retries of a failed download and the initial wait between them in seconds
+        market_store: the store used as per-ticker cache, MarketDataStore() by default
+        save_csv: if True the data are also saved to the csv file read by Portfolio.get_market_data
+
+    Returns:
+        the data in the long format of the csv files and a report with the latency, the bytes and the attempts
+        of the downloads of each ticker
+    """
+    fetcher = yahoo_fetcher if fetcher is None else fetcher
+    market_store = store.MarketDataStore() if market_store is None else market_store
+
     print('...Downloading data...')
     print(f'Starting date: {start_date}')
     print(f'Ending date: {end_date}')
 
-    frames = []
-    for ticker in tickers:
-        tickerData = YahooFinancials(ticker).get_historical_price_data(start_date,
-                                                                        end_date,
-                                                                        time_interval='daily')
-        tickerDf = pd.DataFrame(tickerData[ticker]['prices']).drop('date', axis=1).set_index('formatted_date')
-        tickerDf.insert(0, 'ticker', ticker, True)
+    jobs = [(ticker, first, last) for ticker in tickers for first, last in missing_ranges(market_store, ticker, start_date, end_date)]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(fetch_with_retries, fetcher, ticker, first, last, retries, backoff) for ticker, first, last in jobs]
+        results = [future.result() for future in futures]
+
+    report = pd.DataFrame(0.0, index=pd.Index(tickers, name='ticker'), columns=['latency', 'bytes', 'attempts'])
+    fetched, spans = {}, {}
+    for (ticker, first, last), result in zip(jobs, results):
+        report.loc[ticker] += [result['latency'], result['bytes'], result['attempts']]
+        fetched.setdefault(ticker, []).append(result['data'])
+        # The span actually fetched, which touches the stored range when the requested one does not
+        span = spans.get(ticker, (start_date, end_date))
+        spans[ticker] = (min(span[0], first), max(span[1], last))
+
+    # The store is written by this thread only
+    for ticker, frames in fetched.items():
+        market_store.merge(pd.concat(frames), *spans[ticker], tickers=[ticker])
+    if not market_store.covers(tickers, start_date, end_date):
+        raise Exception(f"STOPPED EXECUTION: THE STORE DOES NOT COVER {start_date} TO {end_date} FOR ALL OF {tickers}")
 
-        # tickerDf.to_csv(f'./src/1.0.1/data/{ticker}.csv')
-        frames.append(tickerDf)
+    for ticker, row in report.iterrows():
+        status = 'cached' if row['attempts'] == 0 else f"{row['latency']:.2f}s {int(row['bytes'])} bytes {int(row['attempts'])} attempts"
+        print(f'{ticker}: {status}')
 
-    print('...saving data to file...')
-    DATA = pd.concat(frames)
-    DATA.to_csv(f'./src/data/ASSET_DATA_{start_date}_to_{end_date}_{tickers}.csv')
+    DATA = market_store.load(tickers, start_date, end_date)
+    if save_csv:
+        print('...saving data to file...')
+        DATA.to_csv(f'./src/data/ASSET_DATA_{start_date}_to_{end_date}_{tickers}.csv')
     print('Procedure complete!')
+    return DATA, report
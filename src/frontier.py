@@ -0,0 +1,139 @@
+"""
+THIS FILE CONTAINS THE METHODS TO COMPUTE THE EFFICIENT FRONTIER of the mean-variance portfolio problem.
+
+Each point of the frontier is the minimum variance portfolio for a target expected return:
+    min x^T S x s.t. A @ x >= b, mu^T @ x >= target
+Neighbouring targets have close solutions, so each problem is warm-started from the solution of the previous one.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from solvers import interior_point
+
+def solve_frontier_chunk(S: np.array
+                        , A: np.array
+                        , b: np.array
+                        , targets: np.array
+                        , warm_start=True
+                        , max_iteration=100
+                        , rng=None) -> tuple:
+    """Solves in sequence the minimum variance problems for the given targets. The last row of A holds the
+    expected returns, its constant in b is replaced by each target. The random starting points are drawn from
+    rng, a np.random.Generator, or from the global numpy generator if it is None.
+
+    Returns:
+        the weights of the solutions, one per row, the number of iterations and the status of each solve
+    """
+    n_assets = A.shape[1]
+    c = np.zeros(n_assets)
+    rng = np.random if rng is None else rng
+    weights = np.zeros((targets.shape[0], n_assets))
+    iterations = np.zeros(targets.shape[0], dtype=int)
+    statuses = np.empty(targets.shape[0], dtype=object)
+
+    previous = None
+    for i, target in enumerate(targets):
+        b_target = np.append(b[:-1], target)
+        if previous is None or not warm_start:
+            intpoint = interior_point.IntPoint(S, c, A, b_target
+                                            , x_init=rng.uniform(0.0, 1.0, [n_assets,])
+                                            , y_init=rng.uniform(0.1, 100.0, [A.shape[0],])
+                                            , lm_init=rng.uniform(0.1, 100.0, [A.shape[0],])
+                                            , max_iteration=max_iteration
+                                            , history='none')
+        else:
+            x, lm = previous
+            intpoint = interior_point.IntPoint(S, c, A, b_target
+                                            , x_init=x
+                                            , y_init=A @ x - b_target
+                                            , lm_init=lm
+                                            , max_iteration=max_iteration
+                                            , warm_start=True
+                                            , history='none')
+        statuses[i] = intpoint.solve()
+        # A failed solve is not a good starting point for the next target
+        previous = (intpoint.solutions, intpoint.lambdas) if statuses[i] == interior_point.OPTIMAL else None
+        weights[i] = intpoint.solutions
+        iterations[i] = intpoint.iteration
+    return weights, iterations, statuses
+
+def solve_frontier(S: np.array
+                    , mu: np.array
+                    , A: np.array
+                    , b: np.array
+                    , max_return: np.float64
+                    , n_points=20
+                    , warm_start=True
+                    , processes=None
+                    , rng=None) -> tuple:
+    """Solves the minimum variance problems of n_points target returns evenly spaced between the return of the
+    minimum variance portfolio and max_return. See efficient_frontier for the arguments.
+
+    Returns:
+        the weights of the portfolios (one per row) and the status of each solve. If the minimum variance portfolio
+        is not solved, the targets are unknown and all the points have its status
+    """
+    S = np.asarray(S, dtype=np.float64)
+    mu = np.asarray(mu, dtype=np.float64)
+
+    # The return constraint is scaled to have coefficients of the same magnitude of the other ones
+    scale = np.max(np.abs(mu))
+    A_frontier = np.vstack([A, mu / scale])
+    b_frontier = np.append(b, 0.0)
+
+    # The first point is the minimum variance portfolio, where the return constraint is not active:
+    # it is solved without the return row, the last constant (full investment) stays the same
+    min_variance, _, status = solve_frontier_chunk(S, A, b, b[-1:], rng=rng)
+    if status[0] != interior_point.OPTIMAL:
+        return np.full((n_points, A.shape[1]), np.nan), np.full(n_points, status[0], dtype=object)
+    targets = np.linspace(mu @ min_variance[0], max_return, n_points) / scale
+
+    if processes is None:
+        weights, _, statuses = solve_frontier_chunk(S, A_frontier, b_frontier, targets, warm_start, rng=rng)
+    else:
+        chunks = np.array_split(targets, processes)
+        with ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(solve_frontier_chunk
+                                    , [S] * processes
+                                    , [A_frontier] * processes
+                                    , [b_frontier] * processes
+                                    , chunks
+                                    , [warm_start] * processes))
+            weights = np.vstack([w for w, _, _ in results])
+            statuses = np.concatenate([s for _, _, s in results])
+    return weights, statuses
+
+def efficient_frontier(S: np.array
+                        , mu: np.array
+                        , A: np.array
+                        , b: np.array
+                        , max_return: np.float64
+                        , n_points=20
+                        , warm_start=True
+                        , processes=None
+                        , rng=None) -> tuple:
+    """Computes n_points portfolios of the efficient frontier, with target returns evenly spaced between
+    the return of the minimum variance portfolio and max_return.
+
+    Args:
+        S: the covariance matrix of the returns
+        mu: the expected returns of the assets
+        A, b: the constraints A @ x >= b of the minimum variance problem, as given by Portfolio.preprocess_matrix_qp
+        max_return: the maximum expected return that satisfies the constraints
+        n_points: the number of portfolios on the frontier
+        warm_start: each solve starts from the solution for the previous target
+        processes: if given, the grid is split in as many chunks, solved in parallel by a pool of processes
+        rng: the np.random.Generator of the random starting points of the sequential solves, see solve_frontier_chunk
+
+    Returns:
+        the weights of the portfolios (one per row), their risk (standard deviation) and their expected return
+    """
+    S = np.asarray(S, dtype=np.float64)
+    mu = np.asarray(mu, dtype=np.float64)
+    weights, statuses = solve_frontier(S, mu, A, b, max_return, n_points, warm_start, processes, rng)
+    failed = np.flatnonzero(statuses != interior_point.OPTIMAL)
+    if failed.shape[0] > 0:
+        raise Exception(f"STOPPED EXECUTION: FRONTIER POINTS {failed.tolist()} NOT SOLVED ({', '.join(sorted(set(statuses[failed])))})")
+
+    risks = np.sqrt(np.einsum('ij,jk,ik->i', weights, S, weights))
+    returns = weights @ mu
+    return weights, risks, returns
@@ -0,0 +1,164 @@
+"""
+THIS FILE CONTAINS THE COMMAND LINE INTERFACE TO RUN BATCHES OF PORTFOLIO OPTIMIZATIONS.
+
+The jobs are read from a JSONL file (one json object per line) and the results are written as JSONL as soon as
+each job is done, in the order they complete:
+
+    python src/optfolio.py jobs.jsonl [-o results.jsonl] [-w WORKERS]
+
+run from the root of the repository, where the market data are. A job is
+
+    {"id": "a", "tickers": ["AAPL", "JNJ"], "lower": [0, 0], "upper": [0.6, 0.6],
+     "start_date": "2020-01-01", "end_date": "2021-01-01", "method": "intpoint"}
+
+where method is 'intpoint' for the minimum variance portfolio (the default), 'revised' or 'tableau' for the maximum
+expected return one, and the bounds default to 0 and 1. The id defaults to the line number of the job.
+
+Only the standard library is imported at startup: numpy, pandas and the solvers are imported when the first job
+is run, so a worker that is started for a few jobs, or only to print the usage, starts fast.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+METHODS = ('intpoint', 'revised', 'tableau')
+
+def load_solvers() -> None:
+    """Imports the modules needed to run the jobs. Called before the worker processes are forked,
+    they inherit the modules instead of importing them again."""
+    import portfolio  # noqa: F401
+
+def read_jobs(lines) -> tuple:
+    """Yields the (id, job) of each non-empty line, job being the error message if the line is not a json object."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError('a job must be a json object')
+        except ValueError as error:
+            yield number, str(error)
+            continue
+        yield job.get('id', number), job
+
+def run_job(job_id, job, portfolios=None) -> dict:
+    """Solves the portfolio problem of the job.
+
+    Args:
+        job_id, job: as yielded by read_jobs
+        portfolios: an optional dictionary from (tickers, start_date, end_date) to the Portfolio loaded for them, used
+            and filled by the job so that the market data and the statistics stay resident from a job to the next.
+            The portfolio of the job is moved to its end, so the dictionary is in least recently used order
+
+    Returns:
+        a dictionary with the id and the status of the job and, if it is 'ok', the weights, the expected daily return,
+        the annualized variance and standard deviation of the portfolio and the time taken; otherwise the error
+    """
+    begin = time.perf_counter()
+    try:
+        if isinstance(job, str):
+            raise Exception(f"STOPPED EXECUTION: INVALID JOB - {job}")
+        method = job.get('method', 'intpoint')
+        if method not in METHODS:
+            raise Exception(f"STOPPED EXECUTION: UNKNOWN METHOD {method}")
+
+        import numpy as np
+        from portfolio import Portfolio
+
+        n_assets = len(job['tickers'])
+        lower = np.asarray(job.get('lower', np.zeros(n_assets)), dtype=np.float64)
+        upper = np.asarray(job.get('upper', np.ones(n_assets)), dtype=np.float64)
+        key = (tuple(job['tickers']), job['start_date'], job['end_date'])
+        ptf = None if portfolios is None else portfolios.pop(key, None)
+        if ptf is None:
+            ptf = Portfolio(job['tickers'], lower, upper, job['start_date'], job['end_date'])
+        if portfolios is not None:
+            portfolios[key] = ptf
+        ptf.set_bounds(lower, upper)
+        if method == 'intpoint':
+            ptf.solve_intpoint_QP()
+        else:
+            ptf.solve_simplex_LP(method=method)
+
+        weights = np.asarray(ptf.weights, dtype=np.float64).ravel()[:n_assets]
+        ptf.weights = weights
+        mu = ptf.compute_individual_expected_returns().to_numpy()
+        return {'id': job_id
+                , 'status': 'ok'
+                , 'method': method
+                , 'weights': weights.tolist()
+                , 'expected_return': float(mu @ weights)
+                , 'variance': float(ptf.compute_portfolio_variance())
+                , 'std': float(ptf.compute_portfolio_std())
+                , 'seconds': time.perf_counter() - begin}
+    except Exception as error:
+        return {'id': job_id
+                , 'status': 'error'
+                , 'error': str(error) if str(error) else repr(error)
+                , 'seconds': time.perf_counter() - begin}
+
+def run_jobs(jobs, output, workers=1) -> int:
+    """Runs the jobs and writes each result to output as soon as it is available.
+    With more than one worker the jobs are run by a pool of processes; at most 2 * workers jobs are read ahead,
+    so the input is streamed whatever its size.
+
+    Returns:
+        the number of jobs that failed
+    """
+    failed = 0
+
+    def write(result: dict) -> None:
+        nonlocal failed
+        failed += result['status'] != 'ok'
+        output.write(json.dumps(result) + '\n')
+        output.flush()
+
+    jobs = iter(jobs)
+    first = next(jobs, None)
+    if first is None:
+        return 0
+    load_solvers()
+
+    if workers <= 1:
+        write(run_job(*first))
+        for job in jobs:
+            write(run_job(*job))
+        return failed
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = {pool.submit(run_job, *first)}
+        for job in jobs:
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write(future.result())
+            pending.add(pool.submit(run_job, *job))
+        for future in wait(pending).done:
+            write(future.result())
+    return failed
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='optfolio', description='Runs a JSONL file of portfolio optimization jobs.')
+    parser.add_argument('jobs', help="the JSONL file of the jobs, '-' for the standard input")
+    parser.add_argument('-o', '--output', default='-', help="the JSONL file of the results, '-' for the standard output")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1
+                        , help='the number of worker processes, 1 to run the jobs in this process')
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.jobs == '-' else open(args.jobs)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        failed = run_jobs(read_jobs(source), output, workers=args.workers)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,37 +1,143 @@
+"""
+THIS FILE CONTAINS THE PLOTS OF THE MARKET DATA.
+
+The series are read from the price matrix already loaded by a Portfolio, see Portfolio.compute_price_matrix. A panel
+is a few hundred pixels wide, so each series is downsampled to a budget of n_points with the Largest-Triangle-Three-
+Buckets algorithm (Steinarsson, 2013), which keeps the peaks and the troughs that give its shape. The panels are laid
+out on pages of panels_per_page, and the pages are rendered by the headless Agg/PDF backends of matplotlib, in worker
+processes when there are many of them. matplotlib is only imported when a page is rendered.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
 from typing import List
-from matplotlib import pyplot as plt
-import pandas as pd
 import numpy as np
 
-def plot_time_series(symbols: List[str], attr: str):
-    """Simple plotting utility function to plot the timeseries for the given attribute.
+def lttb(x: np.array, y: np.array, n_points: int) -> np.array:
+    """Selects n_points of the series (x, y) with the Largest-Triangle-Three-Buckets algorithm: the first and the last
+    points are kept, the others are split in n_points - 2 buckets and from each bucket the point forming the largest
+    triangle with the point selected in the previous bucket and the average of the next bucket is kept.
+    The NaN values are skipped.
 
-    Args:
-        symbols (List[str]): the list of symbols we want to plot
-        attr (str): the attribute we want to focus on
+    Returns:
+        the sorted indices of the selected points
     """
-    colors = plt.rcParams["axes.prop_cycle"]()  # get the color cycler
-    n_symbols = len(symbols)
-    columns = 2
-    rows = int(np.ceil(n_symbols / 2))
-
-    DATA = pd.read_csv('./src/data/ASSET_DATA.csv')
-
-    fig = plt.figure()
-    fig.suptitle(f'{attr} prices ($)')
-    for count in range(1, n_symbols+1):
-        ticker = symbols[count-1]
-        date = DATA['formatted_date'][DATA['ticker']==ticker]
-        values = DATA[attr][DATA['ticker']==ticker]
-        ax = fig.add_subplot(rows, columns, count)
-        ax.set_title(symbols[count-1])
-        ax.set_xticks([])
+    valid = np.flatnonzero(np.isfinite(y))
+    n = valid.shape[0]
+    if n_points >= n or n_points < 3:
+        return valid
+    xs, ys = x[valid].astype(np.float64), y[valid].astype(np.float64)
+
+    # n_points - 2 buckets between the first and the last point, each of them with at least one point
+    edges = np.linspace(1, n - 1, n_points - 1).astype(np.int64)
+    # Averages of the buckets, the one after the last bucket is the last point
+    counts = np.diff(edges)
+    next_x = np.append(np.add.reduceat(xs[1:n - 1], edges[:-1] - 1) / counts, xs[-1])[1:]
+    next_y = np.append(np.add.reduceat(ys[1:n - 1], edges[:-1] - 1) / counts, ys[-1])[1:]
+
+    selected = np.empty(n_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((xs[a] - next_x[i]) * (ys[lo:hi] - ys[a]) - (xs[a] - xs[lo:hi]) * (next_y[i] - ys[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return valid[selected]
 
+def render_page(path: str, title: str, dates: np.array, values: np.array, symbols: List[str]
+                , columns=2, n_points=500) -> int:
+    """Renders one page of panels, one per column of values, to path (its extension gives the format).
+    With n_points None every point is plotted.
+
+    Returns:
+        the size of the file in bytes
+    """
+    from matplotlib.figure import Figure
+    from matplotlib import rcParams
+
+    colors = rcParams["axes.prop_cycle"]()  # get the color cycler
+    rows = int(np.ceil(len(symbols) / columns))
+    x = dates.astype('datetime64[D]').astype(np.int64)
+
+    fig = Figure(figsize=(4 * columns, 2.5 * rows))
+    fig.suptitle(title)
+    for count, symbol in enumerate(symbols):
+        ax = fig.add_subplot(rows, columns, count + 1)
+        ax.set_title(symbol)
+        ax.set_xticks([])
+        series = values[:, count]
+        keep = np.flatnonzero(np.isfinite(series)) if n_points is None else lttb(x, series, n_points)
         # Get the next color from the cycler
-        c = next(colors)["color"]
-        plt.plot(date, values, color=c)
-        plt.grid(True)
+        ax.plot(dates[keep], series[keep], color=next(colors)["color"], linewidth=0.8)
+        ax.grid(True)
 
     fig.tight_layout()
-    fig.savefig(f'./src/results/{attr}_time_series.pdf')
-    fig.show()
\ No newline at end of file
+    fig.savefig(path)
+    return os.path.getsize(path)
+
+def render_report(dates: np.array
+                , values: np.array
+                , symbols: List[str]
+                , title: str
+                , path: str
+                , n_points=500
+                , columns=2
+                , panels_per_page=8
+                , processes=None) -> dict:
+    """Renders the series (the columns of values) on pages of panels_per_page panels. A single page is written to path,
+    otherwise page i is written to path with the suffix _i before the extension.
+
+    Args:
+        dates: the (T,) dates of the rows of values
+        values: the (T, n) array of the series, NaN where missing
+        n_points: the points budget of each series, None to plot every point
+        processes: if given, the pages are rendered by a pool of processes
+
+    Returns:
+        a dictionary from the path of each page to its size in bytes
+    """
+    pages = [range(first, min(first + panels_per_page, len(symbols))) for first in range(0, len(symbols), panels_per_page)]
+    root, extension = os.path.splitext(path)
+    paths = [path] if len(pages) == 1 else [f'{root}_{i + 1:03d}{extension}' for i in range(len(pages))]
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    jobs = [(paths[i], title, dates, values[:, list(page)], [symbols[j] for j in page], columns, n_points)
+            for i, page in enumerate(pages)]
+    if processes is None:
+        sizes = [render_page(*job) for job in jobs]
+    else:
+        # Imported before the workers are forked, not once in each of them
+        import matplotlib.figure
+        with ProcessPoolExecutor(processes) as pool:
+            sizes = list(pool.map(render_page, *zip(*jobs)))
+    return dict(zip(paths, sizes))
+
+def plot_time_series(ptf
+                    , attr='adjclose'
+                    , symbols=None
+                    , n_points=500
+                    , panels_per_page=8
+                    , processes=None
+                    , folder='./src/results'
+                    , extension='pdf') -> dict:
+    """Plots the timeseries of the given attribute for the symbols of a portfolio, from its loaded market data.
+
+    Args:
+        ptf (Portfolio): the portfolio whose market data are plotted
+        attr (str): the attribute we want to focus on
+        symbols (List[str]): the list of symbols we want to plot, all the tickers of the portfolio by default
+        n_points, panels_per_page, processes: see render_report
+
+    Returns:
+        a dictionary from the path of each page to its size in bytes
+    """
+    symbols = list(ptf.tickers) if symbols is None else symbols
+    dates, values = ptf.compute_price_matrix(attr)
+    columns = [ptf.tickers.index(symbol) for symbol in symbols]
+    return render_report(dates, values[:, columns], symbols, f'{attr} prices ($)'
+                        , os.path.join(folder, f'{attr}_time_series.{extension}')
+                        , n_points=n_points
+                        , panels_per_page=panels_per_page
+                        , processes=processes)
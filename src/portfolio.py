@@ -1,18 +1,27 @@
-import data
+import prices
+import resolver
+import result_cache
 import pandas as pd
 import numpy as np
-import os
+from scipy import sparse
 from solvers import simplex
+from solvers import revised_simplex
 from solvers import interior_point
+from solvers import factor_covariance
 from typing import List
 
+# The modules of the analyses (frontier, resampling, backtest, streaming) are imported by the methods using them,
+# so that a process only solving portfolios does not pay for their imports
+
 class Portfolio:
 
     def __init__(self, tickers: List[str]
                 , lower: np.array
                 , upper: np.array
                 , start_date: str
-                , end_date: str):
+                , end_date: str
+                , precision='double'
+                , result_cache=None):
         """
         Initializes a portfolio instance
 
@@ -22,12 +31,40 @@ class Portfolio:
             upper: numpy array describing the upper bounds
             start_date: the starting date for the historical data
             end_date: the ending date for the historical data
+            precision: 'double', or 'single' to keep the prices, the returns and the covariance in float32 and to solve
+                the QP problem in mixed precision: the market data and the statistics take half the memory, the solver
+                still refines in float64
+            result_cache: a result_cache.ResultCache, if given the solves look their problem up in it before solving
+                and store their result in it when the solver converged
         """
+        # Statistics computed from the market data are cached until the data changes
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.data_version = 0
+        self.invalidate_cache()
+
+        self.precision = precision
         self.tickers = tickers
         self.market_data = self.get_market_data(start_date, end_date)
         self.start_date = start_date
         self.end_date = end_date
+        self.set_bounds(lower, upper)
+
+        # WEIGHTS initialization
+        # self.weights = np.ones((len(tickers), 1))
+        # self.weights = self.weights / self.weights.sum(axis=0, keepdims=True)
+
+        self.weights = []
+        self.n_assets = len(tickers)
+        # (x, y, lm) of the last interior point solve, the starting point of the next one
+        self.last_solution = None
+        self.result_cache = result_cache
+        # Status, iterations and convergence metrics of the last solve, and whether it came from the result cache
+        self.diagnostics = {}
 
+    def set_bounds(self, lower: np.array, upper: np.array):
+        """Sets the lower and upper bounds on the weights. The market data and the statistics are kept, so the same
+        portfolio can be solved again for other bounds."""
         if lower.shape[0] != len(self.tickers) or upper.shape[0] != len(self.tickers) or \
             any(l > 1.0 for l in lower) or any(u > 1.0 for u in upper):
             raise Exception("STOPPED EXECUTION: PORTFOLIO NOT INITIALIZED - PLEASE INSERT LEGIT BOUND ARRAYS")
@@ -35,34 +72,143 @@ class Portfolio:
             self.lb = lower.reshape((lower.shape[0], 1))
             self.ub = upper.reshape((upper.shape[0], 1))
 
-        # WEIGHTS initialization
-        # self.weights = np.ones((len(tickers), 1))
-        # self.weights = self.weights / self.weights.sum(axis=0, keepdims=True)
+    ##################          STATISTICS CACHE            ################################
+    # The market data, the tickers and the dates are properties: assigning any of them invalidates the
+    # cached statistics. In-place modifications of the market data require an explicit invalidate_cache().
 
-        self.weights = []
-        self.n_assets = len(tickers)
+    @property
+    def market_data(self) -> pd.DataFrame:
+        return self.__market_data
+
+    @market_data.setter
+    def market_data(self, value: pd.DataFrame):
+        self.__market_data = value
+        self.invalidate_cache()
+
+    @property
+    def precision(self) -> str:
+        return self.__precision
+
+    @precision.setter
+    def precision(self, value: str):
+        if value not in ('double', 'single'):
+            raise Exception(f"STOPPED EXECUTION: UNKNOWN PRECISION {value}")
+        self.__precision = value
+        self.invalidate_cache()
+
+    @property
+    def dtype(self):
+        """The dtype of the statistics."""
+        return np.float32 if self.precision == 'single' else np.float64
+
+    @property
+    def tickers(self) -> List[str]:
+        return self.__tickers
+
+    @tickers.setter
+    def tickers(self, value: List[str]):
+        self.__tickers = value
+        self.invalidate_cache()
+
+    @property
+    def start_date(self) -> str:
+        return self.__start_date
+
+    @start_date.setter
+    def start_date(self, value: str):
+        self.__start_date = value
+        self.invalidate_cache()
+
+    @property
+    def end_date(self) -> str:
+        return self.__end_date
+
+    @end_date.setter
+    def end_date(self, value: str):
+        self.__end_date = value
+        self.invalidate_cache()
+
+    def invalidate_cache(self):
+        """Drops the cached statistics and starts a new version of the market data."""
+        self.__stats = {}
+        self.data_version += 1
+
+    def __cached(self, key: str, compute):
+        """Returns the statistic stored under key for the current version of the market data,
+        computing it only on a cache miss."""
+        if key in self.__stats:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+            self.__stats[key] = compute()
+        return self.__stats[key]
+
+    def __digest(self, name: str, compute) -> str:
+        """Returns the digest of a statistic, cached as the statistic itself, to build the keys of the result cache."""
+        return self.__cached(f'digest_{name}', lambda: result_cache.digest(compute()))
+
+    def __cached_result(self, solver: str, params: dict, data) -> tuple:
+        """Looks the problem up in the result cache. When it is found the weights and the diagnostics are set.
+        data is a function returning the arrays of the problem, or their digests, see result_cache.problem_key:
+        they are only hashed when there is a result cache.
+
+        Returns:
+            the key of the problem (None without a result cache) and True if the problem has been found
+        """
+        if self.result_cache is None:
+            return None, False
+        key = result_cache.problem_key(solver, params, {**data(), 'lb': self.lb, 'ub': self.ub})
+        result = self.result_cache.get(key)
+        if result is None:
+            return key, False
+        self.weights = result['weights'].copy()
+        self.diagnostics = {**result['diagnostics'], 'cached': True}
+        return key, True
+
+    def __store_result(self, key: str, objective: float, diagnostics: dict, converged: bool) -> None:
+        """Sets the diagnostics and stores the result in the result cache, only if the solver converged: a failed
+        solve must not be replayed by the next calls."""
+        self.diagnostics = {**diagnostics, 'cached': False}
+        if key is not None and converged:
+            self.result_cache.put(key, self.weights, objective, diagnostics)
+
+    def cache_info(self) -> dict:
+        """Returns the cache counters and the current version of the market data."""
+        return {'hits': self.cache_hits, 'misses': self.cache_misses, 'version': self.data_version}
 
     ##################          PORTFOLIO METHODS            ###############################
 
     def get_market_data(self
                         , start_date: str
                         , end_date: str) -> pd.DataFrame:
-        # TO REMOVE IF YAHOOFINANCIALS IS NOT PRESENT
-        if not os.path.isfile(f'./src/data/ASSET_DATA_{start_date}_to_{end_date}_{self.tickers}.csv'):
-            print('File not found, initializing download session')
-            data.get_history_data(self.tickers, start_date, end_date)
+        """Reads the market data of the tickers over the date range. The data already on disk are reused whatever the
+        universe and the dates they were downloaded for, and only the missing ones are downloaded, see resolver.DataResolver.
+        """
+        return resolver.DataResolver().resolve(self.tickers, start_date, end_date)
+
+    def compute_price_matrix(self, field='adjclose') -> tuple:
+        """Aligns a field of the market data on the dates of the first ticker, see prices.price_matrix, in the dtype of
+        the precision. The returns, the statistics and the plots share it. The result is cached, it must not be modified
+        in place.
 
-        df = pd.read_csv(f'./src/data/ASSET_DATA_{start_date}_to_{end_date}_{self.tickers}.csv').set_index('formatted_date')
-        return df
+        Returns:
+            the dates (datetime64[D]) and the (T, n_assets) array of the values, NaN where missing
+        """
+        return self.__cached(f'prices_{field}', lambda: prices.price_matrix(self.market_data, self.tickers, field
+                                                                                    , dtype=self.dtype))
 
     def compute_returns(self) -> pd.DataFrame:
         """Compute the percentized gain/loss on the portfolio over the fixed timeframe specified at initialization.
         We make a return as the percentage chenge in the closing price of the asset over the previous day's closing price.
+        The result is cached, it must not be modified in place.
         """
-        close_prices = pd.DataFrame()
-        for count, ticker in enumerate(self.tickers):
-            close_prices.insert(count, f"{ticker}", self.market_data['adjclose'][self.market_data['ticker']==ticker])
-        return close_prices.pct_change()
+        return self.__cached('returns', self.__compute_returns)
+
+    def __compute_returns(self) -> pd.DataFrame:
+        dates, close_prices = self.compute_price_matrix('adjclose')
+        return pd.DataFrame(prices.simple_returns(close_prices)
+                            , index=pd.Index(np.datetime_as_string(dates, unit='D'), name='formatted_date')
+                            , columns=[f"{ticker}" for ticker in self.tickers])
 
     def compute_individual_expected_returns(self) -> pd.DataFrame:
         """Compute the average return for each asset.
@@ -70,12 +216,44 @@ class Portfolio:
         This method will be useful for the optimization part. Following the definition of the
         expected value we are computing the means of the individual assets instead of the expected value of the entire portfolio.
         """
-        return self.compute_returns().mean()
+        return self.__cached('mean', lambda: pd.Series(prices.mean_returns(self.compute_returns().to_numpy())
+                                                        , index=self.compute_returns().columns))
 
     def compute_returns_covariance_matrix(self) -> pd.DataFrame:
         """Compute the covariance matrix between the assets' returns. It has been annualized to the 252 trading days.
         """
-        return self.compute_returns().cov() * 252
+        def compute():
+            returns = self.compute_returns()
+            return pd.DataFrame(prices.covariance(returns.to_numpy()) * 252, index=returns.columns, columns=returns.columns)
+        return self.__cached('covariance', compute)
+
+    def compute_streaming_moments(self, chunk_size=10000) -> tuple:
+        """Compute the average returns and the annualized covariance matrix in a single pass over the prices in the
+        store, reading chunk_size dates at a time, without loading the whole history in memory.
+        It matches compute_individual_expected_returns and compute_returns_covariance_matrix when no price is missing.
+        """
+        import store
+        import streaming
+
+        def compute():
+            market_store = store.MarketDataStore()
+            chunks = streaming.store_price_chunks(market_store, self.tickers, self.start_date, self.end_date
+                                                , chunk_size=chunk_size)
+            moments = streaming.streaming_moments(chunks, len(self.tickers))
+            return (pd.Series(moments.mean, index=self.tickers)
+                    , pd.DataFrame(moments.covariance() * 252, index=self.tickers, columns=self.tickers))
+        return self.__cached(f'streaming_{chunk_size}', compute)
+
+    def compute_factor_covariance(self, n_factors=None, loadings=None) -> factor_covariance.FactorCovariance:
+        """Compute a factor model of the covariance matrix between the assets' returns, annualized to the 252 trading days.
+        The factors are either the first n_factors principal components of the returns or given as a (n_assets, k)
+        matrix of loadings. The dense covariance matrix is never formed.
+        """
+        returns = self.compute_returns().dropna().to_numpy()
+        if loadings is not None:
+            return factor_covariance.loadings_factor_model(returns, np.asarray(loadings)) * 252
+        return self.__cached(f'factor_covariance_{n_factors}'
+                            , lambda: factor_covariance.pca_factor_model(returns, n_factors) * 252)
 
     def compute_portfolio_return(self) -> pd.DataFrame:
         """Computes the expected portfolio's expected return defined as the weighted sum of the returns on the assets of the portfolio.
@@ -151,39 +329,112 @@ class Portfolio:
         c = matrix[-1, :-1]
         return c, A, b
 
-    def solve_simplex_LP(self, verbose=False):
+    def split_matrix_bounded_lp(self):
+        """Produces the components of the problem in the bounded form used by the revised simplex:
+        the bounds on the weights are handled by the solver, hence only the full investment constraint
+        is kept as an equation.
+            max mu.T @ w s.t. 1.T @ w = 1, lb <= w <= ub
+        """
+        c = self.compute_individual_expected_returns().to_numpy()
+        A = np.ones((1, self.n_assets))
+        b = np.ones(1)
+        return c, A, b
+
+    def solve_simplex_LP(self, verbose=False, method='revised', callback=None):
         """Tries to solve the portfolio problem of the maximum expected return
         by using a simplex solver.
+
+        Args:
+            verbose: prints the solver progress
+            method: 'revised' for the bounded-variable revised simplex, 'tableau' for the full tableau simplex
+            callback: a function receiving the telemetry record of each pivot
         """
-        c, A, b = self.split_matrix_lp()
-        slex = simplex.Simplex(c, A, b, verbose=verbose)
+        key, found = self.__cached_result(f'simplex_{method}', {}, lambda: {
+            'mu': self.__digest('mean', lambda: self.compute_individual_expected_returns().to_numpy())})
+        if found:
+            return
+        if method == 'revised':
+            c, A, b = self.split_matrix_bounded_lp()
+            slex = revised_simplex.RevisedSimplex(c, A, b, self.lb, self.ub, verbose=verbose
+                                                , callback=callback, history='none')
+        elif method == 'tableau':
+            c, A, b = self.split_matrix_lp()
+            slex = simplex.Simplex(c, A, b, verbose=verbose, callback=callback, history='none')
+        else:
+            raise Exception(f"STOPPED EXECUTION: UNKNOWN SIMPLEX METHOD {method}")
         slex.solve()
         if verbose: slex.print_solution()
         self.weights = slex.solutions
+        diagnostics = {'iterations': slex.iteration}
+        if method == 'revised':
+            diagnostics['optimal'] = bool(slex.optimal)
+            converged = diagnostics['optimal']
+        else:
+            # The tableau simplex only stops early at the optimum
+            converged = slex.iteration < slex.max_iteration
+        self.__store_result(key, float(slex.objective[-1]), diagnostics, converged)
 
     ##################          OPTIMIZATION METHODS (INTERIOR POINT) - QP         ################
 
-    def preprocess_matrix_qp(self):
+    def preprocess_matrix_qp(self, as_sparse=False):
         """Split the matrix in 3 components: the arrays of constants and objective function
-        and the constraint matrix"""
-        A = np.zeros((self.ub.shape[0] + 1, self.n_assets))
-        for r in range(self.n_assets):
-            A[r, r] = -1
-        A[-1] = np.ones(self.n_assets)
+        and the constraint matrix. The constraint matrix is a negated identity (upper bounds) plus
+        a row of ones (full investment), with as_sparse it is returned as a scipy.sparse CSR matrix.
+        """
+        if as_sparse:
+            A = sparse.vstack([-sparse.identity(self.n_assets), np.ones((1, self.n_assets))], format='csr')
+        else:
+            A = np.zeros((self.ub.shape[0] + 1, self.n_assets))
+            for r in range(self.n_assets):
+                A[r, r] = -1
+            A[-1] = np.ones(self.n_assets)
         c = np.zeros(self.n_assets)
         b = np.append(-self.ub, 1)
         return c, A, b
 
-    def solve_intpoint_QP(self, verbose=False):
+    def solve_intpoint_QP(self, verbose=False, as_sparse=False, n_factors=None, loadings=None, callback=None, warm_start=True):
         """Tries to solve the portfolio problem of the mean-variance portfolio by using an interior-point
-        method.
+        method. With as_sparse the constraint matrix is handled as a sparse matrix.
+        If n_factors or loadings are given the covariance matrix is replaced by a factor model,
+        see compute_factor_covariance, which keeps memory and cost linear in the number of assets.
+        The callback, if any, receives the telemetry record of each iteration of the solver.
+        With warm_start the solve starts from the last optimal solution, kept in last_solution, when the problem has the same
+        size: after a small change of the market data or of the bounds it takes a few iterations.
+        With the single precision the solver runs in mixed precision (see interior_point.IntPoint) on the float32
+        covariance, and the constraint matrix is always sparse.
+        With a result cache the same problem (covariance, bounds and parameters) is solved only once.
         """
-        c, A, b = self.preprocess_matrix_qp()
-        S = self.compute_returns_covariance_matrix()
+        single = self.precision == 'single'
 
-        init_point = (np.random.uniform(0.0, 1.0, [self.n_assets,])
-                    , np.random.uniform(0.1, 100.0, [A.shape[0],])
-                    , np.random.uniform(0.1, 100.0, [A.shape[0],]))
+        def data() -> dict:
+            if n_factors is None and loadings is None:
+                return {'S': self.__digest('covariance', lambda: self.compute_returns_covariance_matrix().to_numpy())}
+            # The factor model is computed from the returns
+            factors = {'returns': self.__digest('returns', lambda: self.compute_returns().to_numpy())}
+            if loadings is not None:
+                factors['loadings'] = np.asarray(loadings)
+            return factors
+        key, found = self.__cached_result('intpoint', {'precision': self.precision, 'n_factors': n_factors
+                                                    , 'max_iteration': 100}, data)
+        if found:
+            return
+
+        if n_factors is not None or loadings is not None:
+            c, A, b = self.preprocess_matrix_qp(as_sparse=True)
+            S = self.compute_factor_covariance(n_factors, loadings)
+        else:
+            c, A, b = self.preprocess_matrix_qp(as_sparse=as_sparse or single)
+            S = self.compute_returns_covariance_matrix()
+
+        warm = warm_start and self.last_solution is not None \
+            and self.last_solution[0].shape[0] == A.shape[1] and self.last_solution[2].shape[0] == A.shape[0]
+        if warm:
+            # The slacks are recomputed for the new bounds, the point is recentered by the solver
+            init_point = (self.last_solution[0].copy(), None, self.last_solution[2].copy())
+        else:
+            init_point = (np.random.uniform(0.0, 1.0, [self.n_assets,])
+                        , np.random.uniform(0.1, 100.0, [A.shape[0],])
+                        , np.random.uniform(0.1, 100.0, [A.shape[0],]))
 
         intpoint = interior_point.IntPoint(S, c, A, b
                                         , verbose=verbose
@@ -191,10 +442,79 @@ class Portfolio:
                                         , y_init=init_point[1]
                                         , lm_init=init_point[2]
                                         , max_iteration=100
+                                        , warm_start=warm
+                                        , precision='mixed' if single else 'double'
+                                        , callback=callback
+                                        , history='none'
                                         )
-        intpoint.solve()
+        status = intpoint.solve()
         if verbose: intpoint.print_solution()
-        self.weights = intpoint.hsol[-1]
+        if status in (interior_point.PRIMAL_INFEASIBLE, interior_point.DUAL_INFEASIBLE):
+            raise Exception(f"STOPPED EXECUTION: PORTFOLIO PROBLEM {status.upper().replace('_', ' ')}")
+        self.weights = intpoint.solutions
+        # A non-converged or non-finite point would be a bad start for the next solves
+        if status == interior_point.OPTIMAL:
+            self.last_solution = (intpoint.solutions, intpoint.slacks, intpoint.lambdas)
+        self.__store_result(key, intpoint.metrics['objective'], {'status': status, **intpoint.metrics}
+                            , status == interior_point.OPTIMAL)
+
+    def __frontier_constraints(self) -> tuple:
+        """The constraints of the minimum variance problem with the lower bounds too, as the LP problem of the maximum
+        expected return applies them. The full investment row stays the last one, see frontier.solve_frontier_chunk.
+        """
+        _, A, b = self.preprocess_matrix_qp()
+        return np.vstack([A[:-1], np.eye(self.n_assets), A[-1:]]), np.concatenate([b[:-1], self.lb.ravel(), b[-1:]])
+
+    def efficient_frontier(self, n_points=20, warm_start=True, processes=None) -> tuple:
+        """Computes n_points portfolios on the efficient frontier, from the minimum variance portfolio
+        to the maximum expected return one. See frontier.efficient_frontier for the arguments.
+
+        Returns:
+            the weights of the portfolios (one per row), their risk (standard deviation) and their expected return
+        """
+        import frontier
+
+        A, b = self.__frontier_constraints()
+        S = self.compute_returns_covariance_matrix().to_numpy()
+        mu = self.compute_individual_expected_returns().to_numpy()
+
+        # The maximum expected return is the solution of the LP problem
+        c_lp, A_lp, b_lp = self.split_matrix_bounded_lp()
+        slex = revised_simplex.RevisedSimplex(c_lp, A_lp, b_lp, self.lb, self.ub)
+        slex.solve()
+
+        return frontier.efficient_frontier(S, mu, A, b, mu @ slex.solutions
+                                        , n_points=n_points
+                                        , warm_start=warm_start
+                                        , processes=processes)
+
+    def resampled_frontier(self, n_samples=1000, n_points=20, block=1, seed=0, processes=None) -> dict:
+        """Computes the resampled efficient frontier from n_samples bootstrap samples of the returns.
+        See resampling.resampled_frontier for the arguments and the result.
+        """
+        import resampling
+
+        A, b = self.__frontier_constraints()
+        return resampling.resampled_frontier(self.compute_returns().dropna().to_numpy(), A, b, self.lb, self.ub
+                                            , n_samples=n_samples
+                                            , n_points=n_points
+                                            , block=block
+                                            , seed=seed
+                                            , processes=processes)
+
+    def backtest(self, window=126, rebalance=21, expanding=False) -> 'backtest.Backtest':
+        """Runs a rolling-window backtest of the minimum variance portfolio over the market data.
+        See backtest.Backtest for the arguments.
+        """
+        import backtest
+
+        _, A, b = self.preprocess_matrix_qp()
+        session = backtest.Backtest(self.compute_returns(), A, b
+                                    , window=window
+                                    , rebalance=rebalance
+                                    , expanding=expanding)
+        session.run()
+        return session
 
     ##################          OUTPUT METHODS            ##########################################
 
@@ -0,0 +1,88 @@
+"""
+THIS FILE CONTAINS THE DATE-ALIGNED PRICE MATRIX shared by the returns, the covariance and the plots.
+
+The market data come in the long format of the csv files, one row per ticker and date. They are turned once into a
+dense (T, n_assets) float array whose rows are the dates of a calendar and whose columns follow the order of the
+tickers, by sorting the dates and scattering the values at their (date, ticker) positions: no per-ticker filtering
+of the frame and no index alignment. A price missing on a date of the calendar is NaN, and the returns replace it
+with the last known price of the asset, as pandas.DataFrame.pct_change does. The computations keep the dtype of the
+matrix, so a float32 matrix gives float32 returns and statistics at half the memory.
+"""
+from typing import List
+import numpy as np
+import pandas as pd
+
+# 'first': the dates of the first ticker, as the returns have always been computed
+# 'union': all the dates on which at least one of the tickers has a price
+CALENDARS = ('first', 'union')
+
+def price_matrix(market_data: pd.DataFrame, tickers: List[str], field='adjclose', calendar='first'
+                , dtype=np.float64) -> tuple:
+    """Aligns a field of the market data of the tickers on a calendar.
+
+    Args:
+        market_data: the market data in the long format, indexed by formatted_date with a ticker column
+        tickers: the tickers, in the order of the columns
+        field: the column of the market data to align
+        calendar: the dates of the rows, see CALENDARS
+        dtype: the dtype of the matrix, np.float32 halves its memory
+
+    Returns:
+        the sorted dates of the calendar (datetime64[D]) and the (T, n_assets) array of the values, NaN where missing
+    """
+    if calendar not in CALENDARS:
+        raise Exception(f"STOPPED EXECUTION: UNKNOWN CALENDAR {calendar}")
+    symbols = market_data['ticker'].to_numpy()
+    dates = np.asarray(market_data.index.to_numpy(), dtype='datetime64[D]')
+    values = market_data[field].to_numpy(dtype=np.float64)
+
+    # Column of each row, the rows of the other tickers are dropped
+    order = np.argsort(tickers, kind='stable')
+    sorted_tickers = np.asarray(tickers, dtype=object)[order]
+    position = np.minimum(np.searchsorted(sorted_tickers, symbols), len(tickers) - 1)
+    found = sorted_tickers[position] == symbols
+    columns, dates, values = order[position[found]], dates[found], values[found]
+
+    calendar_dates = np.unique(dates[columns == 0] if calendar == 'first' else dates)
+    rows = np.minimum(np.searchsorted(calendar_dates, dates), max(calendar_dates.shape[0] - 1, 0))
+    found = calendar_dates[rows] == dates if calendar_dates.shape[0] > 0 else np.zeros(dates.shape[0], dtype=bool)
+
+    matrix = np.full((calendar_dates.shape[0], len(tickers)), np.nan, dtype=dtype)
+    matrix[rows[found], columns[found]] = values[found]
+    return calendar_dates, matrix
+
+def forward_fill(prices: np.array, last: np.array) -> np.array:
+    """Replaces the NaN prices with the last known price of the same asset, starting from last."""
+    if not np.isnan(prices).any():
+        return prices
+    prices = np.vstack([last, prices])
+    index = np.where(np.isnan(prices), 0, np.arange(prices.shape[0])[:, None])
+    np.maximum.accumulate(index, axis=0, out=index)
+    return prices[index, np.arange(prices.shape[1])][1:]
+
+def simple_returns(prices: np.array) -> np.array:
+    """Computes the daily returns of a (T, n_assets) price matrix, with the missing prices replaced by the last known
+    ones. The first row, and the rows before the first price of an asset, are NaN."""
+    filled = forward_fill(prices, np.full(prices.shape[1], np.nan, dtype=prices.dtype))
+    returns = np.full(prices.shape, np.nan, dtype=prices.dtype)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = filled[1:] / filled[:-1] - 1.0
+    return returns
+
+def mean_returns(returns: np.array) -> np.array:
+    """Computes the mean of each column of the returns, skipping the NaN ones."""
+    complete = returns[1:]
+    if complete.shape[0] > 0 and not np.isnan(complete).any():
+        return complete.mean(axis=0)
+    valid = ~np.isnan(returns)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (np.where(valid, returns, 0.0).sum(axis=0) / valid.sum(axis=0)).astype(returns.dtype)
+
+def covariance(returns: np.array) -> np.array:
+    """Computes the covariance matrix of the columns of the returns. When only the first row is missing, as for
+    the returns of complete prices, it is computed on the rest with numpy, otherwise pairwise on the dates where
+    both assets have a return, as pandas.DataFrame.cov does."""
+    complete = returns[1:]
+    if complete.shape[0] > 1 and not np.isnan(complete).any():
+        return np.atleast_2d(np.cov(complete, rowvar=False, dtype=returns.dtype))
+    return pd.DataFrame(returns).cov().to_numpy(dtype=returns.dtype)
@@ -0,0 +1,158 @@
+"""
+THIS FILE CONTAINS THE RESAMPLED EFFICIENT FRONTIER of the mean-variance portfolio problem.
+
+The history of the returns is resampled with the bootstrap many times, and for each sample the expected returns,
+the covariance matrix and the efficient frontier are computed again. The weights of the portfolios with the same
+rank on the frontiers of the samples are averaged, which gives allocations less sensitive to the estimation errors.
+
+The returns matrix is written once to shared memory (or to a memory-mapped file) and the worker processes attach
+to it when they start, so the samples are drawn without copying the history to each task. Each sample has its own
+random generator spawned from the seed, so the result does not depend on the number of processes.
+"""
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import frontier
+from solvers import interior_point, revised_simplex
+
+# Returns matrix of the worker process, attached by attach_returns
+WORKER = {}
+
+def bootstrap_indices(rng, n_days: int, block=1) -> np.array:
+    """Draws the rows of a bootstrap sample of n_days rows: blocks of block consecutive days (wrapping around the end)
+    starting at random days, so that block > 1 keeps the short-term dependence of the returns."""
+    starts = rng.integers(0, n_days, -(-n_days // block))
+    return ((starts[:, None] + np.arange(block)) % n_days).ravel()[:n_days]
+
+def resample_chunk(returns: np.array
+                    , seeds: list
+                    , A: np.array
+                    , b: np.array
+                    , lb: np.array
+                    , ub: np.array
+                    , n_points=20
+                    , block=1) -> tuple:
+    """Computes the efficient frontiers of the bootstrap samples drawn with the given seeds.
+
+    Returns:
+        the sum and the sum of the squares of the weights of the frontiers, of shape (n_points, n_assets), and the
+        number of samples dropped because the maximum return or a point of their frontier was not solved
+    """
+    total = np.zeros((n_points, returns.shape[1]))
+    squares = np.zeros((n_points, returns.shape[1]))
+    failed = 0
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        sample = returns[bootstrap_indices(rng, returns.shape[0], block)]
+        mu = sample.mean(axis=0)
+        S = np.cov(sample, rowvar=False) * 252
+
+        # The maximum expected return of the sample is the solution of the LP problem
+        slex = revised_simplex.RevisedSimplex(mu, np.ones((1, mu.shape[0])), np.ones(1), lb, ub, history='none')
+        slex.solve()
+        if not slex.optimal:
+            failed += 1
+            continue
+
+        weights, statuses = frontier.solve_frontier(S, mu, A, b, mu @ slex.solutions, n_points=n_points, rng=rng)
+        # The frontiers are averaged by rank, so a sample with a failed point is dropped as a whole
+        if np.any(statuses != interior_point.OPTIMAL):
+            failed += 1
+            continue
+        total += weights
+        squares += weights**2
+    return total, squares, failed
+
+def attach_returns(storage: str, location: str, shape: tuple) -> None:
+    """Initializer of the worker processes: maps the returns matrix without copying it."""
+    if storage == 'shared_memory':
+        WORKER['memory'] = shared_memory.SharedMemory(name=location)
+        WORKER['returns'] = np.ndarray(shape, dtype=np.float64, buffer=WORKER['memory'].buf)
+    else:
+        WORKER['returns'] = np.load(location, mmap_mode='r')
+
+def worker_chunk(*args) -> tuple:
+    return resample_chunk(WORKER['returns'], *args)
+
+def resampled_frontier(returns: np.array
+                        , A: np.array
+                        , b: np.array
+                        , lb: np.array
+                        , ub: np.array
+                        , n_samples=1000
+                        , n_points=20
+                        , block=1
+                        , seed=0
+                        , processes=None
+                        , chunk_size=8
+                        , storage='shared_memory') -> dict:
+    """Computes the resampled efficient frontier.
+
+    Args:
+        returns: the (T, n_assets) matrix of the daily returns, without missing values
+        A, b: the constraints A @ x >= b of the minimum variance problem, as given by Portfolio.preprocess_matrix_qp
+        lb, ub: the bounds on the weights, used to compute the maximum expected return of each sample
+        n_samples: the number of bootstrap samples
+        n_points: the number of portfolios on each frontier
+        block: the length of the blocks of consecutive days of the bootstrap
+        seed: the seed from which the generator of each sample is spawned
+        processes: if given, the samples are split in chunks of chunk_size solved by a pool of processes
+        storage: 'shared_memory' or 'memmap', how the returns matrix is shared with the processes
+
+    Returns:
+        a dictionary with the average weights of the portfolios of each rank (one per row) and their standard deviation
+        over the samples, and the risk (standard deviation) and the expected return of the average portfolios
+        computed on the whole history. The samples whose frontier failed are dropped from the averages, their
+        number is failed_samples
+    """
+    if storage not in ('shared_memory', 'memmap'):
+        raise Exception(f"STOPPED EXECUTION: UNKNOWN STORAGE {storage}")
+    returns = np.ascontiguousarray(returns, dtype=np.float64)
+    lb, ub = np.asarray(lb, dtype=np.float64).ravel(), np.asarray(ub, dtype=np.float64).ravel()
+    seeds = np.random.SeedSequence(seed).spawn(n_samples)
+    chunks = [seeds[i:i + chunk_size] for i in range(0, n_samples, chunk_size)]
+
+    if processes is None:
+        results = [resample_chunk(returns, chunk, A, b, lb, ub, n_points, block) for chunk in chunks]
+    else:
+        with tempfile.TemporaryDirectory() as folder:
+            if storage == 'shared_memory':
+                memory = shared_memory.SharedMemory(create=True, size=max(returns.nbytes, 1))
+                np.ndarray(returns.shape, dtype=np.float64, buffer=memory.buf)[:] = returns
+                location = memory.name
+            else:
+                location = os.path.join(folder, 'returns.npy')
+                np.save(location, returns)
+            try:
+                with ProcessPoolExecutor(processes, initializer=attach_returns
+                                        , initargs=(storage, location, returns.shape)) as pool:
+                    n_chunks = len(chunks)
+                    results = list(pool.map(worker_chunk
+                                            , chunks
+                                            , [A] * n_chunks
+                                            , [b] * n_chunks
+                                            , [lb] * n_chunks
+                                            , [ub] * n_chunks
+                                            , [n_points] * n_chunks
+                                            , [block] * n_chunks))
+            finally:
+                if storage == 'shared_memory':
+                    memory.close()
+                    memory.unlink()
+
+    # The chunks are summed in order, so the result is the same for any number of processes
+    failed = sum(result[2] for result in results)
+    n_solved = n_samples - failed
+    if n_solved == 0:
+        raise Exception("STOPPED EXECUTION: NO BOOTSTRAP SAMPLE SOLVED")
+    total = sum(result[0] for result in results)
+    squares = sum(result[1] for result in results)
+    weights = total / n_solved
+    S = np.cov(returns, rowvar=False) * 252
+    return {'weights': weights
+            , 'weights_std': np.sqrt(np.maximum(squares / n_solved - weights**2, 0.0))
+            , 'risks': np.sqrt(np.einsum('ij,jk,ik->i', weights, S, weights))
+            , 'returns': weights @ returns.mean(axis=0)
+            , 'failed_samples': failed}
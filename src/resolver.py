@@ -0,0 +1,96 @@
+"""
+THIS FILE CONTAINS THE RESOLVER OF THE MARKET DATA REQUESTS.
+
+A request for some tickers over a date range is answered from the data already on disk whenever possible: the
+columnar store is sliced for the tickers and dates it covers, whatever the order and the size of the universe
+they were downloaded with, and the csv files of earlier downloads are indexed by ticker and date range so that
+their content is imported into the store when it fills a gap. Only what is still missing is downloaded.
+"""
+import ast
+import os
+import re
+from typing import List
+import pandas as pd
+import store
+
+CSV_PATTERN = re.compile(r'^ASSET_DATA_(\d{4}-\d{2}-\d{2})_to_(\d{4}-\d{2}-\d{2})_(\[.*\])\.csv$')
+
+class DataResolver:
+
+    def __init__(self, market_store=None, folder='./src/data', fetcher=None) -> None:
+        """
+        Args:
+            market_store: the columnar store holding the data, MarketDataStore() by default
+            folder: the folder with the csv files of the earlier downloads
+            fetcher: the download backend given to data.get_history_data, finance.yahoo.com by default
+        """
+        self.market_store = store.MarketDataStore() if market_store is None else market_store
+        self.folder = folder
+        self.fetcher = fetcher
+
+        # Where the data of the last request came from
+        self.stats = {'store': 0, 'csv': 0, 'download': 0}
+
+    def index(self) -> dict:
+        """Indexes the csv files of the folder by ticker.
+
+        Returns:
+            a dictionary from each ticker to the list of (start_date, end_date, path) of the files containing it
+        """
+        files = {}
+        if not os.path.isdir(self.folder):
+            return files
+        for name in sorted(os.listdir(self.folder)):
+            match = CSV_PATTERN.match(name)
+            if match is None:
+                continue
+            try:
+                tickers = ast.literal_eval(match.group(3))
+            except (ValueError, SyntaxError):
+                continue
+            for ticker in tickers:
+                files.setdefault(ticker, []).append((match.group(1), match.group(2), os.path.join(self.folder, name)))
+        return files
+
+    def resolve(self, tickers: List[str], start_date: str, end_date: str) -> pd.DataFrame:
+        """Returns the market data of the tickers over the date range in the long format of the csv files,
+        in the order of the tickers. The csv files are imported into the store as needed and the ranges
+        they do not cover either are downloaded.
+        """
+        self.stats = {'store': 0, 'csv': 0, 'download': 0}
+        missing = [ticker for ticker in tickers if not self.market_store.covers([ticker], start_date, end_date)]
+        self.stats['store'] = len(tickers) - len(missing)
+
+        if missing:
+            self.__import_csv(missing, start_date, end_date)
+            still_missing = [ticker for ticker in missing if not self.market_store.covers([ticker], start_date, end_date)]
+            self.stats['csv'] = len(missing) - len(still_missing)
+            self.stats['download'] = len(still_missing)
+            if still_missing:
+                # The download backends are only imported when something is missing
+                import data
+                data.get_history_data(still_missing, start_date, end_date, fetcher=self.fetcher
+                                    , market_store=self.market_store, save_csv=False)
+            if not self.market_store.covers(tickers, start_date, end_date):
+                raise Exception(f"STOPPED EXECUTION: NO MARKET DATA FROM {start_date} TO {end_date} FOR ALL OF {tickers}")
+
+        return self.market_store.load(tickers, start_date, end_date)
+
+    def __import_csv(self, tickers: List[str], start_date: str, end_date: str) -> None:
+        """Merges into the store the content of the csv files that overlap the requested range for the tickers.
+        A file that does not touch the stored range yet is retried after the others have extended it."""
+        files = self.index()
+        frames = {}
+        for ticker in tickers:
+            candidates = sorted(f for f in files.get(ticker, []) if f[0] <= end_date and f[1] >= start_date)
+            while candidates and not self.market_store.covers([ticker], start_date, end_date):
+                remaining = []
+                for first, last, path in candidates:
+                    if path not in frames:
+                        frames[path] = pd.read_csv(path).set_index('formatted_date')
+                    frame = frames[path]
+                    if not self.market_store.merge(frame[frame['ticker'] == ticker], first, last, tickers=[ticker]):
+                        remaining.append((first, last, path))
+                if len(remaining) == len(candidates):
+                    break
+                candidates = remaining
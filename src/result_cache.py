@@ -0,0 +1,193 @@
+"""
+THIS FILE CONTAINS A CONTENT-ADDRESSED CACHE OF THE SOLVED PORTFOLIO PROBLEMS.
+
+A problem is identified by a hash of its data (the bytes, dtype and shape of the covariance, the expected returns,
+the bounds, ...) together with the solver and its parameters, so the same problem has the same key whatever the
+portfolio or the process it comes from. The weights, the objective and the diagnostics of the solver are kept in
+two tiers:
+    - in memory, a least recently used dictionary of max_entries results, for hits in microseconds
+    - on disk, one .npz file per result, written atomically; the files are touched at each hit and the least
+      recently used ones are deleted when the folder exceeds max_bytes. The sizes are indexed in memory and the
+      folder is only read again when another process sharing it has been seen writing or deleting files
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+import numpy as np
+
+def digest(value) -> str:
+    """Hashes an array (its dtype, shape and bytes), or a string or bytes as they are."""
+    h = hashlib.blake2b(digest_size=20)
+    if isinstance(value, str):
+        h.update(value.encode())
+    elif isinstance(value, bytes):
+        h.update(value)
+    else:
+        array = np.ascontiguousarray(value)
+        h.update(f'{array.dtype.str}{array.shape}'.encode())
+        h.update(array.data)
+    return h.hexdigest()
+
+def problem_key(solver: str, params: dict, data: dict) -> str:
+    """Returns the key of a problem.
+
+    Args:
+        solver: the name of the solver
+        params: the parameters of the solver that change its result, json serializable
+        data: the arrays of the problem by name, or their digest when it is already known
+    """
+    parts = [solver, json.dumps(params, sort_keys=True, default=str)]
+    for name in sorted(data):
+        value = data[name]
+        parts.append(f'{name}={value if isinstance(value, str) else digest(value)}')
+    return digest('\n'.join(parts))
+
+class ResultCache:
+
+    def __init__(self, root='./src/data/cache', max_bytes=256 * 2**20, max_entries=256) -> None:
+        """
+        Args:
+            root: the folder of the results on disk, None to keep them in memory only
+            max_bytes: the size cap of the folder
+            max_entries: the number of results kept in memory
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'puts': 0, 'evictions': 0}
+
+        # Size of the files on disk by key, in least recently used order, and their total, see __index
+        self.__files = None
+        self.__bytes = 0
+        # Set when another process has been seen writing or deleting files in the folder
+        self.__stale = False
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.root, f'{key}.npz')
+
+    def __index(self) -> OrderedDict:
+        """Reads the sizes of the files on disk, in least recently used order, at the first access and when the index
+        is stale, and evicts the least recently used ones beyond max_bytes. Otherwise the index is kept up to date by
+        the puts and the evictions of this instance, without reading the folder."""
+        if self.__files is None or self.__stale:
+            self.__files = OrderedDict()
+            self.__stale = False
+            if self.root is not None and os.path.isdir(self.root):
+                entries = [e for e in os.scandir(self.root) if e.name.endswith('.npz')]
+                for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+                    self.__files[entry.name[:-4]] = entry.stat().st_size
+            self.__bytes = sum(self.__files.values())
+            self.__evict()
+        return self.__files
+
+    def __add(self, key: str, size: int) -> None:
+        self.__bytes += size - self.__files.get(key, 0)
+        self.__files[key] = size
+        self.__files.move_to_end(key)
+
+    def __discard(self, key: str) -> None:
+        self.__bytes -= self.__files.pop(key, 0)
+
+    def __evict(self) -> None:
+        """Deletes the least recently used files until the folder is within max_bytes, the last one is always kept."""
+        while self.__bytes > self.max_bytes and len(self.__files) > 1:
+            old, size = self.__files.popitem(last=False)
+            self.__bytes -= size
+            try:
+                os.remove(self.__path(old))
+            except FileNotFoundError:
+                # Already deleted by another process
+                self.__stale = True
+            self.counters['evictions'] += 1
+
+    def __remember(self, key: str, result: dict) -> None:
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key: str) -> dict:
+        """Returns the result stored under the key, None if there is none. The weights are read-only."""
+        result = self.memory.get(key)
+        if result is not None:
+            self.memory.move_to_end(key)
+            self.counters['memory_hits'] += 1
+            return result
+
+        if self.root is not None:
+            # The file is looked up on disk and not in the index, it may have been written by another process
+            path = self.__path(key)
+            try:
+                with np.load(path, allow_pickle=False) as stored:
+                    weights = stored['weights']
+                    meta = json.loads(str(stored['meta']))
+                os.utime(path)
+                size = os.path.getsize(path)
+            except (OSError, ValueError, KeyError):
+                # Missing, or deleted or corrupted by another process: it is a miss
+                if key in self.__index():
+                    self.__discard(key)
+                    self.__stale = True
+            else:
+                if key not in self.__index():
+                    # Written by another process, which may have written others too
+                    self.__stale = True
+                self.__add(key, size)
+                weights.flags.writeable = False
+                result = {'weights': weights, 'objective': meta['objective'], 'diagnostics': meta['diagnostics']}
+                self.__remember(key, result)
+                self.counters['disk_hits'] += 1
+                return result
+
+        self.counters['misses'] += 1
+        return None
+
+    def put(self, key: str, weights: np.array, objective: float, diagnostics: dict) -> dict:
+        """Stores a result in both tiers and evicts the least recently used files beyond max_bytes.
+
+        Returns:
+            the stored result, as get returns it
+        """
+        weights = np.array(weights, dtype=np.float64)
+        weights.flags.writeable = False
+        result = {'weights': weights, 'objective': float(objective), 'diagnostics': diagnostics}
+        self.__remember(key, result)
+        self.counters['puts'] += 1
+        if self.root is None:
+            return result
+
+        os.makedirs(self.root, exist_ok=True)
+        meta = json.dumps({'objective': result['objective'], 'diagnostics': diagnostics}, default=float)
+        temporary = os.path.join(self.root, f'.{key}.{os.getpid()}.tmp')
+        with open(temporary, 'wb') as f:
+            np.savez(f, weights=weights, meta=np.array(meta))
+        os.replace(temporary, self.__path(key))
+
+        self.__index()
+        self.__add(key, os.path.getsize(self.__path(key)))
+        self.__evict()
+        return result
+
+    def clear(self) -> None:
+        """Drops all the results, in memory and on disk."""
+        self.memory.clear()
+        for key in list(self.__index()) if self.root is not None else []:
+            try:
+                os.remove(self.__path(key))
+            except FileNotFoundError:
+                pass
+        self.__files = OrderedDict()
+        self.__bytes = 0
+
+    def stats(self) -> dict:
+        """Returns the counters, the hit rate and the number and size of the results in each tier."""
+        hits = self.counters['memory_hits'] + self.counters['disk_hits']
+        lookups = hits + self.counters['misses']
+        files = self.__index() if self.root is not None else {}
+        return {**self.counters
+                , 'hit_rate': hits / lookups if lookups else 0.0
+                , 'memory_entries': len(self.memory)
+                , 'disk_entries': len(files)
+                , 'disk_bytes': self.__bytes if self.root is not None else 0}
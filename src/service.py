@@ -0,0 +1,238 @@
+"""
+THIS FILE CONTAINS A LOCAL OPTIMIZATION SERVICE over HTTP/JSON, built on asyncio and the standard library only.
+
+    python src/service.py [--host 127.0.0.1] [--port 8050] [-w WORKERS]
+
+run from the root of the repository, where the market data are. The endpoints are:
+    - POST /solve: the body is a job as in optfolio, the answer is its result (status 200, or 422 if it failed)
+    - GET /metrics: the counters, the number of solves in flight, the queue depth and the latency percentiles
+    - GET /health
+Bodies over max_body bytes are rejected with 413. SIGTERM stops the server and its worker processes.
+
+The solves run in a pool of worker processes, so the event loop only parses the requests and stays responsive.
+Each worker keeps the portfolios it has loaded, with their market data and statistics, for the next requests on the
+same tickers and dates (the least recently used ones are dropped beyond max_portfolios). Identical requests that
+arrive while the first one is being solved are coalesced: they wait for the same solve instead of queueing new ones.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+import numpy as np
+import optfolio
+from solvers.telemetry import History
+
+# Portfolios loaded by the worker process, see attach_cache
+WORKER = {'portfolios': {}, 'max_portfolios': 16}
+
+def attach_cache(max_portfolios: int) -> None:
+    """Initializer of the worker processes."""
+    WORKER['max_portfolios'] = max_portfolios
+    optfolio.load_solvers()
+
+def worker_solve(job: dict) -> dict:
+    portfolios = WORKER['portfolios']
+    result = optfolio.run_job(job.get('id'), job, portfolios)
+    while len(portfolios) > WORKER['max_portfolios']:
+        del portfolios[next(iter(portfolios))]
+    return result
+
+def percentiles(history: History) -> dict:
+    if len(history) == 0:
+        return {'count': 0}
+    values = np.fromiter(history, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'count': values.shape[0], 'mean': values.mean(), 'p50': p50, 'p95': p95, 'p99': p99, 'max': values.max()}
+
+class OptimizationService:
+
+    def __init__(self, workers=None, max_portfolios=16, history_size=1024, max_body=2**20) -> None:
+        """
+        Args:
+            workers: the number of worker processes, all the cores by default
+            max_portfolios: the number of portfolios each worker keeps loaded
+            history_size: the number of the last requests the latency percentiles are computed on
+            max_body: the largest request body accepted, in bytes
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_portfolios = max_portfolios
+        self.max_body = max_body
+        self.pool = None
+        self.server = None
+
+        # Solves in flight by request, without its id
+        self.pending = {}
+        self.counters = {'requests': 0, 'solves': 0, 'coalesced': 0, 'errors': 0}
+        self.max_queue_depth = 0
+        self.latencies = History('last', history_size)
+        self.solve_latencies = History('last', history_size)
+
+    async def start(self, host='127.0.0.1', port=8050):
+        """Starts the worker processes, then the server."""
+        self.pool = ProcessPoolExecutor(self.workers, initializer=attach_cache, initargs=(self.max_portfolios,))
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self.pool, int) for _ in range(self.workers)])
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def solve(self, job: dict) -> dict:
+        """Solves the job, or waits for the solve of an identical job already in flight."""
+        key = json.dumps({k: v for k, v in job.items() if k != 'id'}, sort_keys=True)
+        future = self.pending.get(key)
+        coalesced = future is not None
+        if coalesced:
+            self.counters['coalesced'] += 1
+        else:
+            future = asyncio.ensure_future(self.__run(key, job))
+            self.pending[key] = future
+        # A cancelled request must not cancel the solve the others are waiting for
+        result = await asyncio.shield(future)
+        return {**result, 'id': job.get('id'), 'coalesced': coalesced}
+
+    async def __run(self, key: str, job: dict) -> dict:
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth())
+        begin = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, worker_solve, job)
+        finally:
+            del self.pending[key]
+            self.counters['solves'] += 1
+            self.solve_latencies.append(time.perf_counter() - begin)
+
+    def queue_depth(self) -> int:
+        """The number of solves waiting for a free worker."""
+        return max(0, len(self.pending) - self.workers)
+
+    def metrics(self) -> dict:
+        return {**self.counters
+                , 'workers': self.workers
+                , 'in_flight': len(self.pending)
+                , 'queue_depth': self.queue_depth()
+                , 'max_queue_depth': self.max_queue_depth
+                , 'latency': percentiles(self.latencies)
+                , 'solve_latency': percentiles(self.solve_latencies)}
+
+    async def route(self, method: str, path: str, body: bytes) -> tuple:
+        """Returns the status and the json payload of the answer to a request."""
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok'}
+        if method == 'GET' and path == '/metrics':
+            return 200, self.metrics()
+        if method != 'POST' or path != '/solve':
+            return 404, {'status': 'error', 'error': f'no route {method} {path}'}
+
+        begin = time.perf_counter()
+        self.counters['requests'] += 1
+        try:
+            job = json.loads(body)
+            if not isinstance(job, dict):
+                raise ValueError('a job must be a json object')
+        except ValueError as error:
+            self.counters['errors'] += 1
+            return 400, {'status': 'error', 'error': str(error)}
+        result = await self.solve(job)
+        self.latencies.append(time.perf_counter() - begin)
+        if result['status'] != 'ok':
+            self.counters['errors'] += 1
+            return 422, result
+        return 200, result
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serves the HTTP/1.1 requests of a connection, kept alive unless the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                try:
+                    length = int(headers.get('content-length', 0))
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # The end of the body is unknown, the connection cannot be reused
+                    self.counters['errors'] += 1
+                    await self.__respond(writer, 400, {'status': 'error', 'error': 'invalid Content-Length'}, False)
+                    break
+                if length > self.max_body:
+                    # The body is not read, the connection cannot be reused
+                    self.counters['errors'] += 1
+                    await self.__respond(writer, 413, {'status': 'error', 'error': f'body over {self.max_body} bytes'}, False)
+                    break
+                body = await reader.readexactly(length)
+
+                try:
+                    status, payload = await self.route(method, path.split('?')[0], body)
+                except Exception as error:
+                    # e.g. a worker process died and broke the pool
+                    self.counters['errors'] += 1
+                    status, payload = 500, {'status': 'error', 'error': f'{type(error).__name__}: {error}'}
+                await self.__respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def __respond(self, writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool) -> None:
+        content = json.dumps(payload, default=float).encode()
+        writer.write(f'HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n'
+                    f'Content-Type: application/json\r\n'
+                    f'Content-Length: {len(content)}\r\n'
+                    f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode() + content)
+        await writer.drain()
+
+async def serve(host: str, port: int, workers=None, max_portfolios=16, max_body=2**20) -> None:
+    service = OptimizationService(workers, max_portfolios, max_body=max_body)
+    server = await service.start(host, port)
+    print(f'Serving on http://{host}:{port} with {service.workers} workers', flush=True)
+    # SIGTERM (and Ctrl-C) stops the server and the worker processes, which would otherwise outlive it
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        service.close()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='optfolio-service', description='Serves portfolio optimizations over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('-w', '--workers', type=int, default=None, help='the number of worker processes')
+    parser.add_argument('--max-portfolios', type=int, default=16, help='the number of portfolios kept by each worker')
+    parser.add_argument('--max-body', type=int, default=2**20, help='the largest request body accepted, in bytes')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_portfolios, args.max_body))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+THIS FILE CONTAINS THE METHODS FOR THE BATCHED INTERIOR POINT ALGORITHM EXECUTION.
+"""
+import numpy as np
+from solvers.interior_point import OPTIMAL, PRIMAL_INFEASIBLE, DUAL_INFEASIBLE, MAX_ITERATION, NUMERICAL_ERROR
+
+def matvec(M: np.array, v: np.array) -> np.array:
+    """Batched matrix-vector product: M has shape (k, p, q) and v has shape (k, q)"""
+    return (M @ v[:, :, None])[:, :, 0]
+
+class BatchIntPoint:
+    """This class solves a stack of k convex quadratic programs of the same size at once, with the same
+    predictor-corrector iterations of IntPoint. Every linear algebra operation is applied to the whole stack
+    by the batched routines of np.linalg, and the problems that have already converged are masked out.
+    """
+
+    def __init__(self
+                , S: np.array
+                , c: np.array
+                , A: np.array
+                , b: np.array
+                , x_init: np.array
+                , y_init: np.array
+                , lm_init: np.array
+                , max_iteration=100
+                , epsilon=1.0e-5
+                , epsilon_infeasible=1.0e-6
+                , verbose=False) -> None:
+        """
+        Initializes a batched Interior Point session for the k quadratic programs
+            min x_i^T S_i x_i + x_i^T c_i s.t. A_i @ x_i >= b_i
+        where:
+            - S has shape (k, n, n), each S_i is a symmetric positive definite matrix
+            - c has shape (k, n) or (n,)
+            - A has shape (k, m, n) or (m, n) when all the problems share the constraints
+            - b has shape (k, m) or (m,)
+            - x_init, y_init and lm_init have shapes (k, n), (k, m) and (k, m), or (n,), (m,) and (m,)
+            - epsilon and epsilon_infeasible are the tolerances of the termination tests of IntPoint
+        """
+        self.S = np.asarray(S, dtype=np.float64)
+        self.n_problems, self.n_vars = self.S.shape[0], self.S.shape[-1]
+        self.A = np.broadcast_to(np.asarray(A, dtype=np.float64), (self.n_problems,) + np.shape(A)[-2:])
+        self.n_eq = self.A.shape[1]
+        self.c = np.broadcast_to(np.asarray(c, dtype=np.float64), (self.n_problems, self.n_vars))
+        self.b = np.broadcast_to(np.asarray(b, dtype=np.float64), (self.n_problems, self.n_eq))
+
+        self.iteration      = 0
+        self.verbose        = verbose
+        self.max_iteration  = max_iteration
+        self.epsilon        = epsilon
+        self.epsilon_infeasible = epsilon_infeasible
+
+        self.x_0  = np.array(np.broadcast_to(x_init, (self.n_problems, self.n_vars)), dtype=np.float64)
+        self.y_0  = np.array(np.broadcast_to(y_init, (self.n_problems, self.n_eq)), dtype=np.float64)
+        self.lm_0 = np.array(np.broadcast_to(lm_init, (self.n_problems, self.n_eq)), dtype=np.float64)
+
+        # Solutions and number of iterations of each problem
+        self.solutions  = self.x_0.copy()
+        self.slacks     = self.y_0.copy()
+        self.lambdas    = self.lm_0.copy()
+        self.iterations = np.zeros(self.n_problems, dtype=int)
+        self.converged  = np.zeros(self.n_problems, dtype=bool)
+        self.status     = np.full(self.n_problems, MAX_ITERATION, dtype=object)
+
+        # Matrices of the problems still being solved, see stack
+        self.__stack = None
+
+    def stack(self, idx) -> tuple:
+        """Returns the matrices S and A of the problems idx. They are gathered once for each stack of problems, and
+        the constraints shared by all the problems are a broadcast view instead of a copy."""
+        if self.__stack is None or self.__stack[0] is not idx:
+            shared = self.A.strides[0] == 0
+            A = np.broadcast_to(self.A[0], (idx.shape[0],) + self.A.shape[1:]) if shared else self.A[idx]
+            self.__stack = (idx, self.S[idx], A)
+        return self.__stack[1:]
+
+    def compute_residuals(self, idx, x_k, y_k, lm_k) -> tuple:
+        """Computes the dual and primal residuals of the problems idx, see IntPoint.compute_residuals"""
+        S, A = self.stack(idx)
+        rd = matvec(S, x_k) - matvec(np.swapaxes(A, 1, 2), lm_k) + self.c[idx]
+        rp = matvec(A, x_k) - y_k - self.b[idx]
+        return rd, rp
+
+    def compute_convergence_metrics(self, idx, x_k, y_k, lm_k) -> tuple:
+        """Computes the scaled primal and dual residuals and the relative duality gap of the problems idx,
+        see IntPoint.compute_convergence_metrics"""
+        S, A = self.stack(idx)
+        A_T = np.swapaxes(A, 1, 2)
+        Sx = matvec(S, x_k)
+        Ax = matvec(A, x_k)
+        ATlm = matvec(A_T, lm_k)
+        xSx = np.sum(x_k * Sx, axis=1)
+        primal_objective = 0.5 * xSx + np.sum(self.c[idx] * x_k, axis=1)
+        dual_objective = np.sum(self.b[idx] * lm_k, axis=1) - 0.5 * xSx
+        norm = lambda v: np.max(np.abs(v), axis=1)
+        floor = np.finfo(np.float64).eps
+        primal = norm(Ax - y_k - self.b[idx]) / np.maximum.reduce([norm(Ax), norm(y_k), norm(self.b[idx]), np.full(idx.shape[0], floor)])
+        dual = norm(Sx - ATlm + self.c[idx]) / np.maximum.reduce([norm(Sx), norm(ATlm), norm(self.c[idx]), np.full(idx.shape[0], floor)])
+        gap = np.sum(y_k * lm_k, axis=1) / np.maximum.reduce([np.abs(primal_objective), np.abs(dual_objective), np.full(idx.shape[0], floor)])
+        return primal, dual, gap
+
+    def check_infeasibility(self, idx, lm_k, dx) -> np.array:
+        """Returns the status of the problems idx that have a certificate of infeasibility, None for the others,
+        see IntPoint.check_infeasibility"""
+        eps = self.epsilon_infeasible
+        S, A = self.stack(idx)
+        status = np.full(idx.shape[0], None, dtype=object)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lm_dir = lm_k / np.max(np.abs(lm_k), axis=1, keepdims=True)
+            dx_dir = dx / np.max(np.abs(dx), axis=1, keepdims=True)
+        primal = (np.sum(self.b[idx] * lm_dir, axis=1) >= eps) \
+            & (np.max(np.abs(matvec(np.swapaxes(A, 1, 2), lm_dir)), axis=1) <= eps)
+        dual = (np.sum(self.c[idx] * dx_dir, axis=1) <= -eps) \
+            & (np.max(np.abs(matvec(S, dx_dir)), axis=1) <= eps) \
+            & (np.min(matvec(A, dx_dir), axis=1) >= -eps)
+        status[primal] = PRIMAL_INFEASIBLE
+        status[dual & ~primal] = DUAL_INFEASIBLE
+        return status
+
+    def factorize_kkt(self, idx, y_k, lm_k) -> tuple:
+        """Computes the inverses of the reduced matrices S + A.T @ (Y^-1 LA) @ A of the problems idx from their
+        batched Cholesky factorizations. There is no batched triangular solver in numpy, hence the inverses are used
+        to reuse the factorization work for both the predictor and the corrector step.
+        A problem whose matrix is not finite or not positive definite does not stop the others: its matrix is replaced
+        by the identity and it is reported as failed.
+
+        Returns:
+            the inverses and the boolean mask of the problems whose factorization failed
+        """
+        S, A = self.stack(idx)
+        M = S + (np.swapaxes(A, 1, 2) * (lm_k / y_k)[:, None, :]) @ A
+        failed = ~np.all(np.isfinite(M), axis=(1, 2))
+        M[failed] = np.eye(self.n_vars)
+        try:
+            L = np.linalg.cholesky(M)
+        except np.linalg.LinAlgError:
+            # The batched routine fails as a whole, the problems are factorized one by one to find the failing ones
+            L = np.empty_like(M)
+            for i in range(M.shape[0]):
+                try:
+                    L[i] = np.linalg.cholesky(M[i])
+                except np.linalg.LinAlgError:
+                    failed[i] = True
+                    L[i] = np.eye(self.n_vars)
+        L_inv = np.linalg.inv(L)
+        return np.swapaxes(L_inv, 1, 2) @ L_inv, failed
+
+    def solve_kkt(self, idx, M_inv, y_k, lm_k, rd, rp, rc) -> tuple:
+        """Solves the reduced KKT systems of the problems idx, see IntPoint.solve_kkt"""
+        _, A = self.stack(idx)
+        rhs = -rd + matvec(np.swapaxes(A, 1, 2), (rc - lm_k * rp) / y_k)
+        dx = matvec(M_inv, rhs)
+        dy = matvec(A, dx) + rp
+        dlm = (rc - lm_k * dy) / y_k
+        return dx, dy, dlm
+
+    def compute_max_step(self, v, dv, tau=1.0) -> np.array:
+        """Closed form fraction to the boundary rule for each problem, see IntPoint.compute_max_step"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = np.where(dv < 0, -tau * v / dv, np.inf)
+        return np.minimum(1.0, np.min(ratios, axis=1))
+
+    def solve(self) -> None:
+        """This method solves all the minimization problems by applying the predictor-corrector algorithm
+        to the stack of the problems that have not converged yet.
+        """
+        idx = np.arange(self.n_problems)
+
+        # The first step computes an affine scaling step from the starting points
+        x_k, y_k, lm_k = self.x_0.copy(), self.y_0, self.lm_0
+        rd, rp = self.compute_residuals(idx, x_k, y_k, lm_k)
+        M_inv, failed = self.factorize_kkt(idx, y_k, lm_k)
+        _, dy_aff, dlm_aff = self.solve_kkt(idx, M_inv, y_k, lm_k, rd, rp, -lm_k * y_k)
+        y_k = np.maximum(1, np.absolute(dy_aff + y_k))
+        lm_k = np.maximum(1, np.absolute(dlm_aff + lm_k))
+        idx, x_k, y_k, lm_k = self.__retire(failed, idx, x_k, y_k, lm_k)
+
+        while self.iteration < self.max_iteration and idx.shape[0] > 0:
+            # The same factorization is used for both the predictor and the corrector step
+            M_inv, failed = self.factorize_kkt(idx, y_k, lm_k)
+            if np.any(failed):
+                idx, x_k, y_k, lm_k = self.__retire(failed, idx, x_k, y_k, lm_k)
+                M_inv = M_inv[~failed]
+                if idx.shape[0] == 0:
+                    break
+
+            rd, rp = self.compute_residuals(idx, x_k, y_k, lm_k)
+            mu = np.sum(y_k * lm_k, axis=1) / self.n_eq
+            _, dy_aff, dlm_aff = self.solve_kkt(idx, M_inv, y_k, lm_k, rd, rp, -lm_k * y_k)
+
+            step_aff = np.minimum(self.compute_max_step(y_k, dy_aff), self.compute_max_step(lm_k, dlm_aff))
+            mu_aff = np.sum((y_k + step_aff[:, None] * dy_aff) * (lm_k + step_aff[:, None] * dlm_aff), axis=1) / self.n_eq
+            sigma = (mu_aff / mu)**3
+
+            rc = -lm_k * y_k - dlm_aff * dy_aff + (sigma * mu)[:, None]
+            dx, dy, dlm = self.solve_kkt(idx, M_inv, y_k, lm_k, rd, rp, rc)
+
+            tau = min(1 - 0.5**(self.iteration + 1), 1 - 1.0e-8)
+            step = np.minimum(self.compute_max_step(y_k, dy, tau), self.compute_max_step(lm_k, dlm, tau))[:, None]
+
+            self.iteration += 1
+            x_k = x_k + step * dx
+            y_k = y_k + step * dy
+            lm_k = lm_k + step * dlm
+            self.iterations[idx] = self.iteration
+
+            # The problems that satisfy the KKT conditions, are infeasible or have left the finite numbers are stored
+            # and removed from the stack
+            with np.errstate(invalid='ignore'):
+                primal, dual, gap = self.compute_convergence_metrics(idx, x_k, y_k, lm_k)
+                optimal = np.maximum.reduce([primal, dual, gap]) < self.epsilon
+                status = self.check_infeasibility(idx, lm_k, dx)
+            status[optimal] = OPTIMAL
+            finite = np.all(np.isfinite(x_k), axis=1) & np.all(np.isfinite(y_k), axis=1) & np.all(np.isfinite(lm_k), axis=1)
+            status[~finite] = NUMERICAL_ERROR
+            done = status != None
+            self.solutions[idx], self.slacks[idx], self.lambdas[idx] = x_k, y_k, lm_k
+            self.converged[idx[optimal & finite]] = True
+            self.status[idx[done]] = status[done]
+
+            if self.verbose: print(f'Iteration {self.iteration}: {np.count_nonzero(done)} problems converged, {np.count_nonzero(~done)} left')
+            idx, x_k, y_k, lm_k = idx[~done], x_k[~done], y_k[~done], lm_k[~done]
+
+    def __retire(self, failed, idx, x_k, y_k, lm_k) -> tuple:
+        """Stores the failed problems of the stack with status NUMERICAL_ERROR, returns the stack of the others."""
+        self.solutions[idx[failed]], self.slacks[idx[failed]], self.lambdas[idx[failed]] = x_k[failed], y_k[failed], lm_k[failed]
+        self.status[idx[failed]] = NUMERICAL_ERROR
+        return idx[~failed], x_k[~failed], y_k[~failed], lm_k[~failed]
+
+    def print_solution(self) -> None:
+        print(f'{np.count_nonzero(self.converged)} of {self.n_problems} problems converged in at most {self.iteration} iterations')
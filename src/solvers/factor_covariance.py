@@ -0,0 +1,104 @@
+"""
+THIS FILE CONTAINS THE FACTOR-MODEL REPRESENTATION OF THE COVARIANCE MATRIX used by the interior point solver
+for very large universes.
+
+The covariance is S = B @ F @ B.T + diag(D) where B holds the loadings of the n assets on k factors, F is the k x k
+covariance of the factors and D the specific variances of the assets. The dense n x n matrix is never formed:
+products cost O(n * k) and the Newton systems are solved with the Woodbury identity in O(n * k^2).
+"""
+import numpy as np
+from scipy import sparse
+from scipy.linalg import cho_factor, cho_solve
+
+class FactorCovariance:
+
+    # Makes numpy defer x @ S to __rmatmul__ instead of treating S as a scalar object
+    __array_ufunc__ = None
+
+    def __init__(self, B: np.array, F: np.array, D: np.array) -> None:
+        """
+        Args:
+            B: the (n, k) matrix of the factor loadings
+            F: the (k, k) covariance matrix of the factors, positive definite
+            D: the (n,) vector of the specific variances, positive
+        """
+        self.B = np.asarray(B, dtype=np.float64)
+        self.F = np.asarray(F, dtype=np.float64)
+        self.D = np.asarray(D, dtype=np.float64)
+        self.shape = (self.B.shape[0], self.B.shape[0])
+
+    def __matmul__(self, x: np.array) -> np.array:
+        return self.B @ (self.F @ (self.B.T @ x)) + self.D * x
+
+    def __rmatmul__(self, x: np.array) -> np.array:
+        # S is symmetric
+        return self @ x
+
+    def __mul__(self, scalar: float):
+        return FactorCovariance(self.B, self.F * scalar, self.D * scalar)
+
+    __rmul__ = __mul__
+
+    def to_dense(self) -> np.array:
+        return self.B @ self.F @ self.B.T + np.diag(self.D)
+
+    def factorize(self, A, w: np.array):
+        """Factorizes the reduced matrix M = S + A.T @ diag(w) @ A of the interior point method.
+        The rows of A with a single nonzero (the bounds) only add to the diagonal, the remaining ones
+        (full investment, sectors, ...) are a low rank term together with the factors, hence:
+            M = E + U @ C @ U.T,  E diagonal, U = [B, A_g.T], C = blockdiag(F, diag(w_g))
+        """
+        A = sparse.csr_matrix(A)
+        single = np.diff(A.indptr) == 1
+
+        bounds = sparse.diags(w[single]) @ A[single].multiply(A[single])
+        E = self.D + np.asarray(bounds.sum(axis=0)).ravel()
+
+        general = A[~single].toarray()
+        U = np.hstack([self.B, general.T])
+        C = np.zeros((U.shape[1], U.shape[1]))
+        k = self.B.shape[1]
+        C[:k, :k] = self.F
+        C[k:, k:] = np.diag(w[~single])
+        return WoodburyFactor(E, U, C)
+
+class WoodburyFactor:
+    """Solves (E + U @ C @ U.T) @ x = r with the Woodbury identity:
+        x = E^-1 r - E^-1 U (C^-1 + U.T E^-1 U)^-1 U.T E^-1 r
+    where E is diagonal and C is a small positive definite matrix.
+    """
+
+    def __init__(self, E: np.array, U: np.array, C: np.array) -> None:
+        self.E = E
+        self.U = U
+        capacitance = np.linalg.inv(C) + U.T @ (U / E[:, None])
+        self.factor = cho_factor(capacitance)
+
+    def solve(self, r: np.array) -> np.array:
+        z = r / self.E
+        return z - (self.U @ cho_solve(self.factor, self.U.T @ z)) / self.E
+
+def pca_factor_model(returns: np.array, n_factors: int) -> FactorCovariance:
+    """Estimates a factor model from the (T, n) matrix of the returns with the principal components:
+    the loadings are the first n_factors right singular vectors of the centered returns, the factor variances
+    the corresponding eigenvalues, and the specific variances what is left of the variance of each asset.
+    """
+    X = (returns - returns.mean(axis=0)) / np.sqrt(returns.shape[0] - 1)
+    _, s, Vt = np.linalg.svd(X, full_matrices=False)
+    B = Vt[:n_factors].T
+    F = np.diag(s[:n_factors]**2)
+    variances = np.sum(X**2, axis=0)
+    D = np.maximum(variances - np.sum(B**2 * s[:n_factors]**2, axis=1), 1.0e-8 * np.max(variances))
+    return FactorCovariance(B, F, D)
+
+def loadings_factor_model(returns: np.array, loadings: np.array) -> FactorCovariance:
+    """Estimates a factor model from the (T, n) matrix of the returns and the given (n, k) loadings:
+    the factor returns are obtained by least squares at each date, F is their covariance and D the variance
+    of the residuals of each asset.
+    """
+    X = returns - returns.mean(axis=0)
+    factors = np.linalg.lstsq(loadings, X.T, rcond=None)[0].T
+    residuals = X - factors @ loadings.T
+    F = np.atleast_2d(np.cov(factors, rowvar=False))
+    D = np.maximum(np.var(residuals, axis=0, ddof=1), 1.0e-12)
+    return FactorCovariance(loadings, F, D)
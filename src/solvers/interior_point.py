@@ -1,8 +1,22 @@
 """
 THIS FILE CONTAINS THE METHODS FOR THE INTERIOR POINT ALGORITHM EXECUTION for the PORTFOLIO OPTIMIZATION.
 """
+import time
 import numpy as np
-from matplotlib import pyplot as plt
+from scipy import sparse
+from scipy.linalg import cho_factor, cho_solve, get_blas_funcs
+from solvers.factor_covariance import FactorCovariance, WoodburyFactor
+from solvers.telemetry import History, Telemetry
+
+# Termination status of the solver
+OPTIMAL             = 'optimal'
+PRIMAL_INFEASIBLE   = 'primal_infeasible'
+DUAL_INFEASIBLE     = 'dual_infeasible'
+MAX_ITERATION       = 'max_iteration'
+NUMERICAL_ERROR     = 'numerical_error'
+
+# Precision of the data and of the factorizations, see IntPoint
+PRECISIONS = ('double', 'mixed')
 
 class IntPoint:
     """This class contains an implementation of a modified version of the Mehrotra predictor-corrector method for linear programming.
@@ -20,20 +34,59 @@ class IntPoint:
                 , const=0.0
                 , max_iteration=100
                 , epsilon=1.0e-5
+                , epsilon_infeasible=1.0e-6
+                , kkt='normal'
+                , split_step=False
+                , warm_start=False
+                , precision='double'
+                , refine_tolerance=1.0e-3
+                , callback=None
+                , history='last'
+                , history_size=1
                 , verbose=False) -> None:
         """
         Initializes an Interior Point session in the standard form for solving a quadratic program
             min x^T S x + x^T c + const s.t. A @ x >= b
         where:
-            - S is a symmetric positive semi-definite matrix
-            - A is the matrix of coefficients for the constraint equations
+            - S is a symmetric positive semi-definite matrix, or a FactorCovariance that is never formed as a dense matrix
+            - A is the matrix of coefficients for the constraint equations, either dense or a scipy.sparse matrix
             - b is the vector of constants on the RHS of the constraint equations
+            - epsilon is the tolerance on the scaled residuals and on the relative duality gap, see compute_convergence_metrics
+            - epsilon_infeasible is the tolerance of the certificates of infeasibility, see check_infeasibility
+            - kkt is the strategy used for the Newton systems: 'normal' solves the reduced normal equations
+              by means of a Cholesky factorization, 'dense' solves the whole block system
+            - split_step allows different step lengths for the primal (x, y) and the dual (lm) variables
+            - warm_start tells that the starting point is the solution of a nearby problem, e.g. the previous solve after
+              a small change of S or b, so it is only recentered (see recenter) instead of being moved by a first affine step.
+              In that case y_init can be None, the slacks are then recomputed as A @ x_init - b
+            - precision 'mixed' keeps S and A in float32, and the first iterations factorize and solve the Newton
+              systems in float32, at half the bandwidth of float64. Once the scaled error is below refine_tolerance
+              (or if a float32 factorization or solve fails, as the systems get ill-conditioned close to the solution)
+              the remaining iterations factorize in float64 to reach epsilon, and the products with A are done in
+              float64. The float64 factorization needs the whole n x n matrix, so the peak memory of the solve is the
+              same as in double precision. A factor model is kept in float64
+            - callback is called at each iteration with a record of the step sizes, the residuals, mu and the time
+              spent in the factorization and in the whole iteration (with kkt='dense' the factorization is part of the solves)
+            - history tells which iterates and records are kept: 'none', the 'last' history_size ones or the 'full' history.
+              The final point is always available as solutions, slacks and lambdas
         This code follows the algorithm presented in Nocedal & Wright (2006)[Numerical Optimization]
         """
-        self.S = S
-        self.A = A
-        self.b = b.reshape((1, b.shape[0]))
-        self.c = c
+        if precision not in PRECISIONS:
+            raise Exception(f"STOPPED EXECUTION: UNKNOWN PRECISION {precision}")
+        self.precision = precision
+        dtype = np.float32 if precision == 'mixed' else np.float64
+        # Precision of the factorizations, float32 until the refinement with mixed precision
+        self.factor_dtype = dtype
+        self.refine_tolerance = refine_tolerance
+        self.refined_at = None
+
+        self.S = S if isinstance(S, FactorCovariance) else np.asarray(S, dtype=dtype)
+        self.A = A.tocsr().astype(dtype) if sparse.issparse(A) else np.asarray(A, dtype=dtype)
+        if isinstance(S, FactorCovariance) and not sparse.issparse(self.A):
+            # The factor model splits the rows of A at each iteration, which is cheap only in sparse form
+            self.A = sparse.csr_matrix(self.A)
+        self.b = np.asarray(b, dtype=np.float64).reshape((b.shape[0],))
+        self.c = np.asarray(c, dtype=np.float64)
         self.const = const
 
         self.n_vars = self.A.shape[1]
@@ -43,13 +96,31 @@ class IntPoint:
         self.verbose        = verbose
         self.max_iteration  = max_iteration
         self.epsilon        = epsilon           # for the tolerance
+        self.epsilon_infeasible = epsilon_infeasible
+
+        if kkt not in ('normal', 'dense'):
+            raise Exception(f"STOPPED EXECUTION: UNKNOWN KKT STRATEGY {kkt}")
+        self.kkt            = kkt
+        self.split_step     = split_step
+        self.warm_start     = warm_start
 
         # History of values
-        self.hsol           = []
-        self.hslack         = []
-        self.hlambdas       = []
-        self.steps          = [0]
+        self.hsol           = History(history, history_size)
+        self.hslack         = History(history, history_size)
+        self.hlambdas       = History(history, history_size)
+        self.steps          = History(history, history_size)
+        self.dual_steps     = History(history, history_size)
+        self.steps.append(0)
+        self.dual_steps.append(0)
         self.fobj           = self.compute_fobj_history()
+        self.telemetry      = Telemetry(callback, history, history_size)
+
+        # Final point, termination status and convergence metrics at the final point
+        self.solutions      = None
+        self.slacks         = None
+        self.lambdas        = None
+        self.status         = None
+        self.metrics        = {}
 
         # Initialization variables: user-defined starting point
         self.x_0  = x_init
@@ -57,101 +128,255 @@ class IntPoint:
         self.y_0  = y_init                      # slack
         self.lm_0 = lm_init                     # langrangian multiplier
 
+    def __dot(self, M, v: np.array) -> np.array:
+        """Product of S, A or A.T with a float64 vector, computed in the precision of the matrix
+        so that a float32 matrix is never copied to float64."""
+        if isinstance(M, FactorCovariance):
+            return M @ v
+        return np.asarray(M @ v.astype(M.dtype, copy=False), dtype=np.float64)
+
     def compute_mu(self, y_k, lm_k) -> np.float64:
         return (y_k.T @ lm_k) / self.n_eq
 
-    def corrector_step(self, x_k, y_k, lm_k, Gamma_aff, Lambda_aff, sigma) -> tuple:
-        """It computes the affine scaling step (w_aff, y_aff, lm_aff) from the point (x_k, y_k, lm_k)
-        by solving the system built with the perturbed KKT conditions for the given convex quadratic program.
-
-        The linear system is of the form:
-        [G  0 -A.T [d_x   [      -rd
-         A -I  0    d_y  =       -rp
-         0  LA GA ] d_lm]  -LA @ GA @ e + sigma @ mu @ e]
-        Obtained by fixing mu and applying the Newton's method to KKT conditions.
+    def compute_residuals(self, x_k, y_k, lm_k) -> tuple:
+        """Computes the dual and primal residuals of the KKT conditions at the point (x_k, y_k, lm_k):
+            rd = S @ x - A.T @ lm + c
+            rp = A @ x - y - b
         """
-        # Linear system computation
-        Gamma = np.diag(y_k)
-        Lambda = np.diag(lm_k)
-        rd = self.S @ x_k - self.A.T @ lm_k + self.c.T
-        rp = self.A @ x_k - y_k - self.b
-        mu = self.compute_mu(y_k, lm_k)         # the complementarity measure
-        e = np.ones((self.n_eq))
-
+        rd = self.__dot(self.S, x_k) - self.__dot(self.A.T, lm_k) + self.c
+        rp = self.__dot(self.A, x_k) - y_k - self.b
+        return rd, rp
+
+    def compute_convergence_metrics(self, x_k, y_k, lm_k) -> dict:
+        """Computes the measures of optimality at the point (x_k, y_k, lm_k), in the infinity norm:
+            - primal_residual: ||A @ x - y - b|| / max(||A @ x||, ||y||, ||b||)
+            - dual_residual: ||S @ x - A.T @ lm + c|| / max(||S @ x||, ||A.T @ lm||, ||c||)
+            - gap: the duality gap y^T lm relative to the largest of the primal and dual objectives
+              1/2 x^T S x + c^T x and b^T lm - 1/2 x^T S x
+        They are relative to the size of the terms they are made of, so the tolerance does not depend on the
+        scale of the data: the variances of a portfolio are far below any absolute tolerance.
+        """
+        Sx = self.__dot(self.S, x_k)
+        Ax = self.__dot(self.A, x_k)
+        ATlm = self.__dot(self.A.T, lm_k)
+        xSx = x_k @ Sx
+        primal_objective = 0.5 * xSx + self.c @ x_k
+        dual_objective = self.b @ lm_k - 0.5 * xSx
+        norm = lambda v: np.max(np.abs(v)) if v.shape[0] > 0 else 0.0
+        floor = np.finfo(np.float64).eps
+        return {'primal_residual': norm(Ax - y_k - self.b) / max(norm(Ax), norm(y_k), norm(self.b), floor)
+                , 'dual_residual': norm(Sx - ATlm + self.c) / max(norm(Sx), norm(ATlm), norm(self.c), floor)
+                , 'gap': (y_k @ lm_k) / max(abs(primal_objective), abs(dual_objective), floor)
+                , 'mu': self.compute_mu(y_k, lm_k)
+                , 'objective': primal_objective}
+
+    def check_infeasibility(self, lm_k, dx) -> str:
+        """Looks for a certificate of infeasibility, returns the corresponding status or None.
+            - the problem is primal infeasible if there is lm >= 0 with A.T @ lm = 0 and b^T lm > 0 (Farkas' lemma):
+              when it is so the multipliers diverge along such a direction, so lm_k / ||lm_k|| is tested
+            - the problem is dual infeasible (unbounded) if there is a direction d with S @ d = 0, A @ d >= 0 and c^T d < 0:
+              the Newton direction dx is tested, normalized by its norm
+        Both tests are scale invariant and use the tolerance epsilon_infeasible.
+        """
+        eps = self.epsilon_infeasible
+        lm_norm = np.max(np.abs(lm_k))
+        if lm_norm > 0:
+            lm_dir = lm_k / lm_norm
+            if self.b @ lm_dir >= eps and np.max(np.abs(self.__dot(self.A.T, lm_dir))) <= eps:
+                return PRIMAL_INFEASIBLE
+        dx_norm = np.max(np.abs(dx))
+        if dx_norm > 0:
+            dx_dir = dx / dx_norm
+            if self.c @ dx_dir <= -eps and np.max(np.abs(self.__dot(self.S, dx_dir))) <= eps \
+                and np.min(self.__dot(self.A, dx_dir)) >= -eps:
+                return DUAL_INFEASIBLE
+        return None
+
+    def factorize_kkt(self, y_k, lm_k):
+        """Computes the Cholesky factorization of the reduced (normal equations) matrix
+            M = S + A.T @ (Y^-1 LA) @ A
+        obtained by eliminating the slack and multiplier blocks from the KKT system. Since Y and LA are
+        diagonal the elimination is cheap, and the factorization can be reused for every right hand side
+        at the same point, i.e. for both the predictor and the corrector step.
+        With a factor model covariance M is diagonal plus low rank and it is factorized by the Woodbury identity.
+        M is built and factorized in place in the precision factor_dtype.
+        """
+        if isinstance(self.S, FactorCovariance):
+            return self.S.factorize(self.A, lm_k / y_k)
+        w = (lm_k / y_k).astype(self.factor_dtype)
+        A = self.A.astype(self.factor_dtype, copy=False)
+        M = self.S.astype(self.factor_dtype, order='C')
+        if sparse.issparse(A):
+            # The rows with a single nonzero (the bounds) only add to the diagonal and the dense ones (full investment)
+            # are rank one updates made in place by BLAS, so that M is the only n x n array. Only the nonzero
+            # coefficients of the other rows (sectors, ...) take part in the product
+            nnz = np.diff(A.indptr)
+            single = nnz == 1
+            dense = (nnz > A.shape[1] // 2) & ~single
+            other = ~(single | dense)
+            M[np.diag_indices_from(M)] += A[single].multiply(A[single]).T @ w[single]
+            if np.any(other):
+                R = (A[other].T @ (sparse.diags(w[other]) @ A[other])).tocoo()
+                M[R.row, R.col] += R.data
+            ger = get_blas_funcs('ger', (M,))
+            for row, w_i in zip(A[dense].toarray(), w[dense]):
+                M = ger(w_i, row, row, a=M.T, overwrite_a=True).T
+        else:
+            M += A.T @ (w[:, None] * A)
+        # M is symmetric, its transpose is the Fortran-ordered array LAPACK factorizes without a copy
+        return cho_factor(M.T, overwrite_a=True)
+
+    def solve_kkt(self, factor, y_k, lm_k, rd, rp, rc) -> tuple:
+        """Solves the perturbed KKT system with right hand side (-rd, -rp, rc) by using the factorization
+        of the reduced matrix. From the second and third block rows:
+            d_y  = A @ d_x + rp
+            d_lm = Y^-1 (rc - LA @ d_y)
+        and substituting in the first one:
+            (S + A.T Y^-1 LA A) d_x = -rd + A.T Y^-1 (rc - LA @ rp)
+        """
+        rhs = -rd + self.__dot(self.A.T, (rc - lm_k * rp) / y_k)
+        if isinstance(factor, WoodburyFactor):
+            dx = factor.solve(rhs)
+        else:
+            dx = cho_solve(factor, rhs.astype(factor[0].dtype, copy=False)).astype(np.float64, copy=False)
+        dy = self.__dot(self.A, dx) + rp
+        dlm = (rc - lm_k * dy) / y_k
+        return dx, dy, dlm
+
+    def solve_dense_kkt(self, y_k, lm_k, rd, rp, rc) -> tuple:
+        """Solves the full perturbed KKT system by assembling the whole block matrix.
+        It is way slower than the reduced system, it is kept as a reference implementation.
+        """
+        A = (self.A.toarray() if sparse.issparse(self.A) else self.A).astype(np.float64, copy=False)
+        S = self.S.to_dense() if isinstance(self.S, FactorCovariance) else self.S.astype(np.float64, copy=False)
         # Left hand side of the linear system
         LHS = np.block([
-            [self.S, np.zeros((self.n_vars, self.n_eq)), -self.A.T],
-            [self.A, -np.eye(self.n_eq), np.zeros((self.n_eq, self.n_eq))],
-            [np.zeros((self.n_eq, self.n_vars)), Lambda, Gamma]
+            [S, np.zeros((self.n_vars, self.n_eq)), -A.T],
+            [A, -np.eye(self.n_eq), np.zeros((self.n_eq, self.n_eq))],
+            [np.zeros((self.n_eq, self.n_vars)), np.diag(lm_k), np.diag(y_k)]
         ])
 
         # Right hand side of the linear system
-        RHS = np.block([
-            -rd,
-            -rp,
-            -Lambda @ Gamma @ e - Lambda_aff @ Gamma_aff @ e + sigma * mu * e
-        ])
+        RHS = np.concatenate([-rd, -rp, rc])
 
         # Solve the linear system to obtain the step's coordinates
-        solutions = np.linalg.solve(LHS, RHS.T)
+        solutions = np.linalg.solve(LHS, RHS)
         # The first n_vars values are the xs
         dx = solutions[:self.n_vars]
-        # The first n_vars * n_eq values are the slack variables
+        # The following n_eq values are the slack variables
         dy = solutions[self.n_vars:self.n_vars + self.n_eq]
         # The remaining ones are the lambdas
         dlm = solutions[-self.n_eq:]
+        return dx, dy, dlm
+
+    def corrector_step(self, x_k, y_k, lm_k, dy_aff, dlm_aff, sigma, factor=None) -> tuple:
+        """It computes the step (d_x, d_y, d_lm) from the point (x_k, y_k, lm_k)
+        by solving the system built with the perturbed KKT conditions for the given convex quadratic program.
+
+        The linear system is of the form:
+        [G  0 -A.T [d_x   [      -rd
+         A -I  0    d_y  =       -rp
+         0  LA GA ] d_lm]  -LA @ GA @ e - LA_aff @ GA_aff @ e + sigma @ mu @ e]
+        Obtained by fixing mu and applying the Newton's method to KKT conditions.
+        The affine scaling (predictor) step is obtained with zero affine deltas and sigma equal to zero.
+
+        A factorization previously computed with factorize_kkt at the same point can be given
+        to avoid computing it again.
+        """
+        rd, rp = self.compute_residuals(x_k, y_k, lm_k)
+        mu = self.compute_mu(y_k, lm_k)         # the complementarity measure
+        rc = -lm_k * y_k - dlm_aff * dy_aff + sigma * mu
+
+        if self.kkt == 'dense':
+            return self.solve_dense_kkt(y_k, lm_k, rd, rp, rc)
 
-        return dx.reshape((dx.shape[0],)), dy.reshape((dy.shape[0],)), dlm.reshape((dlm.shape[0],))
+        if factor is None:
+            factor = self.factorize_kkt(y_k, lm_k)
+        return self.solve_kkt(factor, y_k, lm_k, rd, rp, rc)
+
+    def compute_max_step(self, v, dv, tau=1.0) -> np.float64:
+        """It computes in closed form the largest step in (0, 1] that satisfies the fraction to the boundary rule:
+            v + step * dv >= (1 - tau) * v
+        Only the components with a negative delta can reach the boundary, so the step is given by the minimum
+        ratio -tau * v_i / dv_i among them.
+        """
+        negative = dv < 0
+        if not np.any(negative):
+            return 1.0
+        return min(1.0, np.min(-tau * v[negative] / dv[negative]))
 
     def compute_affine_step_size(self, y_k, lm_k, dy_aff, dlm_aff) -> np.float64:
         """It computes the stepsize accordingly to:
         (y_k, lm_k) + step * (y_aff, lm_aff) >= 0
         while 0 < step <= 1.
         """
-        step = 1.0
-        arr_k = np.concatenate([y_k, lm_k])
-        arr_aff = np.concatenate([dy_aff, dlm_aff])
-        while any((arr_k + step * arr_aff) < np.zeros(2*self.n_eq)) and step > 0:
-            step -= 0.01
-
-        return step
+        return min(self.compute_max_step(y_k, dy_aff), self.compute_max_step(lm_k, dlm_aff))
 
-    def compute_primal_dual_step_size(self, y_k, lm_k, dy, dlm) -> np.float64:
-        """It computes the stepsize by choosing the minimum between the primal step size
-        and the dual one.
+    def compute_primal_dual_step_size(self, y_k, lm_k, dy, dlm) -> tuple:
+        """It computes the primal and the dual stepsizes. Unless split_step is set they are both
+        equal to the minimum between the primal step size and the dual one.
         """
-        # To accelerate convergence tau will approach 1
-        tau = 1 - 0.5**(self.iteration + 1)
-        decrement = 0.01
-
-        step_primal = 1.0
-        while any(y_k + step_primal * dy < (1 - tau) * y_k) and step_primal > 0:
-            step_primal -= decrement
-
-        step_dual = 1.0
-        while any(lm_k + step_dual * dlm < (1 - tau) * lm_k) and step_dual > 0:
-            step_dual -= decrement
-        return np.min([step_primal, step_dual])
-
-    def solve(self) -> None:
+        # To accelerate convergence tau will approach 1, without reaching it: the point must stay interior
+        tau = min(1 - 0.5**(self.iteration + 1), 1 - 1.0e-8)
+
+        step_primal = self.compute_max_step(y_k, dy, tau)
+        step_dual = self.compute_max_step(lm_k, dlm, tau)
+        if self.split_step:
+            return step_primal, step_dual
+        step = min(step_primal, step_dual)
+        return step, step
+
+    def recenter(self, y, lm, gamma=1.0e-3) -> tuple:
+        """Makes a warm starting point safely interior. The slacks and the multipliers of the previous solution are
+        close to zero for the active and the inactive constraints respectively, and they can even be negative when the
+        data have changed: they are first raised to epsilon, then each pair whose product y_i * lm_i is below gamma * mu
+        is scaled up to it, so that no pair blocks the first steps at the boundary.
+        """
+        y = np.maximum(np.asarray(y, dtype=np.float64), self.epsilon)
+        lm = np.maximum(np.asarray(lm, dtype=np.float64), self.epsilon)
+        products = y * lm
+        target = gamma * self.compute_mu(y, lm)
+        low = products < target
+        scale = np.sqrt(target / products[low])
+        y[low] *= scale
+        lm[low] *= scale
+        return y, lm
+
+    def refine(self) -> None:
+        """Switches the factorizations to float64 for the remaining iterations of a mixed precision solve."""
+        self.factor_dtype = np.float64
+        self.refined_at = self.iteration
+        # The products with A involve the multipliers and the slacks, whose ranges widen close to the solution
+        self.A = self.A.astype(np.float64)
+
+    def solve(self) -> str:
         """This method solve the minimization problem by applying the predictor-corrector algorithm.
+        It stops at an optimal point, when a certificate of infeasibility is found or after max_iteration iterations.
+
+        Returns:
+            the termination status, also stored in status together with the convergence metrics in metrics
         """
 
         # Initialization step
-        Gamma_aff = np.zeros((self.n_eq, self.n_eq))
-        Lambda_aff = np.zeros((self.n_eq, self.n_eq))
-
-        # The first step computes an affine scaling step by setting sigma to zero
-        _, dy_aff, dlm_aff = self.corrector_step(self.x_0, self.y_0, self.lm_0, Gamma_aff, Lambda_aff, sigma=0)
+        zeros = np.zeros(self.n_eq)
+        x_k = np.array(self.x_0, dtype=np.float64)
+
+        if self.warm_start:
+            # The point is already close to the solution, slacks and multipliers are only moved back inside
+            y_0 = self.__dot(self.A, x_k) - self.b if self.y_0 is None else self.y_0
+            y_k, lm_k = self.recenter(y_0, self.lm_0)
+            if self.verbose: print(f'Initial point: ({self.x_0}, {y_0}, {self.lm_0})')
+        else:
+            # The first step computes an affine scaling step by setting sigma to zero
+            _, dy_aff, dlm_aff = self.corrector_step(self.x_0, self.y_0, self.lm_0, zeros, zeros, sigma=0)
 
-        if self.verbose:
-            print(f'Initial point: ({self.x_0}, {self.y_0}, {self.lm_0})')
-            print(f'First affine step: \ndy_aff = {dy_aff}, dlm_aff = {dlm_aff}')
+            if self.verbose:
+                print(f'Initial point: ({self.x_0}, {self.y_0}, {self.lm_0})')
+                print(f'First affine step: \ndy_aff = {dy_aff}, dlm_aff = {dlm_aff}')
 
-        # Apply the step to the starting point
-        x_k = self.x_0
-        y_k = np.maximum(1, np.absolute(dy_aff + self.y_0))
-        lm_k = np.maximum(1, np.absolute(dlm_aff + self.lm_0))
+            # Apply the step to the starting point
+            y_k = np.maximum(1, np.absolute(dy_aff + self.y_0))
+            lm_k = np.maximum(1, np.absolute(dlm_aff + self.lm_0))
 
         self.hsol.append(x_k)
         self.hslack.append(y_k)
@@ -159,33 +384,49 @@ class IntPoint:
 
         while self.iteration < self.max_iteration:
             if self.verbose: print(f'\nIteration {self.iteration+1}')
-
-            # Perform an affine step
-            _, dy_aff, dlm_aff = self.corrector_step(x_k, y_k, lm_k, Gamma_aff, Lambda_aff, sigma=0)
-            mu = self.compute_mu(y_k, lm_k)
-
-            step_aff = self.compute_affine_step_size(y_k, lm_k, dy_aff, dlm_aff)
-            mu_aff = ((y_k + step_aff * dy_aff).T @ (lm_k + step_aff * dlm_aff)) / self.n_eq
-
-            # Set the centering parameter
-            sigma = (mu_aff / mu)**3
-
-            Gamma_aff = np.diag(dy_aff)
-            Lambda_aff = np.diag(dlm_aff)
-
-            dx, dy, dlm = self.corrector_step(x_k, y_k, lm_k, Gamma_aff, Lambda_aff, sigma)
-
-            step = self.compute_primal_dual_step_size(y_k, lm_k, dy, dlm)
+            start = time.perf_counter()
+
+            # The factorization only depends on the current point, so it is shared by both steps.
+            # The one of the previous point is released first, not to hold two of them at once
+            factor = None
+            try:
+                factor = self.factorize_kkt(y_k, lm_k) if self.kkt == 'normal' else None
+                factorization_time = time.perf_counter() - start
+
+                # Perform an affine step
+                _, dy_aff, dlm_aff = self.corrector_step(x_k, y_k, lm_k, zeros, zeros, sigma=0, factor=factor)
+                mu = self.compute_mu(y_k, lm_k)
+
+                step_aff = self.compute_affine_step_size(y_k, lm_k, dy_aff, dlm_aff)
+                mu_aff = ((y_k + step_aff * dy_aff).T @ (lm_k + step_aff * dlm_aff)) / self.n_eq
+
+                # Set the centering parameter
+                sigma = (mu_aff / mu)**3
+
+                dx, dy, dlm = self.corrector_step(x_k, y_k, lm_k, dy_aff, dlm_aff, sigma, factor=factor)
+            except (np.linalg.LinAlgError, ValueError):
+                # The factorization failed, or a right hand side overflowed and cho_solve rejected it
+                if self.factor_dtype == np.float32:
+                    # The system is too ill-conditioned for float32, the iteration is done again in float64
+                    self.refine()
+                    continue
+                self.status = NUMERICAL_ERROR
+                break
+            if self.factor_dtype == np.float32 and not (np.all(np.isfinite(dx)) and np.all(np.isfinite(dlm))):
+                self.refine()
+                continue
+
+            step, step_dual = self.compute_primal_dual_step_size(y_k, lm_k, dy, dlm)
 
             if self.verbose:
                 print(f'Deltas: \ndx = {dx}, dy = {dy}, dlm = {dlm}')
-                print(f'Learning Step: {step:.4f}')
+                print(f'Learning Step: {step:.4f} (primal), {step_dual:.4f} (dual)')
 
             # Update step
             self.iteration += 1
             x_k += step * dx
             y_k += step * dy
-            lm_k += step * dlm
+            lm_k += step_dual * dlm
 
             if self.verbose: print(f'Current point: {x_k}')
 
@@ -193,20 +434,57 @@ class IntPoint:
             self.hslack.append(y_k)
             self.hlambdas.append(lm_k)
             self.steps.append(step)
-
-            var = np.concatenate([dx, dy, dlm])
-            # if np.linalg.norm(var) < self.epsilon:
-            #     raise Exception(f'PRECISION REACHED, magnitude: {np.linalg.norm(var)}')
-
-            if any(abs(var) < self.epsilon * np.ones(self.n_vars + 2*self.n_eq)):
-               if self.verbose: print(f'PRECISION REACHED, array: \n{var}')
-               break
+            self.dual_steps.append(step_dual)
+
+            if not (np.all(np.isfinite(x_k)) and np.all(np.isfinite(y_k)) and np.all(np.isfinite(lm_k))):
+                self.status = NUMERICAL_ERROR
+                break
+
+            # The point is optimal when it satisfies the KKT conditions: zero residuals and complementarity
+            self.metrics = self.compute_convergence_metrics(x_k, y_k, lm_k)
+
+            if self.telemetry.enabled:
+                self.telemetry.emit({'iteration': self.iteration
+                                    , 'step': step
+                                    , 'step_dual': step_dual
+                                    , 'step_affine': step_aff
+                                    , 'sigma': sigma
+                                    , 'mu': self.metrics['mu']
+                                    , 'primal_residual': self.metrics['primal_residual']
+                                    , 'dual_residual': self.metrics['dual_residual']
+                                    , 'gap': self.metrics['gap']
+                                    , 'factorization_time': factorization_time
+                                    , 'precision': np.dtype(self.factor_dtype).name
+                                    , 'time': time.perf_counter() - start})
+
+            error = max(self.metrics['primal_residual'], self.metrics['dual_residual'], self.metrics['gap'])
+            if error < self.refine_tolerance and self.factor_dtype == np.float32:
+                # Mixed precision: the last iterations are refined in float64
+                self.refine()
+            if error < self.epsilon:
+                if self.verbose: print(f'PRECISION REACHED, KKT error: {error}')
+                self.status = OPTIMAL
+                break
+
+            self.status = self.check_infeasibility(lm_k, dx)
+            if self.status is not None:
+                if self.verbose: print(f'STOPPED: {self.status}')
+                break
+
+        if self.status is None:
+            self.status = MAX_ITERATION
+        self.metrics['iterations'] = self.iteration
+        self.metrics['refined_at'] = self.refined_at
+        self.solutions = x_k
+        self.slacks = y_k
+        self.lambdas = lm_k
+        return self.status
 
     def objective_function(self, x) -> np.float64:
         """The objective function of the minimization problem is:
         x^T S x + x^T c + const
         """
-        return x @ self.S @ x + self.c.T @ x + self.const
+        return x @ self.__dot(self.S, x) + self.c.T @ x + self.const
 
     def compute_fobj_history(self):
         fobjs = []
@@ -215,5 +493,6 @@ class IntPoint:
         return fobjs
 
     def print_solution(self) -> None:
-        print(f'Minimum found in {self.iteration} iterations at point: \n{self.hsol[-1]}')
-        print(f'Objective function value: {self.objective_function(self.hsol[-1]):.4f}')
\ No newline at end of file
+        print(f'Status: {self.status}')
+        print(f'Minimum found in {self.iteration} iterations at point: \n{self.solutions}')
+        print(f'Objective function value: {self.objective_function(self.solutions):.4f}')
\ No newline at end of file
@@ -0,0 +1,256 @@
+"""
+THIS FILE CONTAINS THE METHODS FOR THE BOUNDED-VARIABLE REVISED SIMPLEX ALGORITHM EXECUTION.
+"""
+import time
+import numpy as np
+from scipy.linalg import lu_factor, lu_solve
+from solvers.telemetry import Telemetry
+
+class BasisFactorization:
+    """Keeps a factorization of the basis matrix B as the LU decomposition of a previous basis B_0
+    followed by a product of eta matrices, one for each basis change (product form of the inverse):
+        B = B_0 @ E_1 @ ... @ E_k
+    Each E_j is the identity matrix with the column of the leaving variable replaced by the eta vector d = B^-1 @ a_q,
+    where a_q is the column of the entering variable.
+    """
+
+    def __init__(self, B: np.array) -> None:
+        self.lu = lu_factor(B)
+        self.etas = []
+
+    def ftran(self, a: np.array) -> np.array:
+        """Forward transformation: solves B @ x = a"""
+        x = lu_solve(self.lu, a)
+        for r, d in self.etas:
+            x_r = x[r] / d[r]
+            x -= x_r * d
+            x[r] = x_r
+        return x
+
+    def btran(self, c: np.array) -> np.array:
+        """Backward transformation: solves B.T @ y = c"""
+        u = np.array(c, dtype=np.float64)
+        for r, d in reversed(self.etas):
+            # Only the r-th component of u.T @ E^-1 differs from u
+            u[r] = (u[r] * (1 + d[r]) - u @ d) / d[r]
+        return lu_solve(self.lu, u, trans=1)
+
+    def update(self, r: int, d: np.array) -> None:
+        """Records the basis change where the r-th basic variable is replaced by a variable with eta vector d"""
+        self.etas.append((r, d.copy()))
+
+class RevisedSimplex:
+    """
+    This class includes a revised version of the Simplex algorithm for linear problems with bounded variables.
+    Instead of rewriting a whole tableau at each pivot, it only keeps the basis indices and a factorization of
+    the basis matrix. The bounds on the variables are handled implicitly: a non-basic variable sits either at its
+    lower or at its upper bound, so no slack row is needed to encode them.
+    """
+
+    def __init__(self
+                , c: np.array
+                , A: np.array
+                , b: np.array
+                , lb: np.array
+                , ub: np.array
+                , verbose=False
+                , max_iteration=None
+                , max=True
+                , refactor_frequency=50
+                , tolerance=1.0e-9
+                , callback=None
+                , history='last'
+                , history_size=1) -> None:
+        """
+        Initializes a Revised Simplex session in the bounded form
+            max z = c.T @ x s.t. A @ x = b, lb <= x <= ub
+        where:
+            - c is the vector of coefficients for the objective function
+            - A is the matrix of coefficients for the equality constraints
+            - b is the vector of constants on the RHS of the constraint equations
+            - lb, ub are the vectors of (finite) lower bounds and of upper bounds on the variables
+            - max_iteration refers to the maximum number of pivots, by default 10 times the number of variables and equations
+            - max is the type of problem: True if we are maximizing and False if we are minimizing
+            - refactor_frequency is the number of basis updates after which the basis matrix is factorized again
+            - callback is called at each pivot with a record of the entering and leaving variables, the step, the objective
+              value and the time spent in the basis factorization (ftran, btran, updates and refactorizations) and in the whole pivot
+            - history tells which records are kept in telemetry.records: 'none', the 'last' history_size ones or the 'full' history
+        """
+        self.c      = np.asarray(c, dtype=np.float64).reshape((-1,))
+        self.A      = np.asarray(A, dtype=np.float64)
+        self.b      = np.asarray(b, dtype=np.float64).reshape((-1,))
+        self.lb     = np.asarray(lb, dtype=np.float64).reshape((-1,))
+        self.ub     = np.asarray(ub, dtype=np.float64).reshape((-1,))
+
+        self.n_vars = self.A.shape[1]
+        self.n_eq   = self.A.shape[0]
+
+        if self.lb.shape[0] != self.n_vars or self.ub.shape[0] != self.n_vars or \
+            not np.all(np.isfinite(self.lb)) or np.any(self.lb > self.ub):
+            raise Exception("STOPPED EXECUTION: PLEASE INSERT LEGIT BOUND ARRAYS")
+
+        self.solutions      = np.zeros(self.n_vars)
+        self.dual           = np.zeros(self.n_eq)
+
+        # value of the objective function
+        self.objective      = [0.0]
+        # Number of pivots (basis changes and bound flips), 0 is the starting point
+        self.iteration      = 0
+        self.verbose        = verbose
+        self.max_iteration  = max_iteration if max_iteration is not None else 10 * (self.n_vars + self.n_eq)
+        self.max            = max
+        self.refactor_frequency = refactor_frequency
+        self.tolerance      = tolerance
+        self.optimal        = False
+        self.telemetry      = Telemetry(callback, history, history_size)
+
+    def initialize_basis(self):
+        """All the variables start at their lower bound and one artificial variable per row absorbs
+        the residual b - A @ lb, so that the artificial variables form a feasible starting basis.
+        """
+        x = self.lb.copy()
+        residual = self.b - self.A @ x
+        sign = np.where(residual >= 0, 1.0, -1.0)
+
+        # The artificial variables are appended after the original ones
+        self.columns    = np.hstack([self.A, np.diag(sign)])
+        self.lower      = np.concatenate([self.lb, np.zeros(self.n_eq)])
+        self.upper      = np.concatenate([self.ub, np.full(self.n_eq, np.inf)])
+        self.x          = np.concatenate([x, np.abs(residual)])
+        self.basis      = np.arange(self.n_vars, self.n_vars + self.n_eq)
+        self.at_upper   = np.zeros(self.n_vars + self.n_eq, dtype=bool)
+        self.refactor()
+
+    def refactor(self):
+        """Computes from scratch the factorization of the current basis matrix"""
+        self.factor = BasisFactorization(self.columns[:, self.basis])
+
+    def __compute_entering_variable(self, reduced) -> int:
+        """Chooses the entering variable with the Dantzig's rule among the improving non-basic variables:
+        those at the lower bound with a positive reduced cost and those at the upper bound with a negative one.
+        Returns -1 if no variable can improve the objective, i.e. the basis is optimal.
+        """
+        improving = np.where(self.at_upper, reduced < -self.tolerance, reduced > self.tolerance)
+        improving &= self.upper > self.lower
+        improving[self.basis] = False
+        if not np.any(improving):
+            return -1
+        return np.argmax(np.abs(reduced) * improving)
+
+    def __ratio_test(self, q, direction, alpha) -> tuple:
+        """Computes the largest step for the entering variable q such that every basic variable stays within
+        its bounds. Returns the step and the position in the basis of the leaving variable, the position is -1
+        when the entering variable reaches its opposite bound first (bound flip).
+        """
+        delta = -direction * alpha
+        x_B = self.x[self.basis]
+        ratios = np.full(self.n_eq, np.inf)
+
+        decreasing = delta < -self.tolerance
+        increasing = delta > self.tolerance
+        ratios[decreasing] = (x_B[decreasing] - self.lower[self.basis][decreasing]) / -delta[decreasing]
+        ratios[increasing] = (self.upper[self.basis][increasing] - x_B[increasing]) / delta[increasing]
+        ratios = np.maximum(ratios, 0.0)
+
+        r = np.argmin(ratios)
+        flip = self.upper[q] - self.lower[q]
+        if flip <= ratios[r]:
+            return flip, -1
+        return ratios[r], r
+
+    def __iterate(self, cost) -> bool:
+        """Applies pivots to the current basis until no variable can improve the objective cost @ x.
+        Returns False if the maximum number of iterations has been reached before.
+        """
+        while self.iteration < self.max_iteration:
+            start = time.perf_counter()
+            y = self.factor.btran(cost[self.basis])
+            factorization_time = time.perf_counter() - start
+            reduced = cost - y @ self.columns
+
+            q = self.__compute_entering_variable(reduced)
+            if q < 0:
+                self.dual = y
+                return True
+
+            direction = -1.0 if self.at_upper[q] else 1.0
+            ftran_start = time.perf_counter()
+            alpha = self.factor.ftran(self.columns[:, q])
+            factorization_time += time.perf_counter() - ftran_start
+            step, r = self.__ratio_test(q, direction, alpha)
+            if step == np.inf:
+                raise Exception("STOPPED EXECUTION: LINEAR PROGRAM UNBOUNDED")
+
+            self.x[q] += direction * step
+            self.x[self.basis] -= direction * step * alpha
+
+            leaving = -1
+            if r < 0:
+                # The entering variable moves to its opposite bound, the basis does not change
+                self.at_upper[q] = not self.at_upper[q]
+                if self.verbose: print(f'Bound flip at iteration {self.iteration}: variable {q}')
+            else:
+                leaving = self.basis[r]
+                # The leaving variable is set exactly on the bound it has reached
+                self.at_upper[leaving] = -direction * alpha[r] > 0
+                self.x[leaving] = self.upper[leaving] if self.at_upper[leaving] else self.lower[leaving]
+                self.basis[r] = q
+                self.at_upper[q] = False
+
+                update_start = time.perf_counter()
+                self.factor.update(r, alpha)
+                if len(self.factor.etas) >= self.refactor_frequency:
+                    self.refactor()
+                factorization_time += time.perf_counter() - update_start
+                if self.verbose: print(f'Pivot at iteration {self.iteration}: variable {q} enters, variable {leaving} leaves')
+
+            self.iteration += 1
+            self.objective.append(self.__objective_value())
+
+            if self.telemetry.enabled:
+                self.telemetry.emit({'iteration': self.iteration
+                                    , 'entering': q
+                                    , 'leaving': leaving
+                                    , 'pivot_row': r
+                                    , 'step': step
+                                    , 'objective': self.objective[-1]
+                                    , 'factorization_time': factorization_time
+                                    , 'time': time.perf_counter() - start})
+        return False
+
+    def __objective_value(self) -> np.float64:
+        return self.c @ self.x[:self.n_vars]
+
+    def solve(self) -> np.array:
+        """Main method of the class. It needs to be called in order to get an array of solutions.
+        A first phase minimizes the sum of the artificial variables to find a feasible basis,
+        then the second phase optimizes the original objective function starting from that basis.
+        """
+        self.initialize_basis()
+
+        # Phase 1: maximize the opposite of the sum of the artificial variables
+        cost = np.concatenate([np.zeros(self.n_vars), -np.ones(self.n_eq)])
+        if not self.__iterate(cost):
+            # The artificial variables may still be basic at positive values, phase 2 would start from an infeasible basis
+            raise Exception("STOPPED EXECUTION: PHASE 1 REACHED THE MAXIMUM NUMBER OF ITERATIONS")
+        if np.sum(self.x[self.n_vars:]) > self.tolerance * max(1.0, np.max(np.abs(self.b))):
+            raise Exception("STOPPED EXECUTION: LINEAR PROGRAM INFEASIBLE")
+
+        # Phase 2: the artificial variables are fixed to zero, they can remain basic only at a degenerate level
+        self.upper[self.n_vars:] = 0.0
+        c = self.c if self.max else -self.c
+        cost = np.concatenate([c, np.zeros(self.n_eq)])
+        self.optimal = self.__iterate(cost)
+
+        self.solutions = self.x[:self.n_vars].copy()
+        self.objective.append(self.__objective_value())
+        if self.verbose: print(f'Objective function value: {self.objective[-1]}')
+        return self.solutions
+
+    def print_solution(self):
+        if self.optimal:
+            print(f"Optimal solution found in {self.iteration} iterations!")
+        else:
+            print(f"Non-Optimal solution found in {self.iteration} iterations")
+        print(f"Solution variables: \t{self.solutions}")
+        print(f'The objective function has value: {self.objective[-1]}')
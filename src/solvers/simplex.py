@@ -1,10 +1,11 @@
 """
 THIS FILE CONTAINS THE METHODS FOR THE SIMPLEX ALGORITHM EXECUTION.
 """
-import matplotlib
+import time
 import numpy as np
-from matplotlib import pyplot as plt
+from scipy.linalg.blas import dger
 from warnings import warn
+from solvers.telemetry import Telemetry
 
 class Simplex:
     """
@@ -19,7 +20,10 @@ class Simplex:
                 , b: np.array
                 , verbose=False
                 , max_iteration=100
-                , max=True) -> None:
+                , max=True
+                , callback=None
+                , history='last'
+                , history_size=1) -> None:
         """
         Initializes a Simplex session in the standard form
             max z = c.T @ x s.t. Ax<=b
@@ -29,6 +33,9 @@ class Simplex:
             - b is the vector of constants on the RHS of the constraint equations
             - max_iteration refers to the maximum number of cycles the simplex algorithm can do (in case of cycling)
             - max is the type of problem: True if we are maximizing and False if we are minimizing
+            - callback is called at each pivot with a record of the pivot position, the entering and leaving variables,
+              the objective value and the time spent choosing the pivot and updating the tableau
+            - history tells which records are kept in telemetry.records: 'none', the 'last' history_size ones or the 'full' history
         """
         # Array of coefficients of the objective function
         self.c      = c.reshape((1, c.shape[0]))
@@ -44,6 +51,8 @@ class Simplex:
         self.n_eq           = self.A.shape[0]
         self.solutions      = np.zeros(self.n_vars)
         self.slack          = np.zeros(self.A.shape[1] - self.n_vars)
+        # basis[r] is the index of the basic variable of the r-th constraint row, -1 if the row has none
+        self.basis          = np.full(self.n_eq, -1)
 
         # To apply the Cunningham's rule (or round-robin rule)
         # We create a random cyclic ordering for choosing the variable that will enter the basis
@@ -58,6 +67,7 @@ class Simplex:
         self.verbose        = verbose
         self.max_iteration  = max_iteration
         self.max            = max
+        self.telemetry      = Telemetry(callback, history, history_size)
 
     def create_tableau(self):
         """
@@ -77,21 +87,26 @@ class Simplex:
             [ self.A,    np.zeros((self.n_eq, 1)), self.b],
             [      c,                           1,      0]
         ])
+        self.__init_basis()
+
+    def __init_basis(self):
+        """Finds the initial basic variables, i.e. the unit-columns of the tableau.
+        A unit column is a vector which has one and exactly one value equal to one and the others
+        are equal to zero. If several unit-columns share the same row the first one is taken.
+        """
+        body = self.tableau[:, :-2]
+        unit = (np.count_nonzero(body, axis=0) == 1) & (np.sum(body, axis=0) == 1)
+        rows = np.argmax(body, axis=0)
+        cols = np.flatnonzero(unit & (rows < self.n_eq))
+        self.basis = np.full(self.n_eq, -1)
+        # Reversed so that the first column wins when the same row is assigned more than once
+        self.basis[rows[cols][::-1]] = cols[::-1]
 
     def __is_optimal(self) -> bool:
         """A solution is optimal if all the terms are non-negative
         """
         last = self.tableau[-1, :-1]
-        return all(val >= 0 for val in last)
-
-    def __is_basic(self, idx) -> bool:
-        """Checks if the column at index idx is a unit-column, then the variable associated
-        is a basic variable. If it is not the case the variable it is a non-basic one.
-        A unit column is a vector which has one and exactly one value equal to one and the others
-        are equal to zero.
-        """
-        return [True if el==0 else False for el in self.tableau[:, idx]].count(True) == \
-                    self.tableau[:, idx].shape[0] - 1 and np.sum(self.tableau[:, idx]) == 1
+        return np.all(last >= 0)
 
     def __compute_pivot_col_position(self) -> int:
         """This method simply computes the column index for the pivot in the tableau.
@@ -101,7 +116,7 @@ class Simplex:
         last = self.tableau[-1, :-1]
         return np.argmin(last, axis=0)
 
-    def __compute_pivot_row_position(self) -> int:
+    def __compute_pivot_row_position(self, col_idx) -> int:
         """This method computes the row index for the pivot in the tableau by performing
         the min-ratio test.
         If a solution is non optimal, and given the pivoting column the index for the
@@ -111,22 +126,21 @@ class Simplex:
         It has been slightly modified to take in account the mixed form of the constraints:
         indeed, we aim to depart first those slack variables which coefficient is negative.
         """
-        col_idx = self.__compute_pivot_col_position()
         target_col = self.tableau[:-1, col_idx]
-        ratios = []
-        for i, val in enumerate(target_col):
-            b = self.tableau[i, -1]
-            # this last operation is crucial: since we have to divide by the elements
-            # in the coefficient matrix it is important to identify the elements which are
-            # equal to zero, in addition to the one which are not interesting for the algorithm
-            # which are the negative ones (tagged as infinite)
-            ratios.append(np.inf if val <= 0 else b / val)
+        b = self.tableau[:-1, -1]
+        # this last operation is crucial: since we have to divide by the elements
+        # in the coefficient matrix it is important to identify the elements which are
+        # equal to zero, in addition to the one which are not interesting for the algorithm
+        # which are the negative ones (tagged as infinite)
+        ratios = np.full(self.n_eq, np.inf)
+        positive = target_col > 0
+        ratios[positive] = b[positive] / target_col[positive]
 
         if self.verbose: print(f'Min-ratios list: {ratios}')
 
         # If all the elements in the temporary memory are infinite, then it is impossible to improve
         # the tableau anymore and the program is then classified as unbounded
-        if all([val == np.inf for val in ratios]):
+        if np.all(ratios == np.inf):
             raise Exception("STOPPED EXECUTION: LINEAR PROGRAM UNBOUNDED")
 
         return np.argmin(ratios)
@@ -134,7 +148,8 @@ class Simplex:
     def get_pivot_position(self) -> tuple:
         """Computes the pivot position for the current tableau.
         """
-        return self.__compute_pivot_row_position(), self.__compute_pivot_col_position()
+        col_idx = self.__compute_pivot_col_position()
+        return self.__compute_pivot_row_position(col_idx), col_idx
 
     def __sub_pivoting_1(self, row_idx, col_idx):
         """Part 1 of the pivot transformation part: the goal of this
@@ -146,51 +161,56 @@ class Simplex:
 
     def __sub_pivoting_2(self, row_idx, col_idx):
         """Part 2 of the pivot transformation part: the goal of this
-        method is to set the terms in the colum, apart from the pivot to 0"""
-        for i in range(self.n_eq + 1):
-            row = self.tableau[i, :]
-            # To set the term in the pivot column to zero we have to subtract the
-            # value from the entire row.
-            # print(f'Subtracting by {row[col_idx]}')
-            if i != row_idx and row[col_idx] != 0:
-                # The operation is: R_i = R_i - mul * R_p
-                pivot_row = self.tableau[row_idx, :]
-                multiplier = row[col_idx]
-                self.tableau[i, :] = row - multiplier * pivot_row
+        method is to set the terms in the colum, apart from the pivot to 0.
+        The operation R_i = R_i - mul_i * R_p is applied to all the rows at once as a rank-1 update."""
+        pivot_row = self.tableau[row_idx, :].copy()
+        multipliers = self.tableau[:, col_idx].copy()
+        multipliers[row_idx] = 0
+        # dger works in place on the Fortran-ordered view of the tableau, avoiding the temporary outer product
+        self.tableau = dger(-1.0, pivot_row, multipliers, a=self.tableau.T, overwrite_a=True).T
 
     def apply_pivoting(self):
         """This method apply the pivoting step to the tablueau by
         finding an appropriate pivot to then change the accordingly the values.
         This method modifies the tableau values.
         """
+        start = time.perf_counter()
         row, col = self.get_pivot_position()
         if self.verbose:
             print(f'Pivot position at iteration {self.iteration}: ({row}, {col})')
 
+        pivot_time = time.perf_counter() - start
         self.__sub_pivoting_1(row, col)
         self.__sub_pivoting_2(row, col)
+        leaving = self.basis[row]
+        # The entering variable replaces the basic variable of the pivot row
+        self.basis[row] = col
+
+        if self.telemetry.enabled:
+            end = time.perf_counter()
+            self.telemetry.emit({'iteration': self.iteration + 1
+                                , 'pivot_row': row
+                                , 'pivot_col': col
+                                , 'leaving': leaving
+                                , 'objective': self.tableau[-1, -1]
+                                , 'pivot_time': pivot_time
+                                , 'update_time': end - start - pivot_time
+                                , 'time': end - start})
 
     def extract_solution(self):
         """This method guess the solution from the tableau which has to be optimal.
-        A solution is composed by the non-basic variables' coefficients that appear in the first and the
-        last optimal tableau and its relative constant values.
+        A solution is composed by the basic variables, whose values are the constants of their rows,
+        while all the non-basic variables are equal to zero.
         """
-        for col in range(self.tableau.shape[1] - 2):
-            if self.__is_basic(col):
-                row_idx = np.argmax(self.tableau[:, col])
-                if col < self.n_vars:
-                    # THIS IS A SOLUTION VARIABLE
-                    self.solutions[col] = self.tableau[row_idx, -1]
-                else:
-                    # THIS IS A SLACK VARIABLE
-                    self.slack[col - self.n_eq] = self.tableau[row_idx, -1]
-            else:
-                if col < self.n_vars:
-                    # THIS IS A SOLUTION VARIABLE
-                    self.solutions[col] = 0
-                else:
-                    # THIS IS A SLACK VARIABLE
-                    self.slack[col - self.n_vars] = 0
+        self.solutions[:] = 0
+        self.slack[:] = 0
+        for row_idx, col in enumerate(self.basis):
+            if 0 <= col < self.n_vars:
+                # THIS IS A SOLUTION VARIABLE
+                self.solutions[col] = self.tableau[row_idx, -1]
+            elif col >= self.n_vars:
+                # THIS IS A SLACK VARIABLE: the slacks follow the n_vars solution variables in the tableau
+                self.slack[col - self.n_vars] = self.tableau[row_idx, -1]
         if self.max:
             self.objective.append(self.tableau[-1, -1])
         else:
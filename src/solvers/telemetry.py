@@ -0,0 +1,65 @@
+"""
+THIS FILE CONTAINS THE TELEMETRY SHARED BY THE SOLVERS.
+
+At each iteration a solver builds a record, a dictionary with the quantities of interest (step sizes, residuals,
+pivots, timings, ...), that is passed to an optional callback and kept in a bounded history. The iterates of the
+solvers are kept in the same kind of history, whose retention is one of:
+    - 'none': nothing is kept, the solver only exposes its final point
+    - 'last': a ring buffer with the last history_size items
+    - 'full': all the items
+The items are copies, so they are not modified by the in-place updates of the solvers.
+"""
+from collections import deque
+import numpy as np
+
+HISTORY_MODES = ('none', 'last', 'full')
+
+class History:
+    """A list-like container of the values of a solver along the iterations, with a bounded retention."""
+
+    def __init__(self, mode='last', size=1) -> None:
+        if mode not in HISTORY_MODES:
+            raise Exception(f"STOPPED EXECUTION: UNKNOWN HISTORY MODE {mode}")
+        self.mode = mode
+        self.items = deque(maxlen=size if mode == 'last' else None)
+
+    def append(self, value) -> None:
+        if self.mode == 'none':
+            return
+        self.items.append(value.copy() if isinstance(value, np.ndarray) else value)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self.items)[index]
+        return self.items[index]
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __repr__(self) -> str:
+        return f'History({self.mode}, {list(self.items)})'
+
+class Telemetry:
+    """Dispatches the per-iteration records of a solver to the callback and keeps them in a history."""
+
+    def __init__(self, callback=None, history='last', history_size=1) -> None:
+        """
+        Args:
+            callback: a function called with the record of each iteration
+            history, history_size: the retention of the records, see History
+        """
+        self.callback = callback
+        self.records = History(history, history_size)
+
+    @property
+    def enabled(self) -> bool:
+        """True if the records are used, otherwise the solvers skip building them."""
+        return self.callback is not None or self.records.mode != 'none'
+
+    def emit(self, record: dict) -> None:
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
@@ -0,0 +1,181 @@
+"""
+THIS FILE CONTAINS A COLUMNAR, MEMORY-MAPPED STORE FOR THE MARKET DATA.
+
+Each ticker has its own folder holding one contiguous little-endian float64 file per field and an int64 file
+with the dates (days since the epoch), all of them of the same length and sorted by date. The files are raw
+arrays, so new dates are appended at their end without rewriting the history, and they are read through
+np.memmap without copying. A small json file keeps track of the date range each ticker has been downloaded for.
+The writes are ordered so that an interrupted one leaves the previous content readable, see __write_ticker.
+"""
+import json
+import os
+import shutil
+from typing import List
+import numpy as np
+import pandas as pd
+
+FIELDS = ['high', 'low', 'open', 'close', 'volume', 'adjclose']
+
+class MarketDataStore:
+
+    def __init__(self, root='./src/data/store'):
+        """
+        Opens (or creates lazily) the store rooted at the given folder.
+
+        Args:
+            root: the folder containing one sub-folder per ticker
+        """
+        self.root = root
+
+    def __path(self, ticker: str, name: str) -> str:
+        return os.path.join(self.root, ticker, name)
+
+    def __memmap(self, ticker: str, name: str, dtype, length=None) -> np.array:
+        """Maps the whole records of a file, or its first length ones."""
+        path = self.__path(ticker, name)
+        records = os.path.getsize(path) // np.dtype(dtype).itemsize
+        if length is not None:
+            if records < length:
+                raise Exception(f"STOPPED EXECUTION: {name} OF {ticker} IS SHORTER THAN ITS DATES, THE STORE IS CORRUPTED")
+            records = length
+        if records == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(records,))
+
+    def tickers(self) -> List[str]:
+        """Returns the tickers available in the store."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(t for t in os.listdir(self.root) if os.path.isfile(self.__path(t, 'coverage.json')))
+
+    def coverage(self, ticker: str) -> tuple:
+        """Returns the (start_date, end_date) range the ticker has been downloaded for, None if it is not stored."""
+        path = self.__path(ticker, 'coverage.json')
+        if not os.path.isfile(path):
+            return None
+        with open(path) as f:
+            coverage = json.load(f)
+        return coverage['start_date'], coverage['end_date']
+
+    def covers(self, tickers: List[str], start_date: str, end_date: str) -> bool:
+        """Checks if the store holds all the tickers over the whole date range."""
+        for ticker in tickers:
+            coverage = self.coverage(ticker)
+            if coverage is None or coverage[0] > start_date or coverage[1] < end_date:
+                return False
+        return True
+
+    def dates(self, ticker: str) -> np.array:
+        """Returns the memory-mapped date index of the ticker."""
+        return self.__memmap(ticker, 'dates.i8', '<i8').view('datetime64[D]')
+
+    def read(self, ticker: str, field: str, start_date=None, end_date=None) -> tuple:
+        """Returns the dates and the values of a field of the ticker between start_date and end_date (both included),
+        as views on the memory-mapped files.
+        """
+        dates = self.dates(ticker)
+        first = 0 if start_date is None else np.searchsorted(dates, np.datetime64(start_date, 'D'), side='left')
+        last = dates.shape[0] if end_date is None else np.searchsorted(dates, np.datetime64(end_date, 'D'), side='right')
+        # The rows beyond the dates are the leftovers of an interrupted append, see __write_ticker
+        values = self.__memmap(ticker, f'{field}.f8', '<f8', dates.shape[0])
+        return dates[first:last], values[first:last]
+
+    def load(self, tickers: List[str], start_date: str, end_date: str) -> pd.DataFrame:
+        """Returns the market data of the tickers in the same long format of the csv files:
+        one row per ticker and date indexed by formatted_date, the rows grouped by ticker.
+        """
+        frames = []
+        for ticker in tickers:
+            dates, _ = self.read(ticker, FIELDS[0], start_date, end_date)
+            columns = {field: np.asarray(self.read(ticker, field, start_date, end_date)[1]) for field in FIELDS}
+            frame = pd.DataFrame(columns, index=pd.Index(np.datetime_as_string(dates, unit='D'), name='formatted_date'))
+            frame.insert(0, 'ticker', ticker)
+            frames.append(frame)
+        return pd.concat(frames)
+
+    def write(self, market_data: pd.DataFrame, start_date: str, end_date: str, tickers=None) -> None:
+        """Stores the market data, in the long format of the csv files, downloaded over the given date range.
+        For a ticker already in the store only the dates after the last stored one are appended, the history is
+        rewritten only when the new data starts before the stored one. The tickers without rows (no trading days in
+        the range) can be given explicitly to record their coverage.
+        """
+        for ticker in pd.unique(market_data['ticker']) if tickers is None else tickers:
+            frame = market_data[market_data['ticker'] == ticker]
+            dates = pd.to_datetime(frame.index).values.astype('datetime64[D]')
+            order = np.argsort(dates, kind='stable')
+            dates, frame = dates[order], frame.iloc[order]
+
+            coverage = self.coverage(ticker)
+            if coverage is None or start_date < coverage[0] or start_date > coverage[1]:
+                # The stored history cannot be extended by appending: the ticker is written again
+                self.__write_ticker(ticker, dates, frame, 'wb')
+                coverage = (start_date, end_date)
+            else:
+                stored = self.dates(ticker)
+                if stored.shape[0] > 0:
+                    new = dates > stored[-1]
+                    dates, frame = dates[new], frame[new]
+                self.__write_ticker(ticker, dates, frame, 'ab')
+                coverage = (coverage[0], max(coverage[1], end_date))
+
+            temporary = self.__path(ticker, f'.coverage.{os.getpid()}.tmp')
+            with open(temporary, 'w') as f:
+                json.dump({'start_date': coverage[0], 'end_date': coverage[1]}, f)
+            os.replace(temporary, self.__path(ticker, 'coverage.json'))
+
+    def merge(self, market_data: pd.DataFrame, start_date: str, end_date: str, tickers=None) -> List[str]:
+        """Adds to the store the market data, in the long format of the csv files, covering the given date range,
+        keeping the dates already stored when they overlap. A ticker is merged only if the new range overlaps or
+        touches its stored one, so that the coverage stays a single range. The tickers without rows in the market data
+        (no trading days in the range) can be given explicitly to record their coverage.
+
+        Returns:
+            the tickers that have been merged
+        """
+        merged = []
+        for ticker in pd.unique(market_data['ticker']) if tickers is None else tickers:
+            frame = market_data[market_data['ticker'] == ticker]
+            coverage = self.coverage(ticker)
+            if coverage is not None:
+                if start_date > coverage[1] or end_date < coverage[0]:
+                    continue
+                frame = pd.concat([self.load([ticker], *coverage), frame])
+                frame = frame[~frame.index.duplicated(keep='first')]
+                start, end = min(start_date, coverage[0]), max(end_date, coverage[1])
+            else:
+                start, end = start_date, end_date
+            self.write(frame, start, end, tickers=[ticker])
+            merged.append(ticker)
+        return merged
+
+    def __write_ticker(self, ticker: str, dates: np.array, frame: pd.DataFrame, mode: str) -> None:
+        """Writes (mode 'wb') or appends (mode 'ab') the rows of the ticker so that an interrupted write never leaves
+        the columns misaligned:
+            - a new history is written to a temporary folder that then replaces the one of the ticker
+            - an append writes the fields first and the dates last, the dates file tells how many rows are complete:
+              the rows of the fields beyond it are ignored by read and truncated by the next append
+        """
+        columns = [('dates.i8', dates.astype('<i8'))] + [(f'{field}.f8', frame[field].to_numpy(dtype='<f8')) for field in FIELDS]
+        folder = os.path.join(self.root, ticker)
+        if mode == 'wb':
+            temporary = os.path.join(self.root, f'.{ticker}.{os.getpid()}.tmp')
+            old = os.path.join(self.root, f'.{ticker}.{os.getpid()}.old')
+            shutil.rmtree(temporary, ignore_errors=True)
+            shutil.rmtree(old, ignore_errors=True)
+            os.makedirs(temporary)
+            for name, values in columns:
+                with open(os.path.join(temporary, name), 'wb') as f:
+                    f.write(values.tobytes())
+            # Until the new folder is in place the ticker is missing, and it is downloaded again if needed
+            if os.path.isdir(folder):
+                os.replace(folder, old)
+            os.replace(temporary, folder)
+            shutil.rmtree(old, ignore_errors=True)
+            return
+
+        n_rows = os.path.getsize(self.__path(ticker, 'dates.i8')) // 8
+        for name, values in columns[1:] + columns[:1]:
+            with open(self.__path(ticker, name), 'r+b') as f:
+                f.truncate(n_rows * 8)
+                f.seek(0, os.SEEK_END)
+                f.write(values.tobytes())
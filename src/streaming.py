@@ -0,0 +1,86 @@
+"""
+THIS FILE CONTAINS THE OUT-OF-CORE ESTIMATION OF THE MEAN AND THE COVARIANCE OF THE RETURNS.
+
+The prices are read in date-ordered chunks (from the columnar store or from a wide csv file) and each chunk is
+reduced to its count, mean and matrix of centered co-moments, which are then merged into the running totals with
+the pairwise update formulas of Chan, Golub and LeVeque. Only the last prices of a chunk are kept to compute the
+first returns of the next one, so the memory is O(chunk_size * n + n^2) whatever the length of the history.
+"""
+from typing import List
+import numpy as np
+import pandas as pd
+from prices import forward_fill
+
+class StreamingMoments:
+    """Running count, mean and co-moment matrix sum((r - mean)(r - mean)^T) of a stream of returns."""
+
+    def __init__(self, n_assets: int) -> None:
+        self.count = 0
+        self.mean = np.zeros(n_assets)
+        self.comoment = np.zeros((n_assets, n_assets))
+
+    def update(self, rows: np.array) -> None:
+        """Merges a (T, n) block of returns into the totals."""
+        if rows.shape[0] == 0:
+            return
+        count = rows.shape[0]
+        mean = rows.mean(axis=0)
+        centered = rows - mean
+        self.merge(count, mean, centered.T @ centered)
+
+    def merge(self, count: int, mean: np.array, comoment: np.array) -> None:
+        """Merges the moments of another set of observations, the order of the merges does not matter."""
+        total = self.count + count
+        delta = mean - self.mean
+        self.comoment += comoment + np.outer(delta, delta) * (self.count * count / total)
+        self.mean += delta * (count / total)
+        self.count = total
+
+    def covariance(self) -> np.array:
+        """The sample covariance, with the same normalization of pandas.DataFrame.cov"""
+        if self.count < 2:
+            raise Exception("STOPPED EXECUTION: NOT ENOUGH RETURNS FOR THE COVARIANCE")
+        return self.comoment / (self.count - 1)
+
+def store_price_chunks(market_store, tickers: List[str], start_date=None, end_date=None
+                        , field='adjclose', chunk_size=10000):
+    """Yields the prices of the tickers from the columnar store as (dates, (T, n) array) chunks in date order.
+    The calendar is the one of the first ticker, as in Portfolio.compute_returns, and the prices missing on
+    one of its dates are NaN. Only chunk_size rows of each ticker are read from the memory-mapped files at a time.
+    """
+    calendar, _ = market_store.read(tickers[0], field, start_date, end_date)
+    columns = [market_store.read(ticker, field, start_date, end_date) for ticker in tickers]
+    for first in range(0, calendar.shape[0], chunk_size):
+        dates = np.asarray(calendar[first:first + chunk_size])
+        prices = np.full((dates.shape[0], len(tickers)), np.nan)
+        for j, (ticker_dates, values) in enumerate(columns):
+            lo = np.searchsorted(ticker_dates, dates[0], side='left')
+            hi = np.searchsorted(ticker_dates, dates[-1], side='right')
+            chunk_dates = np.asarray(ticker_dates[lo:hi])
+            position = np.searchsorted(dates, chunk_dates)
+            found = dates[np.minimum(position, dates.shape[0] - 1)] == chunk_dates
+            prices[position[found], j] = values[lo:hi][found]
+        yield dates, prices
+
+def csv_price_chunks(path: str, tickers: List[str], chunk_size=10000):
+    """Yields the prices of the tickers from a wide csv file, one row per date in increasing order and one column
+    per ticker, as (dates, (T, n) array) chunks. The file is read chunk_size lines at a time."""
+    for frame in pd.read_csv(path, index_col=0, chunksize=chunk_size):
+        yield frame.index.to_numpy(), frame[tickers].to_numpy(dtype=np.float64)
+
+def streaming_moments(chunks, n_assets: int) -> StreamingMoments:
+    """Computes the moments of the daily returns of the prices yielded by chunks in a single pass.
+    As pandas.DataFrame.pct_change, a missing price is replaced by the last known one. The dates whose returns
+    are not defined for all the assets (the first one) are skipped.
+    """
+    moments = StreamingMoments(n_assets)
+    last = np.full(n_assets, np.nan)
+    for _, prices in chunks:
+        if prices.shape[0] == 0:
+            continue
+        prices = forward_fill(prices, last)
+        previous = np.vstack([last, prices[:-1]])
+        returns = prices / previous - 1.0
+        moments.update(returns[~np.isnan(returns).any(axis=1)])
+        last = prices[-1]
+    return moments
@@ -0,0 +1,10 @@
+"""
+The modules of the project are imported from the src folder, as when the scripts are run from there.
+
+Run from the root of the repository with:
+    python -m pytest -q src/tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
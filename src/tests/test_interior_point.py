@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from benchmarks.problems import random_qp
+from solvers import interior_point
+from solvers.interior_point import IntPoint
+
+def solve(problem, **kwargs) -> IntPoint:
+    ip = IntPoint(*problem, history='none', **kwargs)
+    ip.solve()
+    return ip
+
+@pytest.mark.parametrize('seed', range(3))
+def test_normal_equations_step_matches_dense(seed):
+    S, c, A, b, x, y, lm = random_qp(8, seed=seed)
+    rng = np.random.default_rng(seed)
+    for matrix in (A, sparse.csr_matrix(A)):
+        ip = IntPoint(S, c, matrix, b, x, y, lm, history='none')
+        rd, rp = ip.compute_residuals(x, y, lm)
+        rc = rng.normal(size=y.shape[0])
+        normal = ip.solve_kkt(ip.factorize_kkt(y, lm), y, lm, rd, rp, rc)
+        dense = ip.solve_dense_kkt(y, lm, rd, rp, rc)
+        for d_normal, d_dense in zip(normal, dense):
+            np.testing.assert_allclose(d_normal, d_dense, rtol=1e-7, atol=1e-9)
+
+@pytest.mark.parametrize('n_assets', [1, 5, 20])
+def test_normal_equations_solve_matches_dense(n_assets):
+    problem = random_qp(n_assets, upper=1.0)
+    normal = solve(problem, kkt='normal')
+    dense = solve(problem, kkt='dense')
+    assert normal.status == dense.status == interior_point.OPTIMAL
+    np.testing.assert_allclose(normal.solutions, dense.solutions, atol=1e-6)
+    assert normal.solutions.sum() == pytest.approx(1.0, abs=1e-6)
+
+def test_sparse_and_mixed_precision_match_dense():
+    S, c, A, b, x, y, lm = random_qp(10, upper=0.3)
+    dense = solve((S, c, A, b, x, y, lm), kkt='dense')
+    for kwargs in ({}, {'precision': 'mixed'}):
+        normal = solve((S, c, sparse.csr_matrix(A), b, x, y, lm), **kwargs)
+        assert normal.status == interior_point.OPTIMAL
+        np.testing.assert_allclose(normal.solutions, dense.solutions, atol=1e-5)
+
+def test_unknown_kkt_strategy_raises():
+    with pytest.raises(Exception, match='UNKNOWN KKT STRATEGY'):
+        IntPoint(*random_qp(3), kkt='lu')
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+import resampling
+from benchmarks.backtest import random_returns, constraints
+
+@pytest.fixture(scope='module')
+def problem():
+    n_assets = 8
+    returns = random_returns(300, n_assets).to_numpy()
+    A, b = constraints(n_assets, 0.4)
+    # With the lower bounds, kept before the full investment row as Portfolio.resampled_frontier does
+    A, b = np.vstack([A[:-1], np.eye(n_assets), A[-1:]]), np.concatenate([b[:-1], np.zeros(n_assets), b[-1:]])
+    return returns, A, b, np.zeros(n_assets), np.full(n_assets, 0.4)
+
+def test_same_seed_same_result(problem):
+    first = resampling.resampled_frontier(*problem, n_samples=8, n_points=5, seed=3)
+    second = resampling.resampled_frontier(*problem, n_samples=8, n_points=5, seed=3)
+    np.testing.assert_array_equal(first['weights'], second['weights'])
+    np.testing.assert_array_equal(first['weights_std'], second['weights_std'])
+    assert first['failed_samples'] == 0
+
+def test_other_seed_other_samples(problem):
+    first = resampling.resampled_frontier(*problem, n_samples=8, n_points=5, seed=3)
+    other = resampling.resampled_frontier(*problem, n_samples=8, n_points=5, seed=4)
+    assert not np.array_equal(first['weights'], other['weights'])
+
+@pytest.mark.parametrize('storage', ['shared_memory', 'memmap'])
+def test_processes_do_not_change_the_result(problem, storage):
+    sequential = resampling.resampled_frontier(*problem, n_samples=8, n_points=5, seed=3, chunk_size=3)
+    parallel = resampling.resampled_frontier(*problem, n_samples=8, n_points=5, seed=3, chunk_size=3
+                                            , processes=2, storage=storage)
+    np.testing.assert_array_equal(sequential['weights'], parallel['weights'])
+
+def test_weights_are_feasible(problem):
+    weights = resampling.resampled_frontier(*problem, n_samples=8, n_points=5, seed=3)['weights']
+    assert np.all(weights >= -1e-6) and np.all(weights <= 0.4 + 1e-6)
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+import resolver
+import store
+
+class Fetcher:
+    """Business days with increasing prices, counting the downloads."""
+
+    def __init__(self, empty=False) -> None:
+        self.calls = []
+        self.empty = empty
+
+    def __call__(self, ticker: str, start_date: str, end_date: str) -> tuple:
+        self.calls.append((ticker, start_date, end_date))
+        dates = pd.date_range(start_date, end_date, freq='B', inclusive='left').strftime('%Y-%m-%d')
+        dates = dates[:0] if self.empty else dates
+        frame = pd.DataFrame({field: np.arange(len(dates), dtype=float) for field in store.FIELDS}
+                            , index=pd.Index(dates, name='formatted_date'))
+        frame.insert(0, 'ticker', ticker)
+        return frame, 1
+
+@pytest.fixture
+def make_resolver(tmp_path):
+    def make(fetcher) -> resolver.DataResolver:
+        return resolver.DataResolver(store.MarketDataStore(str(tmp_path / 'store')), folder=str(tmp_path / 'csv')
+                                    , fetcher=fetcher)
+    return make
+
+def test_covered_subset_is_not_downloaded(make_resolver):
+    fetcher = Fetcher()
+    data_resolver = make_resolver(fetcher)
+    data_resolver.resolve(['AAA', 'BBB', 'CCC'], '2020-01-01', '2020-06-01')
+    n_calls = len(fetcher.calls)
+
+    # Another order, a subset of the tickers and of the dates
+    data = data_resolver.resolve(['CCC', 'AAA'], '2020-02-01', '2020-03-01')
+    assert len(fetcher.calls) == n_calls
+    assert data_resolver.stats == {'store': 2, 'csv': 0, 'download': 0}
+    assert list(pd.unique(data['ticker'])) == ['CCC', 'AAA']
+    assert data.index.min() >= '2020-02-01' and data.index.max() <= '2020-03-01'
+
+def test_range_after_the_coverage_is_downloaded(make_resolver):
+    fetcher = Fetcher()
+    data_resolver = make_resolver(fetcher)
+    data_resolver.resolve(['AAA', 'BBB'], '2020-01-01', '2020-06-01')
+    data = data_resolver.resolve(['BBB', 'AAA'], '2020-09-01', '2020-12-01')
+
+    assert data_resolver.stats['download'] == 2
+    assert data[data['ticker'] == 'AAA'].shape[0] == 65
+    assert data_resolver.market_store.coverage('AAA') == ('2020-01-01', '2020-12-01')
+
+def test_range_without_trading_days(make_resolver):
+    data_resolver = make_resolver(Fetcher())
+    data = data_resolver.resolve(['EMPTY'], '2020-01-04', '2020-01-05')
+    assert data.shape[0] == 0
+    assert data_resolver.market_store.coverage('EMPTY') == ('2020-01-04', '2020-01-05')
+
+def test_csv_files_are_imported(make_resolver, tmp_path):
+    (tmp_path / 'csv').mkdir()
+    Fetcher()('AAA', '2020-01-01', '2020-03-01')[0].to_csv(tmp_path / 'csv' / "ASSET_DATA_2020-01-01_to_2020-03-01_['AAA'].csv")
+    fetcher = Fetcher()
+    data_resolver = make_resolver(fetcher)
+    data = data_resolver.resolve(['AAA'], '2020-01-01', '2020-03-01')
+    assert fetcher.calls == []
+    assert data_resolver.stats['csv'] == 1 and data.shape[0] == 43
@@ -0,0 +1,82 @@
+import os
+import numpy as np
+import result_cache
+
+def put(cache, key: str) -> dict:
+    return cache.put(key, np.arange(4.0), 1.0, {'status': 'optimal'})
+
+def file_size(tmp_path) -> int:
+    """The size on disk of one result."""
+    put(result_cache.ResultCache(str(tmp_path / 'probe')), 'probe')
+    return disk_bytes(tmp_path / 'probe')
+
+def disk_bytes(root) -> int:
+    return sum(e.stat().st_size for e in os.scandir(root) if e.name.endswith('.npz'))
+
+def test_problem_key_depends_on_the_data():
+    S = np.eye(3)
+    key = result_cache.problem_key('intpoint', {'precision': 'double'}, {'S': S})
+    assert key == result_cache.problem_key('intpoint', {'precision': 'double'}, {'S': S.copy()})
+    assert key == result_cache.problem_key('intpoint', {'precision': 'double'}, {'S': result_cache.digest(S)})
+    assert key != result_cache.problem_key('intpoint', {'precision': 'double'}, {'S': 2 * S})
+    assert key != result_cache.problem_key('intpoint', {'precision': 'single'}, {'S': S})
+    assert key != result_cache.problem_key('intpoint', {'precision': 'double'}, {'S': S.astype(np.float32)})
+
+def test_memory_tier_evicts_the_least_recently_used():
+    cache = result_cache.ResultCache(None, max_entries=2)
+    put(cache, 'a')
+    put(cache, 'b')
+    cache.get('a')
+    put(cache, 'c')
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+
+def test_disk_tier_evicts_beyond_max_bytes(tmp_path):
+    size = file_size(tmp_path)
+    cache = result_cache.ResultCache(str(tmp_path / 'cache'), max_bytes=3 * size, max_entries=1)
+    for key in 'abcde':
+        put(cache, key)
+        if key == 'c':
+            # Read from disk, so 'a' becomes the most recently used file
+            assert cache.get('a') is not None and cache.counters['disk_hits'] == 1
+
+    stats = cache.stats()
+    assert stats['evictions'] == 2
+    assert stats['disk_entries'] == 3 and stats['disk_bytes'] == disk_bytes(tmp_path / 'cache') == 3 * size
+    assert sorted(os.listdir(tmp_path / 'cache')) == ['a.npz', 'd.npz', 'e.npz']
+
+def test_results_of_another_instance_are_found(tmp_path):
+    first = result_cache.ResultCache(str(tmp_path))
+    second = result_cache.ResultCache(str(tmp_path))
+    assert second.get('k') is None
+    put(first, 'k')
+    result = second.get('k')
+    assert result is not None and second.counters['disk_hits'] == 1
+    np.testing.assert_array_equal(result['weights'], np.arange(4.0))
+    assert not result['weights'].flags.writeable
+
+def test_folder_shared_by_two_instances_stays_within_max_bytes(tmp_path):
+    size = file_size(tmp_path)
+    root = str(tmp_path / 'cache')
+    first = result_cache.ResultCache(root, max_bytes=4 * size)
+    second = result_cache.ResultCache(root, max_bytes=4 * size)
+    for i in range(6):
+        put(first, f'a{i}')
+    # The second instance sees a file it did not write, reads the folder again and evicts the files of the first
+    assert second.get('a5') is not None
+    for i in range(6):
+        put(second, f'b{i}')
+    assert disk_bytes(root) <= 4 * size
+
+def test_corrupted_file_is_a_miss(tmp_path):
+    cache = result_cache.ResultCache(str(tmp_path))
+    put(cache, 'k')
+    with open(tmp_path / 'k.npz', 'wb') as f:
+        f.write(b'garbage')
+    assert result_cache.ResultCache(str(tmp_path)).get('k') is None
+
+def test_clear(tmp_path):
+    cache = result_cache.ResultCache(str(tmp_path))
+    put(cache, 'k')
+    cache.clear()
+    assert cache.get('k') is None and os.listdir(tmp_path) == []
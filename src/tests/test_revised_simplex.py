@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from solvers.simplex import Simplex
+from solvers.revised_simplex import BasisFactorization, RevisedSimplex
+
+@pytest.mark.parametrize('seed', range(5))
+def test_revised_matches_tableau(seed):
+    # max c.T @ x s.t. A @ x <= b, x >= 0, with the slack columns explicit for both solvers
+    rng = np.random.default_rng(seed)
+    m, n = 4, 6
+    A = np.hstack([rng.uniform(0.1, 2.0, (m, n)), np.eye(m)])
+    b = rng.uniform(1.0, 10.0, m)
+    c = np.concatenate([rng.uniform(0.0, 5.0, n), np.zeros(m)])
+
+    tableau = Simplex(c, A, b, max=True)
+    tableau.solve()
+    revised = RevisedSimplex(c, A, b, np.zeros(n + m), np.full(n + m, np.inf), history='none')
+    revised.solve()
+
+    assert revised.optimal
+    assert revised.objective[-1] == pytest.approx(tableau.objective[-1], rel=1e-9)
+    np.testing.assert_allclose(A @ revised.solutions, b, atol=1e-9)
+    assert np.all(revised.solutions >= -1e-12)
+
+def test_revised_applies_bounds():
+    # The best assets are filled up to their upper bound
+    mu = np.array([0.1, 0.5, 0.3, 0.2])
+    revised = RevisedSimplex(mu, np.ones((1, 4)), np.ones(1), np.zeros(4), np.full(4, 0.4), history='none')
+    revised.solve()
+    np.testing.assert_allclose(revised.solutions, [0.0, 0.4, 0.4, 0.2], atol=1e-12)
+
+def test_phase_one_limit_raises():
+    mu = np.random.default_rng(0).normal(size=50)
+    revised = RevisedSimplex(mu, np.ones((1, 50)), np.ones(1), np.zeros(50), np.full(50, 0.05)
+                            , max_iteration=1, history='none')
+    with pytest.raises(Exception, match='PHASE 1'):
+        revised.solve()
+
+def test_eta_file_matches_dense_solve():
+    rng = np.random.default_rng(0)
+    B = rng.normal(size=(6, 6)) + 6 * np.eye(6)
+    factor = BasisFactorization(B)
+    for r in [1, 3, 0, 3, 5]:
+        a = rng.normal(size=6)
+        factor.update(r, factor.ftran(a))
+        B[:, r] = a
+
+    v = rng.normal(size=6)
+    np.testing.assert_allclose(factor.ftran(v), np.linalg.solve(B, v), atol=1e-12)
+    np.testing.assert_allclose(factor.btran(v), np.linalg.solve(B.T, v), atol=1e-12)
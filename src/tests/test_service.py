@@ -0,0 +1,88 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import pytest
+import service
+
+async def send(port: int, request: bytes) -> tuple:
+    """Sends raw bytes on a new connection, returns the status and the json answer."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(request)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(content)
+
+def post(body: bytes, length=None) -> bytes:
+    length = len(body) if length is None else length
+    return f'POST /solve HTTP/1.1\r\nConnection: close\r\nContent-Length: {length}\r\n\r\n'.encode() + body
+
+def run(scenario, max_body=2**20):
+    """Runs the scenario against a service with one worker on a free port."""
+    async def main():
+        optimization_service = service.OptimizationService(1, max_body=max_body)
+        server = await optimization_service.start('127.0.0.1', 0)
+        try:
+            return await scenario(optimization_service, server.sockets[0].getsockname()[1])
+        finally:
+            optimization_service.close()
+    return asyncio.run(main())
+
+def test_health_and_unknown_route():
+    async def scenario(_, port):
+        return (await send(port, b'GET /health HTTP/1.1\r\nConnection: close\r\n\r\n')
+                , await send(port, b'GET /nowhere HTTP/1.1\r\nConnection: close\r\n\r\n'))
+    health, unknown = run(scenario)
+    assert health == (200, {'status': 'ok'})
+    assert unknown[0] == 404
+
+@pytest.mark.parametrize('request_bytes', [post(b'{not json'), post(b'[1, 2]'), post(b'{}', length='abc')])
+def test_bad_requests_are_answered_400(request_bytes):
+    async def scenario(optimization_service, port):
+        return await send(port, request_bytes), optimization_service.metrics()['errors']
+    (status, payload), errors = run(scenario)
+    assert status == 400 and payload['status'] == 'error'
+    assert errors == 1
+
+def test_large_body_is_answered_413():
+    async def scenario(_, port):
+        return await send(port, post(b'x' * 200))
+    status, payload = run(scenario, max_body=100)
+    assert status == 413 and payload['status'] == 'error'
+
+def test_broken_pool_is_answered_500():
+    async def scenario(optimization_service, port):
+        for pid in list(optimization_service.pool._processes):
+            os.kill(pid, signal.SIGKILL)
+        await asyncio.sleep(0.5)
+        job = {'tickers': ['AAA'], 'upper': [1.0], 'start_date': '2020-01-01', 'end_date': '2020-02-01'}
+        return await send(port, post(json.dumps(job).encode())), optimization_service.metrics()['errors']
+    (status, payload), errors = run(scenario)
+    assert status == 500 and 'BrokenProcessPool' in payload['error']
+    assert errors == 1
+
+def test_sigterm_stops_the_workers():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    src = os.path.dirname(os.path.abspath(service.__file__))
+    server = subprocess.Popen([sys.executable, os.path.join(src, 'service.py'), '--port', str(port), '-w', '2']
+                            , stdout=subprocess.PIPE, env={**os.environ, 'PYTHONPATH': src})
+    server.stdout.readline()
+    # The worker processes are the children of the server
+    with open(f'/proc/{server.pid}/task/{server.pid}/children') as f:
+        workers = [int(pid) for pid in f.read().split()]
+    assert len(workers) >= 2
+
+    server.terminate()
+    assert server.wait(timeout=30) == 0
+    assert server.stdout.read() == b''
+    server.stdout.close()
+    for pid in workers:
+        with pytest.raises(ProcessLookupError):
+            os.kill(pid, 0)
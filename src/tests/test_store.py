@@ -0,0 +1,65 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import store
+
+def market_data(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """Business days of the range, each field offset by 1000 times its position to check the alignment."""
+    dates = pd.date_range(start_date, end_date, freq='B', inclusive='left').strftime('%Y-%m-%d')
+    frame = pd.DataFrame({field: np.arange(len(dates), dtype=float) + 1000.0 * i for i, field in enumerate(store.FIELDS)}
+                        , index=pd.Index(dates, name='formatted_date'))
+    frame.insert(0, 'ticker', ticker)
+    return frame
+
+def aligned(frame: pd.DataFrame) -> bool:
+    return bool(np.all(frame['low'] - frame['high'] == 1000.0) and np.all(frame['adjclose'] - frame['high'] == 5000.0))
+
+def test_append_extends_the_history(tmp_path):
+    market_store = store.MarketDataStore(str(tmp_path))
+    market_store.write(market_data('A', '2020-01-01', '2020-02-01'), '2020-01-01', '2020-02-01')
+    market_store.write(market_data('A', '2020-01-15', '2020-03-01'), '2020-01-15', '2020-03-01')
+
+    loaded = market_store.load(['A'], '2020-01-01', '2020-03-01')
+    expected = pd.date_range('2020-01-01', '2020-03-01', freq='B', inclusive='left').strftime('%Y-%m-%d')
+    assert list(loaded.index) == list(expected)
+    assert loaded.index.is_unique
+    assert market_store.coverage('A') == ('2020-01-01', '2020-03-01')
+
+def test_interrupted_append_is_ignored_then_repaired(tmp_path):
+    market_store = store.MarketDataStore(str(tmp_path))
+    market_store.write(market_data('A', '2020-01-01', '2020-02-01'), '2020-01-01', '2020-02-01')
+    n_rows = market_store.dates('A').shape[0]
+
+    # An append interrupted after the fields and in the middle of a date
+    for field in store.FIELDS:
+        with open(os.path.join(tmp_path, 'A', f'{field}.f8'), 'ab') as f:
+            f.write(np.ones(3).tobytes())
+    with open(os.path.join(tmp_path, 'A', 'dates.i8'), 'ab') as f:
+        f.write(b'\x01\x02\x03')
+
+    loaded = market_store.load(['A'], '2020-01-01', '2020-02-01')
+    assert loaded.shape[0] == n_rows and aligned(loaded)
+
+    market_store.write(market_data('A', '2020-02-01', '2020-03-01'), '2020-02-01', '2020-03-01')
+    loaded = market_store.load(['A'], '2020-01-01', '2020-03-01')
+    assert loaded.shape[0] == 43 and aligned(loaded)
+    assert os.path.getsize(os.path.join(tmp_path, 'A', 'close.f8')) == 43 * 8
+
+def test_short_field_is_detected(tmp_path):
+    market_store = store.MarketDataStore(str(tmp_path))
+    market_store.write(market_data('A', '2020-01-01', '2020-02-01'), '2020-01-01', '2020-02-01')
+    with open(os.path.join(tmp_path, 'A', 'open.f8'), 'r+b') as f:
+        f.truncate(8)
+    with pytest.raises(Exception, match='CORRUPTED'):
+        market_store.load(['A'], '2020-01-01', '2020-02-01')
+
+def test_rewrite_leaves_no_temporary_folder(tmp_path):
+    market_store = store.MarketDataStore(str(tmp_path))
+    market_store.write(market_data('A', '2020-02-01', '2020-03-01'), '2020-02-01', '2020-03-01')
+    # Starts before the stored history: the ticker is written again
+    market_store.merge(market_data('A', '2020-01-01', '2020-02-01'), '2020-01-01', '2020-02-01')
+
+    assert sorted(os.listdir(tmp_path)) == ['A']
+    assert market_store.coverage('A') == ('2020-01-01', '2020-03-01')
+    assert aligned(market_store.load(['A'], '2020-01-01', '2020-03-01'))